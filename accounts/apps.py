@@ -41,4 +41,7 @@ class AccountsConfig(AppConfig):
             else:
                 logger.warning("serviceAccountKey.json not found. Push notifications will not work.")
         
-        # (Aapka create_user_profile signal @receiver se hai, isliye woh automatically load ho jayega)
\ No newline at end of file
+        # (Aapka create_user_profile signal @receiver se hai, isliye woh automatically load ho jayega)
+
+        # Identity cache invalidation signals (WebSocket auth) register karein
+        from . import signals  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,123 @@
+# accounts/identity.py
+"""
+User identity (role, rider profile id, store id) resolution.
+
+WebSocket auth (ws_auth.py) har connect par users table hit na kare,
+isliye identity do jagah se aati hai:
+1. JWT claims: get_tokens_for_user() login par 'role', 'rider_profile_id'
+   aur 'store_id' token mein daal deta hai (access token refresh par bhi
+   copy hote hain).
+2. Cache: 'ws_identity_<user_id>' (DB se bani identity) aur
+   'ws_active_<user_id>' (sirf active flag), WS_IDENTITY_CACHE_TTL. Har
+   connect par check hota hai ki user abhi bhi active hai (hit par query
+   nahi). Miss par ek query: claims hon toh sirf is_active check, warna
+   profile join ke saath (e.g. /api/token/ wale tokens). Token claims
+   kabhi cache nahi hote.
+Profile bane/hate ya user deactivate ho toh signals.py cache key hata deta hai.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+ROLE_CUSTOMER = 'CUSTOMER'
+ROLE_RIDER = 'RIDER'
+ROLE_STORE_STAFF = 'STORE_STAFF'
+
+# Cache mein "user inactive / nahi mila" ka marker
+INACTIVE = 'INACTIVE'
+ACTIVE = 'ACTIVE'
+
+
+def identity_key(user_id):
+    return f"ws_identity_{user_id}"
+
+
+def active_key(user_id):
+    return f"ws_active_{user_id}"
+
+
+def identity_claims(user):
+    """User object se identity dict: {'role', 'rider_profile_id', 'store_id'}."""
+    rider_profile = getattr(user, 'rider_profile', None)
+    staff_profile = getattr(user, 'store_staff_profile', None)
+    if rider_profile is not None:
+        role = ROLE_RIDER
+    elif staff_profile is not None:
+        role = ROLE_STORE_STAFF
+    else:
+        role = ROLE_CUSTOMER
+    return {
+        'role': role,
+        'rider_profile_id': rider_profile.id if rider_profile is not None else None,
+        'store_id': staff_profile.store_id if staff_profile is not None else None,
+    }
+
+
+def _identity_from_db(user_id):
+    from .models import User
+
+    user = User.objects.select_related(
+        'rider_profile', 'store_staff_profile'
+    ).filter(pk=user_id, is_active=True).first()
+    return identity_claims(user) if user else None
+
+
+def _is_active_in_db(user_id):
+    from .models import User
+
+    return User.objects.filter(pk=user_id, is_active=True).exists()
+
+
+def get_identity(user_id, claims=None):
+    """
+    Identity dict, ya None (user inactive / delete ho gaya).
+    DB se bani identity cache ('ws_identity_<id>') mein ho toh wahi (hit par
+    koi query nahi). Warna 'claims' (JWT se) diye hon toh sirf active check
+    hota hai (profile join nahi) aur sirf active flag ('ws_active_<id>')
+    cache hota hai; token claims kabhi cache nahi hote, taaki purane token
+    ke claims naye profile wali identity ko overwrite na karein. Claims na
+    hon toh poori identity DB se. Cache fail ho toh seedha DB se.
+    """
+    keys = [identity_key(user_id), active_key(user_id)]
+    try:
+        cached = cache.get_many(keys)
+    except Exception as e:
+        logger.warning(f"Identity cache read fail (user {user_id}): {e}")
+        if claims is not None:
+            return claims if _is_active_in_db(user_id) else None
+        return _identity_from_db(user_id)
+
+    cached_identity = cached.get(keys[0])
+    if cached_identity is not None:
+        return None if cached_identity == INACTIVE else cached_identity
+
+    if claims is not None:
+        cached_active = cached.get(keys[1])
+        if cached_active is None:
+            is_active = _is_active_in_db(user_id)
+            _cache_set(keys[1], ACTIVE if is_active else INACTIVE, user_id)
+        else:
+            is_active = cached_active == ACTIVE
+        return claims if is_active else None
+
+    identity = _identity_from_db(user_id)
+    _cache_set(keys[0], identity or INACTIVE, user_id)
+    return identity
+
+
+def _cache_set(key, value, user_id):
+    try:
+        cache.set(key, value, timeout=settings.WS_IDENTITY_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Identity cache set fail (user {user_id}): {e}")
+
+
+def invalidate_identity(user_id):
+    try:
+        cache.delete_many([identity_key(user_id), active_key(user_id)])
+    except Exception as e:
+        logger.warning(f"Identity cache delete fail (user {user_id}): {e}")
@@ -0,0 +1,46 @@
+# accounts/signals.py
+"""
+Identity cache (identity.py) invalidation: user save (e.g. deactivate),
+rider/store staff profile bane, badle ya delete ho toh commit ke baad
+'ws_identity_<user_id>' key hata do.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import StoreStaffProfile
+
+
+def _invalidate_on_commit(user_id):
+    from .identity import invalidate_identity
+
+    transaction.on_commit(lambda: invalidate_identity(user_id))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL, dispatch_uid='accounts_identity_on_user_save')
+def invalidate_identity_on_user_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    _invalidate_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=StoreStaffProfile, dispatch_uid='accounts_identity_on_staff_save')
+@receiver(post_delete, sender=StoreStaffProfile, dispatch_uid='accounts_identity_on_staff_delete')
+def invalidate_identity_on_staff_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _invalidate_on_commit(instance.user_id)
+
+
+@receiver(post_save, sender='delivery.RiderProfile', dispatch_uid='accounts_identity_on_rider_save')
+def invalidate_identity_on_rider_create(sender, instance, created=False, raw=False, **kwargs):
+    # Sirf naya profile: online/offline toggles identity nahi badalte
+    if raw or not created:
+        return
+    _invalidate_on_commit(instance.user_id)
+
+
+@receiver(post_delete, sender='delivery.RiderProfile', dispatch_uid='accounts_identity_on_rider_delete')
+def invalidate_identity_on_rider_delete(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.user_id)
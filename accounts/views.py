@@ -37,12 +37,17 @@ from .permissions import IsCustomer
 # Task Imports
 from .tasks import send_otp_sms_task
 
+from .identity import identity_claims
+
 # Setup logger
 logger = logging.getLogger(__name__)
 
 
 def get_tokens_for_user(user):
     refresh = RefreshToken.for_user(user)
+    # --- NAYA: Identity claims (WebSocket auth inhe DB hit ke bina padhta hai) ---
+    for claim, value in identity_claims(user).items():
+        refresh[claim] = value
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
@@ -0,0 +1,103 @@
+# accounts/ws_auth.py
+"""
+WebSocket JWT auth middleware (session-based AuthMiddlewareStack ki jagah).
+
+Token do tarah se aa sakta hai:
+- Query string: ws/track/QD1234/?token=<access>
+- Subprotocol: Sec-WebSocket-Protocol: jwt, <access>
+  (browser WebSocket headers set nahi kar sakta; consumer 'jwt' subprotocol
+  accept karta hai, dekhein scope['auth_subprotocol'])
+
+Token signature/expiry SimpleJWT ke AccessToken se verify hota hai (DB hit
+nahi). scope['user'] ek TokenUser hai (id token se). User active hai ya
+nahi, yeh har connect par cached identity (identity.py) se check hota hai,
+taaki deactivate hua user purane token se connect na kar sake. Role,
+rider profile id aur store id cached identity se; cache miss par token
+claims (agar hain) profile join bachate hain.
+Token na ho / invalid ho / user inactive ho toh AnonymousUser; consumers
+connection reject karte hain.
+"""
+import logging
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from django.contrib.auth.models import AnonymousUser
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+SUBPROTOCOL = 'jwt'
+
+
+def _token_from_scope(scope):
+    """(raw_token, subprotocol) query string ya subprotocol list se."""
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    if query.get('token'):
+        return query['token'][0], None
+    subprotocols = scope.get('subprotocols') or []
+    if SUBPROTOCOL in subprotocols:
+        index = subprotocols.index(SUBPROTOCOL)
+        if index + 1 < len(subprotocols):
+            return subprotocols[index + 1], SUBPROTOCOL
+    return None, None
+
+
+def _authenticate(raw_token):
+    """Return: (TokenUser, identity dict) ya (None, None)."""
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.models import TokenUser
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from .identity import get_identity
+
+    try:
+        token = AccessToken(raw_token)
+    except TokenError as e:
+        logger.info(f"WebSocket JWT rejected: {e}")
+        return None, None
+
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    if user_id is None:
+        return None, None
+
+    # Active/INACTIVE hamesha cached identity se; claims sirf profile join bachate hain
+    claims = None
+    if 'role' in token:
+        claims = {
+            'role': token['role'],
+            'rider_profile_id': token.get('rider_profile_id'),
+            'store_id': token.get('store_id'),
+        }
+    identity = get_identity(user_id, claims=claims)
+    if identity is None:
+        return None, None
+    return TokenUser(token), identity
+
+
+class JWTAuthMiddleware:
+    """ASGI middleware: scope mein 'user', 'role', 'rider_profile_id', 'store_id'."""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        raw_token, subprotocol = _token_from_scope(scope)
+
+        user, identity = None, None
+        if raw_token:
+            # Cache miss par identity query ho sakti hai, isliye thread mein
+            user, identity = await database_sync_to_async(_authenticate, thread_sensitive=False)(raw_token)
+
+        identity = identity or {}
+        scope['user'] = user or AnonymousUser()
+        scope['role'] = identity.get('role')
+        scope['rider_profile_id'] = identity.get('rider_profile_id')
+        scope['store_id'] = identity.get('store_id')
+        scope['auth_subprotocol'] = subprotocol if user else None
+        return await self.inner(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    return JWTAuthMiddleware(inner)
@@ -1,6 +1,6 @@
 # cart/admin.py
 from django.contrib import admin
-from .models import Cart, CartItem
+from .models import Cart, CartItem, AbandonedCartStat
 
 class CartItemInline(admin.TabularInline):
     """
@@ -38,4 +38,21 @@ class CartAdmin(admin.ModelAdmin):
         'updated_at'
     )
     
-    inlines = [CartItemInline]
\ No newline at end of file
+    inlines = [CartItemInline]
+
+
+@admin.register(AbandonedCartStat)
+class AbandonedCartStatAdmin(admin.ModelAdmin):
+    """
+    Stale-cart purge job ke runs (abandoned-cart analytics).
+    """
+    list_display = (
+        'run_at',
+        'carts_purged',
+        'empty_carts_purged',
+        'items_purged',
+        'abandoned_value',
+        'unavailable_items_dropped'
+    )
+    date_hierarchy = 'run_at'
+    readonly_fields = list_display
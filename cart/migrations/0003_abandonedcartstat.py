@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbandonedCartStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Run At')),
+                ('carts_purged', models.PositiveIntegerField(default=0, help_text='Items wale abandoned carts jo delete hue')),
+                ('empty_carts_purged', models.PositiveIntegerField(default=0, help_text='Khaali carts (sirf visit par bane) jo delete hue')),
+                ('items_purged', models.PositiveIntegerField(default=0, help_text='Abandoned carts ke saath delete hue total CartItems')),
+                ('abandoned_value', models.DecimalField(decimal_places=2, default=0.0, help_text='Abandoned carts ki kul value (current price par)', max_digits=12)),
+                ('unavailable_items_dropped', models.PositiveIntegerField(default=0, help_text='Active carts se hataye gaye unavailable items')),
+            ],
+            options={
+                'verbose_name': 'Abandoned Cart Stat',
+                'verbose_name_plural': 'Abandoned Cart Stats',
+                'ordering': ['-run_at'],
+            },
+        ),
+    ]
@@ -116,4 +116,45 @@ class CartItem(models.Model):
         Is cart item ki kul keemat (price * quantity).
         Yeh inventory se current price leta hai (sale price ya regular price).
         """
-        return self.inventory_item.get_current_price * self.quantity
\ No newline at end of file
+        return self.inventory_item.get_current_price * self.quantity
+
+class AbandonedCartStat(models.Model):
+    """
+    Stale-cart purge job (cart.tasks.purge_stale_carts) ke har run ka summary.
+    Abandoned-cart analytics ke liye: kitne cart chhode gaye aur unki value kitni thi.
+    """
+    run_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name="Run At"
+    )
+    carts_purged = models.PositiveIntegerField(
+        default=0,
+        help_text="Items wale abandoned carts jo delete hue"
+    )
+    empty_carts_purged = models.PositiveIntegerField(
+        default=0,
+        help_text="Khaali carts (sirf visit par bane) jo delete hue"
+    )
+    items_purged = models.PositiveIntegerField(
+        default=0,
+        help_text="Abandoned carts ke saath delete hue total CartItems"
+    )
+    abandoned_value = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0.00,
+        help_text="Abandoned carts ki kul value (current price par)"
+    )
+    unavailable_items_dropped = models.PositiveIntegerField(
+        default=0,
+        help_text="Active carts se hataye gaye unavailable items"
+    )
+
+    class Meta:
+        ordering = ['-run_at']
+        verbose_name = "Abandoned Cart Stat"
+        verbose_name_plural = "Abandoned Cart Stats"
+
+    def __str__(self):
+        return f"Cart purge on {self.run_at:%Y-%m-%d %H:%M} ({self.carts_purged} abandoned)"
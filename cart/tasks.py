@@ -0,0 +1,133 @@
+# cart/tasks.py
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AbandonedCartStat, Cart, CartItem
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+
+def _stale_carts_queryset(empty_cutoff, abandoned_cutoff):
+    """
+    Woh carts jo purge hone chahiye:
+    - Khaali carts jo 'empty_cutoff' se pehle bane/chhue gaye the, ya
+    - Items wale carts jinmein 'abandoned_cutoff' ke baad koi activity nahi hui.
+
+    Note: CartItem add/update par Cart.updated_at nahi badalta,
+    isliye last activity items ke 'added_at' se bhi nikaali jaati hai.
+    """
+    return Cart.objects.annotate(
+        item_rows=Count('items'),
+        last_item_added_at=Max('items__added_at'),
+    ).filter(
+        Q(item_rows=0, updated_at__lt=empty_cutoff) |
+        Q(item_rows__gt=0, updated_at__lt=abandoned_cutoff, last_item_added_at__lt=abandoned_cutoff)
+    )
+
+
+def _drop_unavailable_items(batch_size):
+    """
+    Active carts se woh items hatata hai jinka inventory ab bik nahi raha
+    (is_available=False) ya jinka store band ho chuka hai.
+    Batch mein delete karta hai taaki ek bada DELETE lock na le.
+    """
+    dropped = 0
+    unavailable_items = CartItem.objects.filter(
+        Q(inventory_item__is_available=False) |
+        Q(inventory_item__store__is_active=False)
+    )
+    while True:
+        ids = list(unavailable_items.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted, _ = CartItem.objects.filter(id__in=ids).delete()
+        dropped += deleted
+    return dropped
+
+
+@shared_task(name="purge_stale_carts")
+def purge_stale_carts():
+    """
+    Roz chalta hai (beat schedule dekhein).
+    Abandoned aur khaali carts ko bounded batches mein delete karta hai,
+    unavailable items ko active carts se hataata hai, aur
+    har run ka summary AbandonedCartStat mein save karta hai.
+    """
+    now = timezone.now()
+    empty_cutoff = now - timedelta(hours=settings.CART_EMPTY_PURGE_HOURS)
+    abandoned_cutoff = now - timedelta(days=settings.CART_ABANDON_DAYS)
+    batch_size = settings.CART_PURGE_BATCH_SIZE
+    max_batches = settings.CART_PURGE_MAX_BATCHES
+
+    line_value = F('inventory_item__price') * F('quantity')
+    sale_line_value = F('inventory_item__sale_price') * F('quantity')
+
+    stats = {
+        'carts_purged': 0,
+        'empty_carts_purged': 0,
+        'items_purged': 0,
+        'abandoned_value': Decimal('0.00'),
+    }
+
+    for _ in range(max_batches):
+        batch = list(
+            _stale_carts_queryset(empty_cutoff, abandoned_cutoff)
+            .order_by('id')
+            .values_list('id', 'item_rows')[:batch_size]
+        )
+        if not batch:
+            break
+
+        cart_ids = [cart_id for cart_id, _ in batch]
+        abandoned_ids = [cart_id for cart_id, item_rows in batch if item_rows > 0]
+
+        with transaction.atomic():
+            if abandoned_ids:
+                # Abandoned value ek hi aggregate query mein (sale price ho toh wahi)
+                batch_value = CartItem.objects.filter(
+                    cart_id__in=abandoned_ids
+                ).aggregate(
+                    total=Sum(
+                        Coalesce(sale_line_value, line_value),
+                        output_field=DecimalField(max_digits=12, decimal_places=2)
+                    )
+                )['total'] or Decimal('0.00')
+                stats['abandoned_value'] += batch_value
+
+            _, deleted_per_model = Cart.objects.filter(id__in=cart_ids).delete()
+
+        stats['items_purged'] += deleted_per_model.get(CartItem._meta.label, 0)
+        stats['carts_purged'] += len(abandoned_ids)
+        stats['empty_carts_purged'] += len(cart_ids) - len(abandoned_ids)
+    else:
+        logger.warning(
+            f"CELERY TASK (purge_stale_carts): Max {max_batches} batches reached, "
+            "baaki carts agle run mein purge honge."
+        )
+
+    unavailable_dropped = _drop_unavailable_items(batch_size)
+
+    AbandonedCartStat.objects.create(
+        unavailable_items_dropped=unavailable_dropped,
+        **stats
+    )
+
+    logger.info(
+        f"CELERY TASK (purge_stale_carts): Purged {stats['carts_purged']} abandoned "
+        f"and {stats['empty_carts_purged']} empty carts ({stats['items_purged']} items, "
+        f"value ₹{stats['abandoned_value']}). Dropped {unavailable_dropped} unavailable items."
+    )
+    return (
+        f"Purged {stats['carts_purged'] + stats['empty_carts_purged']} carts, "
+        f"dropped {unavailable_dropped} unavailable items."
+    )
@@ -1 +1,57 @@
+from decimal import Decimal
 
+from django.contrib.gis.geos import Point
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Address, CustomerProfile, User
+from inventory.models import StoreInventory
+from store.models import Category, Product, ProductVariant, Store
+
+from .models import Cart, CartItem
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CartQuoteViewTests(APITestCase):
+    """GET /api/cart/quote/ (CartQuoteView)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='quote-customer', password='pass', phone_number='+919800000001')
+        CustomerProfile.objects.get_or_create(user=self.user)
+        self.store = Store.objects.create(name='Test Hub', address='Hub Road', location=Point(77.5946, 12.9716, srid=4326))
+        category = Category.objects.create(name='Dairy', slug='dairy')
+        product = Product.objects.create(category=category, name='Milk')
+        variant = ProductVariant.objects.create(product=product, variant_name='500ml', sku='MILK-500')
+        inventory_item = StoreInventory.objects.create(store=self.store, variant=variant, price=Decimal('30.00'), stock_quantity=10)
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        CartItem.objects.create(cart=cart, inventory_item=inventory_item, quantity=2)
+        self.address = Address.objects.create(
+            user=self.user, full_address='1 Test Street', city='Bengaluru', pincode='560001',
+            location=Point(77.6046, 12.9816, srid=4326), is_default=True
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_quote_for_default_address(self):
+        response = self.client.get(reverse('cart-quote'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['store_id'], self.store.id)
+        self.assertEqual(response.data['address_id'], self.address.id)
+        self.assertEqual(response.data['item_subtotal'], Decimal('60.00'))
+        self.assertEqual(response.data['estimated_total'], Decimal('60.00') + response.data['delivery_fee'])
+        self.assertGreater(response.data['distance_km'], 0)
+        self.assertGreater(response.data['eta_minutes'], 0)
+
+    def test_empty_cart(self):
+        CartItem.objects.filter(cart__user=self.user).delete()
+
+        response = self.client.get(reverse('cart-quote'))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_address(self):
+        response = self.client.get(reverse('cart-quote'), {'address_id': self.address.id + 1000})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
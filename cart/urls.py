@@ -4,8 +4,8 @@ from .views import (
     CartItemAddView, 
     CartItemUpdateView, 
     CartItemRemoveView,
-    CartClearView
-    
+    CartClearView,
+    CartQuoteView
 )
 
 urlpatterns = [
@@ -28,4 +28,8 @@ urlpatterns = [
     path('clear/', 
          CartClearView.as_view(),
          name='clear-cart'),
+
+    path('quote/',
+         CartQuoteView.as_view(),
+         name='cart-quote'),
 ]
\ No newline at end of file
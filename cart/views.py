@@ -8,6 +8,7 @@ from django.db import transaction
 
 from .models import Cart, CartItem
 from inventory.models import StoreInventory
+from accounts.models import Address
 from .serializers import (
     CartSerializer, 
     CartItemAddSerializer, 
@@ -233,4 +234,54 @@ class CartClearView(generics.GenericAPIView):
         
         serializer = self.get_serializer(optimized_cart, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
-# --- END NAYA VIEW ---
\ No newline at end of file
+# --- END NAYA VIEW ---
+
+class CartQuoteView(generics.GenericAPIView):
+    """
+    API endpoint: GET /api/cart/quote/?address_id=<id>
+    Checkout se pehle cart ka bill: subtotal, delivery fee (surge ke saath)
+    aur rider travel time / ETA. address_id na ho toh user ka default address.
+    Fee (store, geohash cell) cache se aati hai (orders/fees.py).
+    """
+    permission_classes = [IsAuthenticated, IsCustomer]
+
+    def get(self, request, *args, **kwargs):
+        # --- GUARDED IMPORT (Circular dependency se bachne ke liye) ---
+        from orders.fees import quote_delivery_fee
+        from delivery.eta import predict_eta_minutes
+        # --- END GUARDED IMPORT ---
+
+        # Cart.store ek property hai (relation nahi): store prefetched items se lein
+        cart = Cart.objects.prefetch_related(
+            'items__inventory_item__store'
+        ).filter(user=request.user).first()
+        cart_items = list(cart.items.all()) if cart else []
+        if not cart_items:
+            return Response({"error": "Your cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
+        store = cart_items[0].inventory_item.store
+
+        addresses = Address.objects.filter(user=request.user)
+        address_id = request.query_params.get('address_id')
+        if address_id:
+            address = addresses.filter(id=address_id).first()
+        else:
+            address = addresses.filter(is_default=True).first()
+        if not address:
+            return Response({"error": "Delivery address not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        quote = quote_delivery_fee(store, address.location)
+        item_subtotal = sum(item.item_total_price for item in cart_items)
+        return Response({
+            'store_id': store.id,
+            'address_id': address.id,
+            'item_subtotal': item_subtotal,
+            'delivery_fee': quote['delivery_fee'],
+            'base_delivery_fee': quote['base_fee'],
+            'surge_multiplier': quote['surge_multiplier'],
+            'distance_km': quote['distance_km'],
+            'travel_minutes': quote['travel_minutes'],
+            # --- NAYA: Store / time / distance ke historical data se ETA ---
+            'eta_minutes': predict_eta_minutes(store.id, quote['distance_km']),
+            # Taxes/coupon checkout par lagte hain, isliye yeh sirf estimate hai
+            'estimated_total': item_subtotal + quote['delivery_fee'],
+        }, status=status.HTTP_200_OK)
@@ -43,6 +43,9 @@ class ManagerOrderListSerializer(serializers.ModelSerializer):
     """
     customer_name = serializers.CharField(source='user.get_full_name', read_only=True)
     customer_phone = serializers.CharField(source='user.phone_number', read_only=True)
+    # --- NAYA: Scheduled delivery window (khaali = turant delivery) ---
+    delivery_slot_start = serializers.DateTimeField(source='delivery_slot.start_at', read_only=True, default=None)
+    delivery_slot_end = serializers.DateTimeField(source='delivery_slot.end_at', read_only=True, default=None)
 
     class Meta:
         model = Order
@@ -53,7 +56,10 @@ class ManagerOrderListSerializer(serializers.ModelSerializer):
             'final_total',
             'created_at',
             'customer_name',
-            'customer_phone'
+            'customer_phone',
+            'delivery_slot_start',
+            'delivery_slot_end',
+            'fulfilment_released_at'
         ]
 
 class CancelOrderItemSerializer(serializers.Serializer):
@@ -127,4 +133,17 @@ class AnalyticsDashboardSerializer(serializers.Serializer):
     top_products = AnalyticsTopProductSerializer(many=True)
     top_pincodes = AnalyticsTopPincodeSerializer(many=True)
     top_customers = AnalyticsTopCustomerSerializer(many=True)
-    rider_performance = AnalyticsRiderPerformanceSerializer(many=True)
\ No newline at end of file
+    rider_performance = AnalyticsRiderPerformanceSerializer(many=True)
+
+class DeliverySurgeSerializer(serializers.Serializer):
+    """
+    Manager store par delivery fee surge lagata/hatata hai.
+    multiplier 1.00 = surge band.
+    """
+    multiplier = serializers.DecimalField(max_digits=4, decimal_places=2, min_value=1)
+    minutes = serializers.IntegerField(
+        min_value=1,
+        max_value=24 * 60,
+        default=60,
+        help_text="Surge kitne minute tak rahe"
+    )
@@ -8,7 +8,9 @@ from .views import (
     IssuePickTaskListView,
     ResolveIssueTaskRetryView,
     ResolveIssueTaskCancelView,
-    AnalyticsDashboardView
+    AnalyticsDashboardView,
+    StoreOrderEventStreamView,
+    DeliverySurgeView
 )
 
 urlpatterns = [
@@ -54,6 +56,14 @@ urlpatterns = [
          AnalyticsDashboardView.as_view(),
          name='staff-analytics'),
 
+     path('staff/events/',
+         StoreOrderEventStreamView.as_view(),
+         name='staff-order-events'),
+
+     path('staff/delivery-surge/',
+         DeliverySurgeView.as_view(),
+         name='staff-delivery-surge'),
+
 
      
 ]
@@ -14,7 +14,8 @@ from wms.serializers import PickTaskSerializer
 from accounts.permissions import IsStoreStaff
 from wms.permissions import IsStoreManager
 # Model Imports
-from orders.models import Order, OrderItem, Payment
+from orders.models import Order, OrderItem, Payment, OrderEvent, ArchivedOrder
+from orders.fulfilment import is_held
 from inventory.models import StoreInventory
 # from wms.models import PickTask, WmsStock # <-- REMOVED (Guarded)
 from delivery.models import Delivery
@@ -27,9 +28,10 @@ from .serializers import (
     ManagerOrderListSerializer, 
     CancelOrderItemSerializer,
     ManagerCustomerDetailSerializer,
-    AnalyticsDashboardSerializer
+    AnalyticsDashboardSerializer,
+    DeliverySurgeSerializer
 )
-from orders.serializers import OrderDetailSerializer # Output ke liye
+from orders.serializers import OrderDetailSerializer, OrderEventSerializer # Output ke liye
 
 # Task Imports
 from orders.tasks import process_razorpay_refund_task
@@ -137,7 +139,7 @@ class ManagerOrderListView(generics.ListAPIView):
         if not store:
             return Order.objects.none()
         
-        queryset = Order.objects.filter(store=store).select_related('user').order_by('-created_at')
+        queryset = Order.objects.filter(store=store).select_related('user', 'delivery_slot').order_by('-created_at')
 
         status = self.request.query_params.get('status')
         order_id = self.request.query_params.get('order_id')
@@ -167,6 +169,7 @@ class ManualPackView(generics.GenericAPIView):
         # --- GUARDED IMPORTS ---
         from wms.models import PickTask, WmsStock
         from delivery.utils import notify_nearby_riders
+        from delivery.transitions import can_transition, transition
         # --- END GUARDED IMPORTS ---
         
         order_id = self.kwargs.get('order_id')
@@ -181,6 +184,9 @@ class ManualPackView(generics.GenericAPIView):
                     raise Exception("Aap yeh order pack nahi kar sakte (galat store).")
                 if order.status not in [Order.OrderStatus.CONFIRMED, Order.OrderStatus.PREPARING]:
                     raise Exception(f"Order ko '{order.status}' status mein pack nahi kiya ja sakta.")
+                # --- NAYA: Slot order apne slot se pehle pack nahi hota (orders/fulfilment.py) ---
+                if is_held(order):
+                    raise Exception("Yeh scheduled order abhi release nahi hua (slot ke paas picking shuru hogi).")
 
                 pending_tasks = PickTask.objects.filter(
                     order=order, 
@@ -220,8 +226,9 @@ class ManualPackView(generics.GenericAPIView):
                 order.status = Order.OrderStatus.READY_FOR_PICKUP
                 order.save()
                 
-                delivery.status = Delivery.DeliveryStatus.PENDING_ACCEPTANCE
-                delivery.save()
+                # --- UPDATED: Transition table (delivery/transitions.py) ---
+                if can_transition(delivery.status, Delivery.DeliveryStatus.PENDING_ACCEPTANCE):
+                    transition(delivery, Delivery.DeliveryStatus.PENDING_ACCEPTANCE)
             
             # Transaction ke BAAD, Riders ko Notify karein
             notify_nearby_riders(delivery, context={'request': request})
@@ -635,9 +642,9 @@ class AnalyticsDashboardView(generics.GenericAPIView):
         # 2. Sirf delivered orders ka base queryset banayein
         # Hum 'final_total' par analysis kar rahe hain
         base_orders_qs = Order.objects.filter(
+            date_filter,
             store=store,
-            status=Order.OrderStatus.DELIVERED,
-            **date_filter
+            status=Order.OrderStatus.DELIVERED
         )
         
         # --- Query 1: Overview Stats (AOV, Total Revenue) ---
@@ -645,8 +652,17 @@ class AnalyticsDashboardView(generics.GenericAPIView):
             total_revenue=Sum('final_total'),
             total_orders=Count('id')
         )
-        total_revenue = overview_stats.get('total_revenue') or Decimal('0.00')
-        total_orders = overview_stats.get('total_orders') or 0
+        # Archive mein move hue purane orders bhi totals mein gine jaate hain
+        archived_stats = ArchivedOrder.objects.filter(
+            date_filter,
+            store=store,
+            status=Order.OrderStatus.DELIVERED
+        ).aggregate(
+            total_revenue=Sum('final_total'),
+            total_orders=Count('id')
+        )
+        total_revenue = (overview_stats.get('total_revenue') or Decimal('0.00')) + (archived_stats.get('total_revenue') or Decimal('0.00'))
+        total_orders = (overview_stats.get('total_orders') or 0) + (archived_stats.get('total_orders') or 0)
         average_order_value = (total_revenue / total_orders) if total_orders > 0 else Decimal('0.00')
 
         # --- Query 2: Top Selling Products ---
@@ -724,4 +740,71 @@ class AnalyticsDashboardView(generics.GenericAPIView):
         }
 
         serializer = self.get_serializer(data)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+class StoreOrderEventStreamView(generics.GenericAPIView):
+    """
+    API: GET /api/dashboard/staff/events/?after=<event_id>&limit=100
+    Store ke saare orders ke events (OrderEvent) 'id' order mein.
+    Client last event ka 'id' agli call mein 'after' bhejta hai (cursor);
+    (store, id) index par range scan hai, OFFSET nahi.
+    """
+    permission_classes = [IsAuthenticated, IsStoreStaff]
+    serializer_class = OrderEventSerializer
+
+    def get(self, request, *args, **kwargs):
+        store = request.user.store_staff_profile.store
+        if not store:
+            return Response({"error": "Aap kisi store se assign nahi hain."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = min(int(request.query_params.get('limit', 100)), settings.STORE_EVENT_STREAM_MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "'after' aur 'limit' integers hone chahiye."}, status=status.HTTP_400_BAD_REQUEST)
+
+        events = list(
+            OrderEvent.objects.filter(store=store, id__gt=after)
+            .select_related('order')
+            .order_by('id')[:max(limit, 1)]
+        )
+        return Response({
+            'events': self.get_serializer(events, many=True).data,
+            'next_after': events[-1].id if events else after,
+        }, status=status.HTTP_200_OK)
+
+
+class DeliverySurgeView(generics.GenericAPIView):
+    """
+    API: GET/POST /api/dashboard/staff/delivery-surge/
+    Manager apne store ka delivery fee surge multiplier dekhta/set karta hai
+    (e.g. baarish ya rider shortage). Cached cell fees dobara calculate nahi
+    hoti; surge quote ke waqt multiply hota hai (orders/fees.py).
+    """
+    permission_classes = [IsAuthenticated, IsStoreManager]
+    serializer_class = DeliverySurgeSerializer
+
+    def get(self, request, *args, **kwargs):
+        from orders.fees import get_surge_multiplier
+
+        store = request.user.store_staff_profile.store
+        if not store:
+            return Response({"error": "Aap kisi store se assign nahi hain."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'store_id': store.id, 'multiplier': get_surge_multiplier(store.id)}, status=status.HTTP_200_OK)
+
+    def post(self, request, *args, **kwargs):
+        from orders.fees import set_surge_multiplier
+
+        store = request.user.store_staff_profile.store
+        if not store:
+            return Response({"error": "Aap kisi store se assign nahi hain."}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        multiplier = set_surge_multiplier(
+            store.id,
+            serializer.validated_data['multiplier'],
+            serializer.validated_data['minutes']
+        )
+        logger.info(f"Delivery surge for store {store.id} set to {multiplier} by {request.user.username}")
+        return Response({'store_id': store.id, 'multiplier': multiplier}, status=status.HTTP_200_OK)
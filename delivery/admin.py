@@ -2,7 +2,8 @@
 from django.contrib import admin
 from .models import (
     RiderProfile, Delivery, RiderEarning, RiderPayout, 
-    RiderCashDeposit, RiderApplication, RiderDocument
+    RiderCashDeposit, RiderApplication, RiderDocument, DeliveryOutbox,
+    DeliveryTrail
 )
 from accounts.models import User # User model import karein
 from django.db import transaction
@@ -84,10 +85,34 @@ class DeliveryAdmin(admin.ModelAdmin):
         'picked_up_at', 
         'delivered_at',
         'rider_rating',
-        'rider_rating_comment'
+        'rider_rating_comment',
+        'retry_attempts',
+        'retry_radius_km',
+        'retry_incentive',
+        'next_retry_at'
     )
     autocomplete_fields = ('order', 'rider')
 
+@admin.register(DeliveryOutbox)
+class DeliveryOutboxAdmin(admin.ModelAdmin):
+    """
+    Delivery transition side effects ka outbox (debugging / failed entries dekhne ke liye).
+    """
+    list_display = ('delivery_id', 'from_status', 'to_status', 'status', 'attempts', 'created_at', 'processed_at')
+    list_filter = ('status', 'to_status')
+    search_fields = ('delivery__id',)
+    readonly_fields = ('delivery', 'from_status', 'to_status', 'rider_id_snapshot', 'effects', 'created_at', 'processed_at')
+
+@admin.register(DeliveryTrail)
+class DeliveryTrailAdmin(admin.ModelAdmin):
+    """
+    Delivery route trails (encoded). Replay API: staff/order/<order_id>/trail/
+    """
+    list_display = ('order_id_str', 'rider_id_snapshot', 'point_count', 'distance_km', 'started_at', 'finalized_at')
+    list_filter = ('finalized_at',)
+    search_fields = ('order_id_str',)
+    readonly_fields = ('delivery', 'order_id_str', 'store_id_snapshot', 'rider_id_snapshot', 'started_at', 'path', 'point_count', 'last_point', 'distance_km', 'finalized_at')
+
 @admin.register(RiderEarning)
 class RiderEarningAdmin(admin.ModelAdmin):
     list_display = ('rider', 'order_id_str', 'base_fee', 'tip', 'total_earning', 'status')
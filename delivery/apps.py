@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DeliveryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'delivery'
+
+    def ready(self):
+        # Rider geo index sync signals register karein
+        from . import signals  # noqa: F401
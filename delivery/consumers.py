@@ -1,61 +1,89 @@
 # quickdash_project/delivery/consumers.py
+"""
+--- UPDATED: Native async consumers ---
+Har socket ab thread nahi pakadta: group operations seedha await hote hain,
+aur blocking kaam (ownership check, location buffer)
+shared thread pool mein chalta hai (thread_sensitive=False, taaki saare
+sockets ek hi DB thread par line mein na lagein).
+Customer ka ownership check bulk status cache (orders/status_cache.py)
+se hota hai: cache hit par DB query nahi.
+"""
 import json
 import logging # <-- ADD
-from channels.generic.websocket import WebsocketConsumer
-from asgiref.sync import async_to_sync
-
-# --- SECURITY UPDATE ---
-# In models ko import karein taaki hum user ko check kar sakein
-from orders.models import Order
-from delivery.models import RiderProfile
-# --- END SECURITY UPDATE ---
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 
 # Setup logger
 logger = logging.getLogger(__name__) # <-- ADD
 
 
-class RiderNotificationConsumer(WebsocketConsumer):
+def in_thread(func):
+    """Blocking (ORM / cache / Redis) call ko thread pool mein await-able banata hai."""
+    return database_sync_to_async(func, thread_sensitive=False)
+
+
+def _rider_profile_id(user_id):
+    # Token claims mein rider profile nahi tha (e.g. login ke baad approve hua)
+    from accounts.identity import get_identity
+    identity = get_identity(user_id) or {}
+    return identity.get('rider_profile_id')
+
+
+def _order_owner_id(order_id):
+    """Order ka user_id (cached status entry se; miss par ek query). Order na ho toh None."""
+    from orders.status_cache import get_status_entries
+    entry = get_status_entries([order_id]).get(order_id)
+    return entry['user_id'] if entry else None
+
+
+class RiderNotificationConsumer(AsyncWebsocketConsumer):
     
-    def connect(self):
+    async def connect(self):
         """
         Jab rider ka app WebSocket se connect hota hai.
         """
         # --- SECURITY UPDATE ---
-        # AuthenticationMiddleware (jo aapne asgi.py mein lagaya hai)
-        # self.scope['user'] mein user object daal deta hai.
+        # JWTAuthMiddleware (accounts/ws_auth.py) self.scope['user'] aur
+        # 'rider_profile_id' daal deta hai (token claims / cached identity se).
         self.user = self.scope['user']
 
         # Check karein ki user authenticated hai aur uske paas RiderProfile hai
-        if not (self.user and self.user.is_authenticated and hasattr(self.user, 'rider_profile')):
+        rider_profile_id = None
+        if self.user and self.user.is_authenticated:
+            rider_profile_id = self.scope.get('rider_profile_id')
+            if not rider_profile_id:
+                rider_profile_id = await in_thread(_rider_profile_id)(self.user.id)
+        if not rider_profile_id:
             
             # Agar nahi, toh connection reject kar dein
-            self.close() # Self.close() likha tha, use self.close() kar diya
+            await self.close() # Self.close() likha tha, use self.close() kar diya
             return
         
-        self.rider_profile = self.user.rider_profile
-        self.rider_group_name = f"rider_{self.rider_profile.id}"
+        self.rider_profile_id = rider_profile_id
+        self.rider_group_name = f"rider_{self.rider_profile_id}"
         # --- END SECURITY UPDATE ---
 
         # Har online rider ko "online_riders" group mein shaamil karo (Fallback ke liye)
-        async_to_sync(self.channel_layer.group_add)(
+        await self.channel_layer.group_add(
             "online_riders",
             self.channel_name
         )
         
         # --- STEP 4.1: Rider ko uske personal group mein add karo ---
-        async_to_sync(self.channel_layer.group_add)(
+        await self.channel_layer.group_add(
             self.rider_group_name,
             self.channel_name
         )
         # --- End STEP 4.1 ---
         
-        self.accept()
+        await self.accept(self.scope.get('auth_subprotocol'))
         # Log mein username print karein, channel_name nahi
         # --- FIX: Replaced self.user.username with self.user.id ---
         logger.info(f"Rider connected: (User ID: {self.user.id}). Added to 'online_riders' and '{self.rider_group_name}'.")
 
 
-    def disconnect(self, close_code):
+    async def disconnect(self, close_code):
         """
         Jab rider disconnect hota hai.
         """
@@ -63,13 +91,13 @@ class RiderNotificationConsumer(WebsocketConsumer):
         # Agar user valid tha (connect ho paaya tha), tabhi group se discard karein
         if hasattr(self, 'user') and self.user.is_authenticated and hasattr(self, 'rider_group_name'):
         # --- END SECURITY UPDATE ---
-            async_to_sync(self.channel_layer.group_discard)(
+            await self.channel_layer.group_discard(
                 "online_riders",
                 self.channel_name
             )
             
             # --- STEP 4.2: Rider ko uske personal group se remove karo ---
-            async_to_sync(self.channel_layer.group_discard)(
+            await self.channel_layer.group_discard(
                 self.rider_group_name,
                 self.channel_name
             )
@@ -78,9 +106,67 @@ class RiderNotificationConsumer(WebsocketConsumer):
             # --- FIX: Replaced self.user.username with self.user.id ---
             logger.info(f"Rider disconnected: (User ID: {self.user.id}). Removed from groups.")
 
+    # --- NAYA: Rider app se aane wale frames ---
+
+    async def receive(self, text_data=None, bytes_data=None):
+        """
+        Rider app se frames. Abhi sirf LOCATION:
+        {"type": "LOCATION", "samples": [{"latitude": .., "longitude": .., "timestamp": ..}, ...]}
+        (ya ek sample seedha: {"type": "LOCATION", "latitude": .., "longitude": ..}).
+        Samples location buffer (locations.py) mein jaate hain aur sabse naya
+        sample customer tracking group ko. HTTP RiderLocationUpdateView fallback hai.
+        """
+        if not hasattr(self, 'rider_profile_id'):
+            return
+        try:
+            frame = json.loads(text_data or '')
+        except (TypeError, ValueError):
+            await self.send_error('Invalid JSON frame.')
+            return
+        if not isinstance(frame, dict):
+            await self.send_error('Invalid frame.')
+            return
+
+        if frame.get('type') == 'LOCATION':
+            await self.handle_location_frame(frame)
+        else:
+            await self.send_error(f"Unknown frame type: {frame.get('type')}")
+
+    async def handle_location_frame(self, frame):
+        from .locations import broadcast_rider_location_async, normalize_samples, record_pings
+
+        raw_samples = frame.get('samples')
+        if raw_samples is None:
+            raw_samples = [frame]
+        if not isinstance(raw_samples, list) or not raw_samples:
+            await self.send_error("'samples' ek non-empty list honi chahiye.")
+            return
+        if len(raw_samples) > settings.RIDER_WS_MAX_SAMPLES_PER_FRAME:
+            await self.send_error(f"Ek frame mein max {settings.RIDER_WS_MAX_SAMPLES_PER_FRAME} samples.")
+            return
+        try:
+            samples = normalize_samples(raw_samples)
+        except ValueError as e:
+            await self.send_error(str(e))
+            return
+
+        # Window ke bahar wale samples drop; naya position na ho toh broadcast nahi
+        if not samples or not await in_thread(record_pings)(self.rider_profile_id, samples):
+            await self.send(text_data=json.dumps({'type': 'LOCATION_ACK', 'accepted': len(samples)}))
+            return
+
+        # Customer fan-out (active order cache se)
+        latitude, longitude, _timestamp = samples[-1]
+        await broadcast_rider_location_async(self.rider_profile_id, latitude, longitude)
+
+        await self.send(text_data=json.dumps({'type': 'LOCATION_ACK', 'accepted': len(samples)}))
+
+    async def send_error(self, message):
+        await self.send(text_data=json.dumps({'type': 'ERROR', 'error': message}))
+
     # --- Group se message receive karne wale handlers ---
 
-    def new_delivery_notification(self, event):
+    async def new_delivery_notification(self, event):
         """
         Yeh function tab call hoga jab 'online_riders' ya 'rider_...' group ko
         'type': 'new.delivery.notification' ka message milta hai.
@@ -88,7 +174,7 @@ class RiderNotificationConsumer(WebsocketConsumer):
         delivery_data = event['delivery']
         
         # Rider ke app (client) ko JSON message bhejo
-        self.send(text_data=json.dumps({
+        await self.send(text_data=json.dumps({
             'type': 'NEW_DELIVERY',
             'payload': delivery_data
         }))
@@ -96,9 +182,9 @@ class RiderNotificationConsumer(WebsocketConsumer):
         logger.info(f"Sent NEW_DELIVERY notification to User ID: {self.user.id}")
 
 
-class CustomerTrackingConsumer(WebsocketConsumer):
+class CustomerTrackingConsumer(AsyncWebsocketConsumer):
     
-    def connect(self):
+    async def connect(self):
         """
         Jab customer 'Track Order' screen kholta hai.
         """
@@ -113,47 +199,50 @@ class CustomerTrackingConsumer(WebsocketConsumer):
         # --- SECURITY UPDATE ---
         # Check karein ki user authenticated hai
         if not (self.user and self.user.is_authenticated):
-            self.close()
+            await self.close()
             return
 
         try:
             # Check karein ki jo order_id URL mein hai, 
             # woh isi user ka hai ya nahi.
-            if not Order.objects.filter(order_id=self.order_id, user=self.user).exists():
+            # --- UPDATED: Cached status entry se (orders/status_cache.py) ---
+            owner_id = await in_thread(_order_owner_id)(self.order_id)
+            # TokenUser ka id token claim hai (str ho sakta hai)
+            if owner_id is None or str(owner_id) != str(self.user.id):
                 # Agar user kisi aur ka order track karne ki koshish kar raha hai
-                self.close()
+                await self.close()
                 return
         except Exception as e:
             # Koi aur error (e.g., invalid order_id format)
             # --- FIX: Replaced self.user.username with self.user.id ---
             logger.warning(f"CustomerTrackingConsumer connect error for User ID {self.user.id} on order {self.order_id}: {e}")
-            self.close()
+            await self.close()
             return
         # --- END SECURITY UPDATE ---
         
         # Customer ko uske specific order ke group mein add karein
-        async_to_sync(self.channel_layer.group_add)(
+        await self.channel_layer.group_add(
             self.order_group_name,
             self.channel_name
         )
 
-        self.accept()
+        await self.accept(self.scope.get('auth_subprotocol'))
         # --- FIX: Replaced self.user.username with self.user.id ---
         logger.info(f"Customer connected: (User ID: {self.user.id}). Added to '{self.order_group_name}'.")
 
-    def disconnect(self, close_code):
+    async def disconnect(self, close_code):
         # --- SECURITY UPDATE ---
         # Agar user valid tha, tabhi group se discard karein
         if hasattr(self, 'order_group_name') and hasattr(self, 'user'): # <-- Added user check
         # --- END SECURITY UPDATE ---
-            async_to_sync(self.channel_layer.group_discard)(
+            await self.channel_layer.group_discard(
                 self.order_group_name,
                 self.channel_name
             )
             # --- FIX: Replaced self.user.username with self.user.id ---
             logger.info(f"Customer disconnected: (User ID: {self.user.id}). Removed from '{self.order_group_name}'.")
 
-    def rider_location_update(self, event):
+    async def rider_location_update(self, event):
         """
         Yeh function tab call hoga jab 'order_...' group ko
         'type': 'rider.location.update' ka message milta hai.
@@ -161,8 +250,20 @@ class CustomerTrackingConsumer(WebsocketConsumer):
         location_data = event['location']
         
         # Customer ke app (client) ko JSON message bhejo
-        self.send(text_data=json.dumps({
+        await self.send(text_data=json.dumps({
             'type': 'RIDER_LOCATION',
             'payload': location_data
         }))
-        logger.info(f"Sent RIDER_LOCATION notification to {self.channel_name}") # <-- CHANGED
+        # Har ping par aata hai, isliye debug level
+        logger.debug(f"Sent RIDER_LOCATION notification to {self.channel_name}") # <-- CHANGED
+
+    async def order_status_update(self, event):
+        """
+        Yeh function tab call hoga jab 'order_...' group ko
+        'type': 'order.status.update' ka message milta hai
+        (e.g., async order confirmation ka result).
+        """
+        await self.send(text_data=json.dumps({
+            'type': 'ORDER_STATUS',
+            'payload': event['order']
+        }))
@@ -0,0 +1,314 @@
+# delivery/dispatch.py
+"""
+Batch dispatch engine.
+
+Pehle READY order RIDER_NOTIFY_LIMIT nearest riders ko broadcast hota tha
+aur jo pehle AcceptDeliveryView hit kare woh jeetta tha (baaki riders ka
+race, aur doosre orders PENDING_ACCEPTANCE mein padhe rehte). Ab
+'dispatch_pending_deliveries' task har DISPATCH_TICK_SECONDS chalta hai:
+
+1. Saari unassigned PENDING_ACCEPTANCE deliveries (jinka offer pending nahi)
+2. Har store ke liye ek GEOSEARCH (geo_index.py) se idle riders + distance
+3. Cost matrix (deliveries x riders), NumPy se:
+     distance_km * DISPATCH_WEIGHT_DISTANCE
+   + (5 - rating) * DISPATCH_WEIGHT_RATING
+   - wait_minutes * DISPATCH_WEIGHT_WAIT
+   Delivery ke radius (retry_radius_km) ke bahar / pehle offer ho chuka (rider ne timeout kiya) pair = infeasible.
+4. Hungarian algorithm (solve_assignment) se min-cost matching
+5. Har matched rider ko sirf uski delivery ka targeted offer
+   ('rider_<id>' group), DISPATCH_OFFER_TIMEOUT_SECONDS ke liye.
+
+Offer Redis mein 'dispatch_offer_<delivery_id>' -> rider_id (aur ulta
+'dispatch_rider_offer_<rider_id>') TTL ke saath rehta hai. Offer ke dauraan
+AcceptDeliveryView doosre riders ko seedha mana kar deta hai (row lock tak
+nahi pahunchte). Timeout par offer expire ho jaata hai aur agla tick us
+delivery ko agle best rider se match karta hai.
+"""
+import logging
+import time
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .geo_index import nearby_idle_riders
+from .models import Delivery, RiderProfile
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = 'dispatch_tick_lock'
+MAX_RATING = 5.0
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def offer_key(delivery_id):
+    return f"dispatch_offer_{delivery_id}"
+
+
+def rider_offer_key(rider_id):
+    return f"dispatch_rider_offer_{rider_id}"
+
+
+def tried_key(delivery_id):
+    return f"dispatch_tried_{delivery_id}"
+
+
+# --- Assignment solver ---
+
+def solve_assignment(cost):
+    """
+    Rectangular min-cost assignment (Hungarian, shortest augmenting path
+    with potentials). Inner loop NumPy se vectorized: O(n^2 * m).
+    Return: [(row, col)] -- har row/col zyada se zyada ek baar.
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.size == 0:
+        return []
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)     # p[j]: column j par kaunsi row (1-based, 0 = khali)
+    way = np.zeros(m + 1, dtype=int)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used
+            free[0] = False
+            reduced = np.empty(m + 1)
+            reduced[0] = np.inf
+            reduced[1:] = cost[i0 - 1] - u[i0] - v[1:]
+
+            better = free & (reduced < minv)
+            minv[better] = reduced[better]
+            way[better] = j0
+
+            candidates = np.where(free, minv, np.inf)
+            j1 = int(np.argmin(candidates))
+            delta = candidates[j1]
+
+            used_cols = np.nonzero(used)[0]
+            u[p[used_cols]] += delta
+            v[used_cols] -= delta
+            minv[free] -= delta
+
+            j0 = j1
+            if p[j0] == 0:
+                break
+
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    pairs = [(int(p[j]) - 1, j - 1) for j in range(1, m + 1) if p[j]]
+    if transposed:
+        pairs = [(col, row) for row, col in pairs]
+    return sorted(pairs)
+
+
+def build_cost_matrix(distances_km, ratings, wait_minutes):
+    """
+    distances_km: (deliveries x riders), infeasible = inf.
+    ratings: (riders,), wait_minutes: (deliveries,).
+    Return: (cost matrix with infeasible = big finite, feasible mask).
+    """
+    distances_km = np.asarray(distances_km, dtype=float)
+    feasible = np.isfinite(distances_km)
+    cost = (
+        settings.DISPATCH_WEIGHT_DISTANCE * np.where(feasible, distances_km, 0.0)
+        + settings.DISPATCH_WEIGHT_RATING * (MAX_RATING - np.asarray(ratings, dtype=float))[None, :]
+        - settings.DISPATCH_WEIGHT_WAIT * np.asarray(wait_minutes, dtype=float)[:, None]
+    )
+    # Infeasible pair itna mehenga ho ki ek bhi feasible match chhodna kabhi sasta na pade
+    spread = float(np.abs(cost[feasible]).max()) if feasible.any() else 1.0
+    big = (spread + 1.0) * (min(cost.shape) + 1) * 2
+    return np.where(feasible, cost, big), feasible
+
+
+# --- Offers ---
+
+def offered_rider_id(delivery_id):
+    """Delivery ka pending offer kis rider ko hai (ya None). Redis fail = None."""
+    try:
+        value = _redis().get(offer_key(delivery_id))
+    except Exception as e:
+        logger.warning(f"Dispatch offer read fail (delivery {delivery_id}): {e}")
+        return None
+    return int(value) if value else None
+
+
+def release_offer(delivery_id, rider_id):
+    """Accept ke baad offer keys hata do."""
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        pipe.delete(offer_key(delivery_id), tried_key(delivery_id))
+        pipe.delete(rider_offer_key(rider_id))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Dispatch offer release fail (delivery {delivery_id}): {e}")
+
+
+def _pending_deliveries(client):
+    """Unassigned deliveries jinka offer abhi pending nahi (oldest first)."""
+    deliveries = list(
+        Delivery.objects.filter(
+            status=Delivery.DeliveryStatus.PENDING_ACCEPTANCE,
+            rider__isnull=True,
+            order__store__location__isnull=False,
+        ).select_related('order__store', 'order__delivery_address')
+        .prefetch_related('order__payments')
+        .order_by('updated_at')[:settings.DISPATCH_MAX_BATCH]
+    )
+    if not deliveries:
+        return []
+    offers = client.mget([offer_key(delivery.id) for delivery in deliveries])
+    return [delivery for delivery, offer in zip(deliveries, offers) if offer is None]
+
+
+def _candidate_riders(client, deliveries):
+    """
+    Store-wise GEOSEARCH se riders. Return: (rider_ids, distances matrix,
+    ratings). Jin riders ka offer pending hai ya jo delivery pehle hi
+    offer ho chuki, woh pair infeasible.
+    """
+    # Har delivery ka radius retry escalation (retries.py) se badh sakta hai;
+    # store ke liye sabse bada radius ek GEOSEARCH mein
+    radii = [delivery.retry_radius_km or settings.RIDER_SEARCH_RADIUS_KM for delivery in deliveries]
+    store_radius = {}
+    for delivery, radius in zip(deliveries, radii):
+        store = delivery.order.store
+        store_radius[store.id] = max(store_radius.get(store.id, 0), radius)
+    per_store = {}
+    for delivery in deliveries:
+        store = delivery.order.store
+        if store.id not in per_store:
+            per_store[store.id] = dict(nearby_idle_riders(
+                store.location,
+                radius_km=store_radius[store.id],
+                limit=settings.DISPATCH_CANDIDATES_PER_STORE,
+            ))
+
+    rider_ids = sorted({rider_id for riders in per_store.values() for rider_id in riders})
+    if not rider_ids:
+        return [], None, None
+
+    pipe = client.pipeline(transaction=False)
+    for rider_id in rider_ids:
+        pipe.exists(rider_offer_key(rider_id))
+    for delivery in deliveries:
+        pipe.smembers(tried_key(delivery.id))
+    results = pipe.execute()
+    busy = {rider_id for rider_id, offered in zip(rider_ids, results[:len(rider_ids)]) if offered}
+    tried = [{int(rider_id) for rider_id in members} for members in results[len(rider_ids):]]
+
+    # DB se confirm (geo index thoda stale ho sakta hai) + ratings, ek query
+    ratings = dict(
+        RiderProfile.objects.filter(
+            id__in=[rider_id for rider_id in rider_ids if rider_id not in busy],
+            user__is_active=True,
+            is_online=True,
+            on_delivery=False,
+        ).values_list('id', 'rating')
+    )
+    rider_ids = [rider_id for rider_id in rider_ids if rider_id in ratings]
+    if not rider_ids:
+        return [], None, None
+
+    distances = np.full((len(deliveries), len(rider_ids)), np.inf)
+    for row, delivery in enumerate(deliveries):
+        store_riders = per_store[delivery.order.store.id]
+        for col, rider_id in enumerate(rider_ids):
+            if rider_id in store_riders and rider_id not in tried[row] and store_riders[rider_id] <= radii[row]:
+                distances[row, col] = store_riders[rider_id]
+
+    rating_values = [float(ratings[rider_id]) if ratings[rider_id] is not None else MAX_RATING for rider_id in rider_ids]
+    return rider_ids, distances, rating_values
+
+
+def _send_offers(client, matches):
+    """matches: [(delivery, rider_id, distance_km)]. Return: kitne offers gaye."""
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+
+    from .serializers import RiderDeliverySerializer
+
+    timeout = settings.DISPATCH_OFFER_TIMEOUT_SECONDS
+    channel_layer = get_channel_layer()
+    expires_at = int(time.time()) + timeout
+    sent = 0
+    for delivery, rider_id, distance_km in matches:
+        pipe = client.pipeline(transaction=True)
+        pipe.set(offer_key(delivery.id), rider_id, nx=True, ex=timeout)
+        pipe.set(rider_offer_key(rider_id), delivery.id, ex=timeout)
+        pipe.sadd(tried_key(delivery.id), rider_id)
+        pipe.expire(tried_key(delivery.id), settings.DISPATCH_TRIED_TTL_SECONDS)
+        if not pipe.execute()[0]:
+            continue
+
+        payload = dict(RiderDeliverySerializer(delivery).data)
+        payload['distance_to_store'] = round(distance_km * 1000, 1)
+        payload['offer_expires_at'] = expires_at
+        try:
+            async_to_sync(channel_layer.group_send)(
+                f"rider_{rider_id}",
+                {
+                    "type": "new.delivery.notification",
+                    "delivery": payload
+                }
+            )
+        except Exception as e:
+            logger.error(f"Dispatch offer send fail (delivery {delivery.id}, rider {rider_id}): {e}")
+        sent += 1
+    return sent
+
+
+def run_dispatch_tick():
+    """
+    Ek dispatch round. Ek waqt par ek hi tick (Redis lock).
+    Return: bheje gaye offers count.
+    """
+    client = _redis()
+    lock = client.lock(LOCK_KEY, timeout=max(settings.DISPATCH_TICK_SECONDS * 4, 30), blocking_timeout=0)
+    if not lock.acquire(blocking=False):
+        logger.info("Dispatch tick skipped: pichla tick abhi chal raha hai.")
+        return 0
+    try:
+        deliveries = _pending_deliveries(client)
+        if not deliveries:
+            return 0
+        rider_ids, distances, ratings = _candidate_riders(client, deliveries)
+        if not rider_ids:
+            logger.info(f"Dispatch: {len(deliveries)} pending deliveries, koi idle rider available nahi.")
+            return 0
+
+        now = timezone.now()
+        wait_minutes = [(now - delivery.updated_at).total_seconds() / 60 for delivery in deliveries]
+        cost, feasible = build_cost_matrix(distances, ratings, wait_minutes)
+        matches = [
+            (deliveries[row], rider_ids[col], float(distances[row, col]))
+            for row, col in solve_assignment(cost)
+            if feasible[row, col]
+        ]
+        sent = _send_offers(client, matches)
+        logger.info(f"Dispatch: {len(deliveries)} deliveries, {len(rider_ids)} riders, {sent} offers sent.")
+        return sent
+    finally:
+        try:
+            lock.release()
+        except Exception:
+            pass
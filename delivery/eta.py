@@ -0,0 +1,283 @@
+# delivery/eta.py
+"""
+ETA service (Delivery.estimated_delivery_time).
+
+Delivery ke chaar segments hain:
+  to_accept   : delivery bani (order confirm) -> rider ne accept kiya (prep + dispatch)
+  to_store    : accepted_at -> at_store_at
+  at_store    : at_store_at -> picked_up_at
+  to_customer : picked_up_at -> delivered_at
+
+'fit_eta_model' task pichle ETA_LOOKBACK_DAYS ki delivered deliveries se
+har cell ke liye segment durations ka ETA_QUANTILE (default P80, yaani
+"promise" jo 80% baar poora ho) NumPy se nikalta hai. Cells:
+  (store, hour-of-week bucket, distance band)
+  (store, *, distance band)
+  (*, *, distance band)
+  (*, *, *)
+Jis cell mein ETA_MIN_SAMPLES se kam deliveries hon woh table mein nahi
+aata; lookup agle (zyada general) cell par gir jaata hai, aur table hi na
+ho toh fee service ke travel time se default.
+
+Scheduled slot wale order (orders/fulfilment.py) ki picking slot se
+SLOT_RELEASE_LEAD_MINUTES pehle shuru hoti hai: release se pehle ETA
+release time se ginta hai, aur ETA slot start se pehle kabhi nahi hota.
+
+Table cache mein 'eta_table' key par rehta hai aur har process mein
+ETA_LOCAL_CACHE_SECONDS ke liye memory mein bhi, isliye prediction
+(checkout, cart quote, har status transition) sirf dict lookups hai.
+"""
+import bisect
+import logging
+import math
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from orders.fees import EARTH_RADIUS_KM, haversine_km, travel_minutes_for_distance
+from orders.fulfilment import release_at
+from .models import Delivery
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+ETA_TABLE_KEY = 'eta_table'
+SEGMENTS = ('to_accept', 'to_store', 'at_store', 'to_customer')
+
+Status = Delivery.DeliveryStatus
+
+# Delivery status -> kaunse segment se aage ka time bacha hai
+STAGE_FOR_STATUS = {
+    Status.AWAITING_PREPARATION: 0,
+    Status.PENDING_ACCEPTANCE: 0,
+    Status.ACCEPTED: 1,
+    Status.AT_STORE: 2,
+    Status.PICKED_UP: 3,
+}
+# Har stage kis timestamp se shuru hua
+STAGE_STARTED_FIELD = ('created_at', 'accepted_at', 'at_store_at', 'picked_up_at')
+
+# Process-local copy (har prediction par cache round trip nahi)
+_local_table = {'table': None, 'loaded_at': None}
+
+
+def hour_of_week_bucket(when, bucket_size=None):
+    local = timezone.localtime(when)
+    return (local.weekday() * 24 + local.hour) // (bucket_size or settings.ETA_HOUR_BUCKET_SIZE)
+
+
+def distance_band(distance_km, bands=None):
+    """Distance band index (0..len(bands)); distance na ho toh None."""
+    if distance_km is None:
+        return None
+    return bisect.bisect_right(bands or settings.ETA_DISTANCE_BANDS_KM, distance_km)
+
+
+def default_segments(distance_km):
+    """Table na ho tab ke liye fixed estimate (minutes)."""
+    to_customer = travel_minutes_for_distance(distance_km) if distance_km is not None else settings.ETA_DEFAULT_TO_CUSTOMER_MINUTES
+    return [
+        settings.ETA_DEFAULT_TO_ACCEPT_MINUTES,
+        settings.ETA_DEFAULT_TO_STORE_MINUTES,
+        settings.ETA_DEFAULT_AT_STORE_MINUTES,
+        to_customer,
+    ]
+
+
+# --- Fitting ---
+
+def _haversine_km_array(lat1, lng1, lat2, lng2):
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(lng2 - lng1)
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _group_quantiles(keys, segments, quantile, min_samples):
+    """keys: (N, k) int array. Return: {key tuple: [minutes per segment]}."""
+    unique, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    order = np.argsort(inverse, kind='stable')
+    groups = np.split(segments[order], np.cumsum(counts)[:-1])
+    cells = {}
+    for key, count, group in zip(unique, counts, groups):
+        if count < min_samples:
+            continue
+        cells[tuple(int(part) for part in key)] = [round(float(value), 1) for value in np.quantile(group, quantile, axis=0)]
+    return cells
+
+
+def fit_eta_table():
+    """
+    Historical deliveries se quantile table banata hai aur cache mein rakhta hai.
+    Return: table dict (ya None agar data nahi).
+    """
+    since = timezone.now() - timedelta(days=settings.ETA_LOOKBACK_DAYS)
+    rows = Delivery.objects.filter(
+        status=Status.DELIVERED,
+        delivered_at__gte=since,
+        accepted_at__isnull=False,
+        at_store_at__isnull=False,
+        picked_up_at__isnull=False,
+    ).values_list(
+        'order__store_id', 'created_at', 'accepted_at', 'at_store_at', 'picked_up_at', 'delivered_at',
+        'order__store__location', 'order__delivery_address__location'
+    ).iterator(chunk_size=5000)
+
+    store_ids, hours, stamps, coords = [], [], [], []
+    for store_id, created_at, accepted_at, at_store_at, picked_up_at, delivered_at, store_location, address_location in rows:
+        store_ids.append(store_id)
+        hours.append(hour_of_week_bucket(created_at))
+        stamps.append([stamp.timestamp() for stamp in (created_at, accepted_at, at_store_at, picked_up_at, delivered_at)])
+        if store_location and address_location:
+            coords.append([store_location.y, store_location.x, address_location.y, address_location.x])
+        else:
+            coords.append([np.nan] * 4)
+    if not store_ids:
+        return None
+
+    segments = np.diff(np.asarray(stamps, dtype=float), axis=1) / 60.0
+    coords = np.asarray(coords, dtype=float)
+    distances = _haversine_km_array(coords[:, 0], coords[:, 1], coords[:, 2], coords[:, 3])
+
+    # Galat / outlier rows (clock skew, bhool se late mark) bahar
+    valid = np.all((segments >= 0) & (segments <= settings.ETA_MAX_SEGMENT_MINUTES), axis=1) & ~np.isnan(distances)
+    if not valid.any():
+        return None
+    segments = segments[valid]
+    bands = np.searchsorted(np.asarray(settings.ETA_DISTANCE_BANDS_KM), distances[valid], side='right')
+    store_ids = np.asarray(store_ids)[valid]
+    hours = np.asarray(hours)[valid]
+    wildcard = np.full(len(segments), -1)
+
+    quantile = settings.ETA_QUANTILE
+    min_samples = settings.ETA_MIN_SAMPLES
+    cells = {}
+    for columns in (
+        (store_ids, hours, bands),
+        (store_ids, wildcard, bands),
+        (wildcard, wildcard, bands),
+        (wildcard, wildcard, wildcard),
+    ):
+        cells.update(_group_quantiles(np.column_stack(columns), segments, quantile, min_samples))
+
+    table = {
+        'fitted_at': timezone.now().isoformat(),
+        'samples': int(len(segments)),
+        'quantile': quantile,
+        'bands': list(settings.ETA_DISTANCE_BANDS_KM),
+        'bucket_size': settings.ETA_HOUR_BUCKET_SIZE,
+        'cells': cells,
+    }
+    cache.set(ETA_TABLE_KEY, table, timeout=None)
+    _local_table.update(table=table, loaded_at=time.monotonic())
+    return table
+
+
+# --- Prediction ---
+
+def get_eta_table():
+    loaded_at = _local_table['loaded_at']
+    if loaded_at is not None and time.monotonic() - loaded_at < settings.ETA_LOCAL_CACHE_SECONDS:
+        return _local_table['table']
+    try:
+        table = cache.get(ETA_TABLE_KEY)
+    except Exception as e:
+        logger.warning(f"ETA table cache read fail: {e}")
+        table = _local_table['table']
+    _local_table.update(table=table, loaded_at=time.monotonic())
+    return table
+
+
+def segment_minutes(store_id, distance_km, when=None):
+    """Store / time / distance ke liye har segment ke minutes (sabse specific cell se)."""
+    table = get_eta_table()
+    if not table:
+        return default_segments(distance_km)
+    band = distance_band(distance_km, table['bands'])
+    if band is None:
+        band = -1
+    hour = hour_of_week_bucket(when or timezone.now(), table['bucket_size'])
+    cells = table['cells']
+    for key in ((store_id, hour, band), (store_id, -1, band), (-1, -1, band), (-1, -1, -1)):
+        minutes = cells.get(key)
+        if minutes:
+            return minutes
+    return default_segments(distance_km)
+
+
+def predict_eta(store_id, distance_km, status=Status.AWAITING_PREPARATION, stage_started_at=None, now=None, slot_start_at=None):
+    """
+    Delivered hone ka andaazan time (datetime). Current stage mein jitna time
+    beet chuka hai woh us segment se ghata diya jaata hai.
+    slot_start_at (scheduled order): release se pehle ginti release time se,
+    aur result slot start se pehle nahi.
+    Terminal status (DELIVERED / CANCELLED) par None.
+    """
+    stage = STAGE_FOR_STATUS.get(status)
+    if stage is None:
+        return None
+    now = now or timezone.now()
+    if slot_start_at and stage == 0 and release_at(slot_start_at) > now:
+        # Picking abhi shuru nahi hui: poora pipeline release ke baad
+        now, stage_started_at = release_at(slot_start_at), None
+    minutes = segment_minutes(store_id, distance_km, when=stage_started_at or now)
+    remaining = sum(minutes[stage:])
+    if stage_started_at:
+        elapsed = (now - stage_started_at).total_seconds() / 60.0
+        remaining -= min(max(elapsed, 0.0), minutes[stage])
+    eta = now + timedelta(minutes=remaining)
+    if slot_start_at and eta < slot_start_at:
+        eta = slot_start_at
+    return eta
+
+
+def predict_eta_minutes(store_id, distance_km):
+    """Naye order ke liye ETA minutes mein (cart quote / checkout)."""
+    minutes = segment_minutes(store_id, distance_km)
+    return int(math.ceil(sum(minutes)))
+
+
+def order_distance_km(store_location, address_location):
+    if not store_location or not address_location:
+        return None
+    return haversine_km(store_location.y, store_location.x, address_location.y, address_location.x)
+
+
+def eta_for_order(order_pk):
+    """Confirm hote order ke liye ETA (ek query: store + address locations)."""
+    from orders.models import Order
+
+    row = Order.objects.filter(pk=order_pk).values_list(
+        'store_id', 'store__location', 'delivery_address__location', 'delivery_slot__start_at'
+    ).first()
+    if row is None:
+        return None
+    store_id, store_location, address_location, slot_start_at = row
+    return predict_eta(store_id, order_distance_km(store_location, address_location), slot_start_at=slot_start_at)
+
+
+def update_delivery_eta(delivery):
+    """
+    Status transition ke baad ETA dobara (outbox.py). delivery.order store /
+    address / slot ke saath loaded ho toh koi extra read nahi; ek UPDATE.
+    """
+    stage = STAGE_FOR_STATUS.get(delivery.status)
+    if stage is None:
+        return None
+    order = delivery.order
+    eta = predict_eta(
+        order.store_id,
+        order_distance_km(order.store.location, order.delivery_address.location if order.delivery_address else None),
+        status=delivery.status,
+        stage_started_at=getattr(delivery, STAGE_STARTED_FIELD[stage]),
+        slot_start_at=order.delivery_slot.start_at if order.delivery_slot_id else None,
+    )
+    Delivery.objects.filter(pk=delivery.pk).update(estimated_delivery_time=eta)
+    delivery.estimated_delivery_time = eta
+    return eta
@@ -0,0 +1,201 @@
+# delivery/geo_index.py
+"""
+Available riders ka live geo index (Redis GEO set).
+
+'rider_geo_eligible' set mein woh riders hain jo dispatch ke liye available
+hain: user active, is_online=True, on_delivery=False. RiderProfile save
+hone par (online/offline, delivery start/end) signals.py commit ke baad
+yeh set sync karta hai. Location pings (locations.py) sirf eligible
+riders ki position GEO set mein likhte hain (ek Lua script, ek round trip).
+'rider_geo_seen' sorted set mein har rider ka last ping time rehta hai;
+RIDER_GEO_STALE_SECONDS se purane riders GEO set se prune ho jaate hain
+(app band ho gaya par is_online abhi bhi True hai). Agla ping unhe wapas
+le aata hai.
+
+"Store ke R km mein k nearest idle riders" ek GEOSEARCH hai (Postgres
+query nahi). Redis down ho toh purani PostGIS query fallback hai.
+'rebuild_rider_geo_index' task index ko DB + last-known positions se
+poora dobara banata hai (drift / Redis restart ke liye).
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.measure import D
+from django_redis import get_redis_connection
+
+from .models import RiderProfile
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+GEO_KEY = 'rider_geo_idle'
+SEEN_KEY = 'rider_geo_seen'
+ELIGIBLE_KEY = 'rider_geo_eligible'
+
+# Ping: rider eligible ho tabhi GEO set aur seen time update (atomic)
+INDEX_PING_LUA = """
+if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then
+    redis.call('GEOADD', KEYS[2], ARGV[2], ARGV[3], ARGV[1])
+    redis.call('ZADD', KEYS[3], ARGV[4], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def is_dispatchable(rider, user_is_active=True):
+    """Kya rider dispatch ke liye eligible hai? (location alag se check hoti hai)"""
+    return bool(user_is_active and rider.is_online and not rider.on_delivery)
+
+
+def index_ping(pipe, rider_id, longitude, latitude, timestamp):
+    """
+    Location ping ko index karta hai (caller ki pipeline mein).
+    Rider eligible na ho toh kuch nahi hota.
+    """
+    script = pipe.register_script(INDEX_PING_LUA)
+    script(keys=[ELIGIBLE_KEY, GEO_KEY, SEEN_KEY], args=[rider_id, longitude, latitude, timestamp], client=pipe)
+
+
+def sync_rider(rider, user_is_active=True):
+    """
+    RiderProfile ki current state ke hisaab se index update.
+    Position last-known buffer (locations.py) se, na ho toh DB se.
+    Best-effort: Redis fail ho toh sirf log (rebuild task sync kar dega).
+    """
+    from .locations import last_known_positions
+
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        if is_dispatchable(rider, user_is_active):
+            pipe.sadd(ELIGIBLE_KEY, rider.id)
+            position = last_known_positions([rider.id]).get(rider.id)
+            if position:
+                pipe.geoadd(GEO_KEY, (position['longitude'], position['latitude'], rider.id))
+                pipe.zadd(SEEN_KEY, {rider.id: position['timestamp']})
+            elif rider.current_location:
+                pipe.geoadd(GEO_KEY, (rider.current_location.x, rider.current_location.y, rider.id))
+                pipe.zadd(SEEN_KEY, {rider.id: time.time()})
+        else:
+            pipe.srem(ELIGIBLE_KEY, rider.id)
+            pipe.zrem(GEO_KEY, rider.id)
+            pipe.zrem(SEEN_KEY, rider.id)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Rider geo index update fail (rider {rider.id}): {e}")
+
+
+def remove_rider(rider_id):
+    """Rider ko index se poora hata deta hai (profile delete)."""
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        pipe.srem(ELIGIBLE_KEY, rider_id)
+        pipe.zrem(GEO_KEY, rider_id)
+        pipe.zrem(SEEN_KEY, rider_id)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Rider geo index remove fail (rider {rider_id}): {e}")
+
+
+def _nearby_from_db(location, radius_km, limit):
+    """Fallback: purani PostGIS query."""
+    riders = RiderProfile.objects.filter(
+        user__is_active=True,
+        is_online=True,
+        on_delivery=False,
+        current_location__isnull=False,
+        current_location__distance_lte=(location, D(km=radius_km))
+    ).annotate(
+        distance_to_store=Distance('current_location', location)
+    ).order_by('distance_to_store').values_list('id', 'distance_to_store')[:limit]
+    return [(rider_id, distance.km) for rider_id, distance in riders]
+
+
+def nearby_idle_riders(location, radius_km=None, limit=None):
+    """
+    Location ke radius_km ke andar k nearest idle riders.
+    Return: [(rider_id, distance_km)] nazdeek se door.
+    """
+    radius_km = radius_km or settings.RIDER_SEARCH_RADIUS_KM
+    limit = limit or settings.RIDER_NOTIFY_LIMIT
+    try:
+        results = _redis().geosearch(
+            GEO_KEY,
+            longitude=location.x,
+            latitude=location.y,
+            radius=radius_km,
+            unit='km',
+            sort='ASC',
+            count=limit,
+            withdist=True,
+        )
+        return [(int(member), distance) for member, distance in results]
+    except Exception as e:
+        logger.warning(f"Rider geo index query fail, DB fallback: {e}")
+        return _nearby_from_db(location, radius_km, limit)
+
+
+def prune_stale_riders():
+    """RIDER_GEO_STALE_SECONDS se ping na karne wale riders hatata hai. Return: count."""
+    cutoff = time.time() - settings.RIDER_GEO_STALE_SECONDS
+    client = _redis()
+    stale = client.zrangebyscore(SEEN_KEY, '-inf', cutoff)
+    if not stale:
+        return 0
+    pipe = client.pipeline(transaction=False)
+    pipe.zrem(GEO_KEY, *stale)
+    pipe.zrem(SEEN_KEY, *stale)
+    pipe.execute()
+    return len(stale)
+
+
+def rebuild_index():
+    """
+    Index ko poora dobara banata hai (temp keys + atomic RENAME).
+    Eligible riders DB se; positions last-known buffer se, sirf woh jo
+    RIDER_GEO_STALE_SECONDS ke andar ping hue.
+    Return: GEO set mein indexed riders count.
+    """
+    from .locations import last_known_positions
+
+    rider_ids = list(
+        RiderProfile.objects.filter(
+            user__is_active=True,
+            is_online=True,
+            on_delivery=False
+        ).values_list('id', flat=True)
+    )
+    positions = last_known_positions(rider_ids)
+    cutoff = time.time() - settings.RIDER_GEO_STALE_SECONDS
+
+    eligible_tmp = f"{ELIGIBLE_KEY}_rebuild"
+    geo_tmp = f"{GEO_KEY}_rebuild"
+    seen_tmp = f"{SEEN_KEY}_rebuild"
+    client = _redis()
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(eligible_tmp, geo_tmp, seen_tmp)
+    count = 0
+    for rider_id in rider_ids:
+        pipe.sadd(eligible_tmp, rider_id)
+        position = positions.get(rider_id)
+        if position and position['timestamp'] >= cutoff:
+            pipe.geoadd(geo_tmp, (position['longitude'], position['latitude'], rider_id))
+            pipe.zadd(seen_tmp, {rider_id: position['timestamp']})
+            count += 1
+    if rider_ids:
+        pipe.rename(eligible_tmp, ELIGIBLE_KEY)
+    else:
+        pipe.delete(ELIGIBLE_KEY)
+    if count:
+        pipe.rename(geo_tmp, GEO_KEY)
+        pipe.rename(seen_tmp, SEEN_KEY)
+    else:
+        pipe.delete(GEO_KEY, SEEN_KEY, geo_tmp, seen_tmp)
+    pipe.execute()
+    return count
@@ -0,0 +1,244 @@
+# delivery/locations.py
+"""
+Rider location pings ka buffer (Redis).
+
+Har ping (RiderNotificationConsumer WebSocket frame, ya HTTP fallback
+RiderLocationUpdateView) Postgres mein nahi likha jaata:
+- 'rider_pos' hash: rider_id -> "lng,lat,timestamp" (last-known position)
+- 'rider_pos_dirty' set: jin riders ki position DB mein flush honi hai
+- 'rider_loc_stream' stream: saare pings (MAXLEN capped), trail/replay ke liye
+- Rider geo index (geo_index.py) bhi isi pipeline mein update hota hai
+
+'flush_rider_locations' task har RIDER_LOCATION_FLUSH_SECONDS par dirty
+riders ki positions ek bulk_update se RiderProfile.current_location mein
+likhta hai. Rider ka active order (tracking broadcast ke liye) cache mein
+rehta hai; Delivery save hone par signals.py use refresh karta hai.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django_redis import get_redis_connection
+
+from .geo_index import index_ping
+from .models import Delivery, RiderProfile
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+POSITIONS_KEY = 'rider_pos'
+DIRTY_KEY = 'rider_pos_dirty'
+STREAM_KEY = 'rider_loc_stream'
+
+ACTIVE_DELIVERY_STATUSES = (
+    Delivery.DeliveryStatus.ACCEPTED,
+    Delivery.DeliveryStatus.AT_STORE,
+    Delivery.DeliveryStatus.PICKED_UP,
+)
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _decode(value):
+    longitude, latitude, timestamp = (value.decode() if isinstance(value, bytes) else value).split(',')
+    return {'longitude': float(longitude), 'latitude': float(latitude), 'timestamp': float(timestamp)}
+
+
+def normalize_samples(raw_samples, now=None):
+    """
+    Client samples ([{'latitude', 'longitude', 'timestamp'?}]) ko validate
+    karke (latitude, longitude, timestamp) tuples banata hai, time order mein.
+    Galat sample ValueError deta hai. RIDER_LOCATION_MAX_SAMPLE_AGE se purana
+    sample drop hota hai (window ke bahar). Future timestamp 'now' par clamp
+    hota hai aur timestamp na ho toh bhi 'now'; stable sort ki wajah se aise
+    samples client ke order mein hi rehte hain, kisi purane sample ko naya
+    nahi banate. Saare samples drop ho jaayein toh empty list.
+    """
+    now = now or time.time()
+    oldest = now - settings.RIDER_LOCATION_MAX_SAMPLE_AGE
+    samples = []
+    for raw in raw_samples:
+        try:
+            latitude = float(raw['latitude'])
+            longitude = float(raw['longitude'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Har sample mein numeric 'latitude' aur 'longitude' chahiye.")
+        if not (-85.0 <= latitude <= 85.0 and -180.0 <= longitude <= 180.0):
+            raise ValueError("Latitude/longitude range ke bahar hai.")
+        try:
+            timestamp = float(raw.get('timestamp') or now)
+        except (TypeError, ValueError):
+            timestamp = now
+        if timestamp < oldest:
+            continue
+        samples.append((latitude, longitude, min(timestamp, now)))
+    samples.sort(key=lambda sample: sample[2])
+    return samples
+
+
+def record_pings(rider_id, samples):
+    """
+    Ek ya zyada location samples [(latitude, longitude, timestamp)] buffer
+    karta hai (ek pipeline). Saare samples stream mein jaate hain; last-known
+    position aur geo index sabse naye sample se, lekin sirf tab jab woh
+    stored position se naya ho (late aaya purana frame position peeche
+    nahi le jaata).
+    Redis fail ho toh seedha DB mein likhta hai (purana behaviour).
+    Return: True agar last-known position update hui (tab hi broadcast karein).
+    """
+    if not samples:
+        return False
+    latitude, longitude, timestamp = samples[-1]
+    try:
+        client = _redis()
+        stored = client.hget(POSITIONS_KEY, rider_id)
+        is_newest = stored is None or _decode(stored)['timestamp'] < timestamp
+        pipe = client.pipeline(transaction=False)
+        if is_newest:
+            pipe.hset(POSITIONS_KEY, rider_id, f"{longitude},{latitude},{timestamp}")
+            pipe.sadd(DIRTY_KEY, rider_id)
+            index_ping(pipe, rider_id, longitude, latitude, timestamp)
+        for sample_lat, sample_lng, sample_ts in samples:
+            pipe.xadd(
+                STREAM_KEY,
+                {'rider': rider_id, 'lat': sample_lat, 'lng': sample_lng, 'ts': sample_ts},
+                maxlen=settings.RIDER_LOCATION_STREAM_MAXLEN,
+                approximate=True
+            )
+        pipe.execute()
+        return is_newest
+    except Exception as e:
+        logger.warning(f"Location buffer fail (rider {rider_id}), DB mein likh rahe hain: {e}")
+        RiderProfile.objects.filter(id=rider_id).update(
+            current_location=Point(longitude, latitude, srid=4326)
+        )
+        return True
+
+
+def record_ping(rider_id, latitude, longitude):
+    """Ek single ping (HTTP fallback path). Return: record_pings jaisa."""
+    return record_pings(rider_id, [(latitude, longitude, time.time())])
+
+
+async def broadcast_rider_location_async(rider_id, latitude, longitude):
+    """
+    Rider ki active delivery ho toh customer ke tracking group ('order_<id>')
+    ko position bhejta hai. Best-effort. Consumer isse seedha await karta hai;
+    active order lookup thread pool mein chalta hai.
+    """
+    from channels.db import database_sync_to_async
+    from channels.layers import get_channel_layer
+
+    try:
+        order_id = await database_sync_to_async(active_order_id, thread_sensitive=False)(rider_id)
+        if order_id:
+            await get_channel_layer().group_send(
+                f"order_{order_id}",
+                {
+                    "type": "rider.location.update",
+                    "location": {'latitude': latitude, 'longitude': longitude}
+                }
+            )
+    except Exception as e:
+        logger.error(f"Error broadcasting location for rider {rider_id}: {e}")
+
+
+def broadcast_rider_location(rider_id, latitude, longitude):
+    """broadcast_rider_location_async ka sync wrapper (HTTP path)."""
+    from asgiref.sync import async_to_sync
+    async_to_sync(broadcast_rider_location_async)(rider_id, latitude, longitude)
+
+
+def last_known_positions(rider_ids):
+    """Rider id -> {'latitude', 'longitude', 'timestamp'} buffer se (ek HMGET)."""
+    rider_ids = list(rider_ids)
+    if not rider_ids:
+        return {}
+    try:
+        values = _redis().hmget(POSITIONS_KEY, rider_ids)
+    except Exception as e:
+        logger.warning(f"Last-known positions read fail: {e}")
+        return {}
+    return {
+        rider_id: _decode(value)
+        for rider_id, value in zip(rider_ids, values)
+        if value is not None
+    }
+
+
+def flush_positions(batch_size=None):
+    """
+    Dirty riders ki buffered positions ko RiderProfile.current_location mein
+    likhta hai (har batch ek bulk_update). Return: flushed riders count.
+    """
+    batch_size = batch_size or settings.RIDER_LOCATION_FLUSH_BATCH
+    client = _redis()
+    flushed = 0
+    while True:
+        rider_ids = [int(rider_id) for rider_id in client.spop(DIRTY_KEY, batch_size) or []]
+        if not rider_ids:
+            break
+        positions = last_known_positions(rider_ids)
+        profiles = [
+            RiderProfile(
+                id=rider_id,
+                current_location=Point(position['longitude'], position['latitude'], srid=4326)
+            )
+            for rider_id, position in positions.items()
+        ]
+        try:
+            RiderProfile.objects.bulk_update(profiles, ['current_location'])
+        except Exception:
+            # Agle run mein dobara try ho
+            client.sadd(DIRTY_KEY, *rider_ids)
+            raise
+        flushed += len(profiles)
+        if len(rider_ids) < batch_size:
+            break
+    return flushed
+
+
+# --- Rider -> active order (tracking broadcast) ---
+
+def active_order_key(rider_id):
+    return f"rider_active_order_{rider_id}"
+
+
+def active_order_id(rider_id):
+    """
+    Rider ki active delivery ka order_id (ya None). Cache se; miss par ek query.
+    'No active delivery' bhi cache hota hai (idle riders ke pings par query nahi).
+    """
+    key = active_order_key(rider_id)
+    try:
+        cached = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Active order cache read fail (rider {rider_id}): {e}")
+        cached = None
+    if cached is not None:
+        return cached or None
+
+    order_id = Delivery.objects.filter(
+        rider_id=rider_id,
+        status__in=ACTIVE_DELIVERY_STATUSES
+    ).values_list('order__order_id', flat=True).first()
+    try:
+        cache.set(key, order_id or '', timeout=settings.RIDER_ACTIVE_ORDER_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Active order cache set fail (rider {rider_id}): {e}")
+    return order_id
+
+
+def refresh_active_order(delivery):
+    """Delivery save ke baad (signals.py) rider ka active order cache update."""
+    if not delivery.rider_id:
+        return
+    order_id = delivery.order.order_id if delivery.status in ACTIVE_DELIVERY_STATUSES else ''
+    try:
+        cache.set(active_order_key(delivery.rider_id), order_id, timeout=settings.RIDER_ACTIVE_ORDER_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Active order cache set fail (rider {delivery.rider_id}): {e}")
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0003_riderprofile_approval_status'),
+        ('orders', '0005_order_archive_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='delivery',
+            name='retry_attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Kitni baar unassigned delivery ke liye riders dobara dhoondhe gaye'),
+        ),
+        migrations.AddField(
+            model_name='delivery',
+            name='retry_radius_km',
+            field=models.FloatField(blank=True, help_text='Current rider search radius (har retry par badhta hai)', null=True),
+        ),
+        migrations.AddField(
+            model_name='delivery',
+            name='retry_incentive',
+            field=models.DecimalField(decimal_places=2, default=0.0, help_text='Late acceptance ke liye rider ko extra kamai', max_digits=8),
+        ),
+        migrations.AddField(
+            model_name='delivery',
+            name='next_retry_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Agla retry isse pehle nahi (backoff)', null=True),
+        ),
+        # Archive table (orders/archive.py) ko live table ke saath sync rakhein
+        migrations.RunSQL(
+            [
+                "ALTER TABLE delivery_delivery_archive ADD COLUMN IF NOT EXISTS retry_attempts smallint NOT NULL DEFAULT 0;",
+                "ALTER TABLE delivery_delivery_archive ADD COLUMN IF NOT EXISTS retry_radius_km double precision NULL;",
+                "ALTER TABLE delivery_delivery_archive ADD COLUMN IF NOT EXISTS retry_incentive numeric(8, 2) NOT NULL DEFAULT 0;",
+                "ALTER TABLE delivery_delivery_archive ADD COLUMN IF NOT EXISTS next_retry_at timestamp with time zone NULL;",
+            ],
+            reverse_sql=[
+                "ALTER TABLE delivery_delivery_archive DROP COLUMN IF EXISTS next_retry_at;",
+                "ALTER TABLE delivery_delivery_archive DROP COLUMN IF EXISTS retry_incentive;",
+                "ALTER TABLE delivery_delivery_archive DROP COLUMN IF EXISTS retry_radius_km;",
+                "ALTER TABLE delivery_delivery_archive DROP COLUMN IF EXISTS retry_attempts;",
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0004_delivery_retry_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(max_length=30)),
+                ('to_status', models.CharField(max_length=30)),
+                ('rider_id_snapshot', models.BigIntegerField(blank=True, help_text='Transition ke waqt delivery ka rider', null=True)),
+                ('effects', models.JSONField(default=list, help_text='Chalane wale side effects (transition table se)')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('delivery', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='delivery.delivery')),
+            ],
+            options={
+                'verbose_name': 'Delivery Outbox Entry',
+                'verbose_name_plural': 'Delivery Outbox',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='delivery_outbox_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0005_deliveryoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryTrail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order_id_str', models.CharField(db_index=True, max_length=50)),
+                ('store_id_snapshot', models.BigIntegerField(blank=True, null=True)),
+                ('rider_id_snapshot', models.BigIntegerField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(help_text='Pehle point ka time (offsets isse)')),
+                ('path', models.TextField(blank=True, help_text='Encoded polyline: (lat e5, lng e5, offset seconds) deltas')),
+                ('point_count', models.PositiveIntegerField(default=0)),
+                ('last_point', models.JSONField(blank=True, default=list, help_text='[lat e5, lng e5, offset] (append ke liye)')),
+                ('distance_km', models.FloatField(blank=True, null=True)),
+                ('finalized_at', models.DateTimeField(blank=True, null=True)),
+                ('delivery', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='delivery.delivery')),
+            ],
+            options={
+                'verbose_name': 'Delivery Trail',
+                'verbose_name_plural': 'Delivery Trails',
+            },
+        ),
+    ]
@@ -6,11 +6,8 @@ from django.conf import settings
 from django.contrib.gis.db import models as gis_models
 from store.models import TimestampedModel
 from orders.models import Order 
-from accounts.tasks import send_fcm_push_notification_task
-from decimal import Decimal # <-- Import pehle se hai, acchi baat hai
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone # <-- YEH IMPORT ADD KAREIN
-from django.db.models import F
 
 # Setup logger
 logger = logging.getLogger(__name__) # <-- ADD
@@ -157,104 +154,40 @@ class Delivery(TimestampedModel):
     )
     # --- END NAYE FIELDS ---
 
+    # --- NAYA: Retry / escalation state (delivery/retries.py) ---
+    retry_attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Kitni baar unassigned delivery ke liye riders dobara dhoondhe gaye"
+    )
+    retry_radius_km = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Current rider search radius (har retry par badhta hai)"
+    )
+    retry_incentive = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        default=0.00,
+        help_text="Late acceptance ke liye rider ko extra kamai"
+    )
+    next_retry_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Agla retry isse pehle nahi (backoff)"
+    )
+
 
 
     def __str__(self):
         rider_name = self.rider.user.username if self.rider else "Unassigned"
         return f"Delivery for Order {self.order.order_id} by {rider_name}"
 
-    def save(self, *args, **kwargs):
-        """
-        --- UPDATED SAVE METHOD ---
-        Custom save logic.
-        Ab yeh Order Status, Rider Status, Push Notification, aur Rider Earning
-        sab manage karta hai.
-        """
-        
-        # 1. Purana status check karein
-        old_status = None
-        if self.pk:
-            try:
-                old_status = Delivery.objects.get(pk=self.pk).status
-            except Delivery.DoesNotExist:
-                pass # Naya object hai
-        
-        # 2. Order status update logic
-        if self.status == self.DeliveryStatus.PICKED_UP:
-            self.order.status = Order.OrderStatus.OUT_FOR_DELIVERY
-        elif self.status == self.DeliveryStatus.DELIVERED:
-            self.order.status = Order.OrderStatus.DELIVERED
-        
-        # 3. Rider status update logic
-        if self.rider:
-            if self.status in [self.DeliveryStatus.ACCEPTED, self.DeliveryStatus.AT_STORE, self.DeliveryStatus.PICKED_UP]:
-                self.rider.on_delivery = True
-            elif self.status in [self.DeliveryStatus.DELIVERED, self.DeliveryStatus.CANCELLED]:
-                self.rider.on_delivery = False
-            self.rider.save()
-        
-        # 4. Order ko save karein (taaki naya status DB mein jaaye)
-        self.order.save()
-        
-        # 5. Check karein ki status *sach mein* badla hai ya nahi
-        status_changed = (old_status != self.status)
-        
-        # --- 6. PUSH NOTIFICATION TRIGGER LOGIC (Agar status badla hai) ---
-        if status_changed and self.order.user:
-            user_id = self.order.user.id
-            order_id = self.order.order_id
-            
-            title = f"Order {order_id} Update"
-            body = None
-            data = {"order_id": order_id, "status": self.status}
-            
-            if self.status == self.DeliveryStatus.ACCEPTED:
-                rider_name = self.rider.user.first_name if self.rider and self.rider.user.first_name else "our delivery partner"
-                body = f"{rider_name} aapka order lene jaa rahe hain."
-
-            elif self.status == self.DeliveryStatus.PICKED_UP:
-                body = "Aapka order rider ne pick up kar liya hai aur jald hi aapke paas hoga!"
-            
-            elif self.status == self.DeliveryStatus.DELIVERED:
-                body = f"Aapka order {order_id} successfully deliver ho gaya hai. Thank you!"
-
-            # Agar body set hui hai (yaani hum notification bhejna chahte hain)
-            if body:
-                try:
-                    # Celery task ko call karein
-                    send_fcm_push_notification_task.delay(user_id, title, body, data)
-                except Exception as e:
-                    # Celery down hone par bhi server crash na ho
-                    logger.error(f"Error triggering push notification task: {e}") # <-- CHANGED
-        
-        
-        # --- 7. NAYA RIDER EARNING LOGIC (Agar status badla hai) ---
-        # Jab order DELIVERED mark ho, tab earning record karein
-        if status_changed and self.status == self.DeliveryStatus.DELIVERED and self.rider:
-            try:
-                # Base fee settings se lein
-                base_fee = Decimal(getattr(settings, 'RIDER_BASE_DELIVERY_FEE', '0.00'))
-                # Tip order se lein
-                tip = self.order.rider_tip
-                
-                # Naya Earning record banayein
-                RiderEarning.objects.create(
-                    rider=self.rider,
-                    delivery=self,
-                    order_id_str=self.order.order_id,
-                    base_fee=base_fee,
-                    tip=tip,
-                    total_earning=base_fee + tip
-                )
-                logger.info(f"RiderEarning record created for Rider {self.rider.id} for Order {self.order.order_id}") # <-- CHANGED
-                
-            except Exception as e:
-                # Agar yeh fail bhi hota hai, toh order delivery ko na rokein
-                logger.error(f"ERROR: Failed to create RiderEarning record for order {self.order.order_id}: {e}") # <-- CHANGED
-        # --- END NAYA LOGIC ---
-
-        # 8. Ab main Delivery object ko save karein (BUG FIX)
-        super(Delivery, self).save(*args, **kwargs)
+    # --- UPDATED: save() override hataya gaya ---
+    # Status transitions ab delivery/transitions.py se hote hain (ek conditional
+    # UPDATE + outbox row). Order status, rider status, push aur earning
+    # commit ke baad delivery/outbox.py karta hai; plain save() par koi
+    # hidden query ya side effect nahi.
 
     class Meta:
         verbose_name = "Delivery"
@@ -262,6 +195,92 @@ class Delivery(TimestampedModel):
         ordering = ['-created_at']
 
 
+# --- NAYA MODEL: DeliveryOutbox ---
+class DeliveryOutbox(models.Model):
+    """
+    Delivery status transition ke side effects ka outbox.
+    delivery/transitions.py transition ke UPDATE ke saath hi (usi
+    transaction mein) ek row likhta hai; delivery/outbox.py commit ke baad
+    effects (order status, rider status, earning, push, timeline, caches)
+    chalata hai. Delivery archive ho sakti hai, isliye FK constraint nahi.
+    """
+    class EntryStatus(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    delivery = models.ForeignKey(
+        Delivery,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    from_status = models.CharField(max_length=30)
+    to_status = models.CharField(max_length=30)
+    rider_id_snapshot = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Transition ke waqt delivery ka rider"
+    )
+    effects = models.JSONField(default=list, help_text="Chalane wale side effects (transition table se)")
+    status = models.CharField(
+        max_length=10,
+        choices=EntryStatus.choices,
+        default=EntryStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Delivery Outbox Entry"
+        verbose_name_plural = "Delivery Outbox"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='delivery_outbox_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Delivery {self.delivery_id}: {self.from_status} -> {self.to_status} ({self.status})"
+# --- END NAYA MODEL ---
+
+
+# --- NAYA MODEL: DeliveryTrail ---
+class DeliveryTrail(TimestampedModel):
+    """
+    Ek delivery ka poora rider route (replay ke liye), delivery/trails.py
+    location stream se append karta hai aur DELIVERED / CANCELLED par
+    finalize. Points encoded polyline (lat, lng, seconds since started_at;
+    delta encoded) mein: ek delivery ke kuch KB, ek read mein serve.
+    Delivery archive ho sakti hai, isliye FK constraint nahi; order / store
+    ids snapshot mein rehte hain.
+    """
+    delivery = models.OneToOneField(
+        Delivery,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    order_id_str = models.CharField(max_length=50, db_index=True)
+    store_id_snapshot = models.BigIntegerField(null=True, blank=True)
+    rider_id_snapshot = models.BigIntegerField(null=True, blank=True)
+    started_at = models.DateTimeField(help_text="Pehle point ka time (offsets isse)")
+    path = models.TextField(blank=True, help_text="Encoded polyline: (lat e5, lng e5, offset seconds) deltas")
+    point_count = models.PositiveIntegerField(default=0)
+    last_point = models.JSONField(default=list, blank=True, help_text="[lat e5, lng e5, offset] (append ke liye)")
+    distance_km = models.FloatField(null=True, blank=True)
+    finalized_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Delivery Trail"
+        verbose_name_plural = "Delivery Trails"
+
+    def __str__(self):
+        return f"Trail for Order {self.order_id_str} ({self.point_count} points)"
+# --- END NAYA MODEL ---
+
+
 # --- NAYA MODEL: RiderEarning ---
 class RiderEarning(TimestampedModel):
     """
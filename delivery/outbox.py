@@ -0,0 +1,231 @@
+# delivery/outbox.py
+"""
+DeliveryOutbox processor (delivery/transitions.py dekhein).
+
+Transition commit hone ke baad 'drain_delivery_outbox' task us delivery
+ki PENDING rows 'id' order mein process karta hai; beat har minute bina
+argument ke chalta hai taaki chhooti hui / retry wali rows bhi nikal jaayein.
+Har row ke DB effects aur uska DONE mark ek hi transaction mein hote hain
+(exactly-once); push aur cache refresh us transaction ke commit ke baad.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Order
+from .models import Delivery, DeliveryOutbox, RiderEarning, RiderProfile
+from .transitions import CACHES, EARNING, ETA, ORDER_STATUS, PUSH, RIDER_STATUS, TIMELINE, TRAIL
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+Status = Delivery.DeliveryStatus
+
+# Delivery status -> Order status
+ORDER_STATUS_FOR = {
+    Status.PICKED_UP: Order.OrderStatus.OUT_FOR_DELIVERY,
+    Status.DELIVERED: Order.OrderStatus.DELIVERED,
+}
+
+
+def apply_order_status(entry, delivery):
+    target = ORDER_STATUS_FOR.get(entry.to_status)
+    order = delivery.order
+    if target is None or order.status in (target, Order.OrderStatus.CANCELLED):
+        return
+    order.status = target
+    # Instance save: Order signals (timeline, invoice, snapshot) chalte hain
+    order.save(update_fields=['status', 'updated_at'])
+
+
+def apply_rider_status(entry, delivery):
+    """
+    on_delivery flag transition ki transaction mein hi set ho chuka hai
+    (transitions.py); yahan sirf rider geo index sync.
+    """
+    from .geo_index import sync_rider
+
+    rider_id = entry.rider_id_snapshot or delivery.rider_id
+    if not rider_id:
+        return
+    rider = RiderProfile.objects.select_related('user').filter(pk=rider_id).first()
+    if rider is None:
+        return
+    sync_rider(rider, rider.user.is_active)
+
+
+def create_earning(entry, delivery):
+    if not delivery.rider_id:
+        return
+    base_fee = Decimal(getattr(settings, 'RIDER_BASE_DELIVERY_FEE', '0.00'))
+    # Retry escalation ka incentive bhi base fee mein
+    base_fee += Decimal(delivery.retry_incentive or 0)
+    tip = delivery.order.rider_tip
+    _, created = RiderEarning.objects.get_or_create(
+        delivery=delivery,
+        defaults={
+            'rider_id': delivery.rider_id,
+            'order_id_str': delivery.order.order_id,
+            'base_fee': base_fee,
+            'tip': tip,
+            'total_earning': base_fee + tip,
+        }
+    )
+    if created:
+        logger.info(f"RiderEarning record created for Rider {delivery.rider_id} for Order {delivery.order.order_id}")
+
+
+def send_push(entry, delivery):
+    from accounts.tasks import send_fcm_push_notification_task
+
+    order = delivery.order
+    if not order.user_id:
+        return
+    body = None
+    if entry.to_status == Status.ACCEPTED:
+        rider_name = delivery.rider.user.first_name if delivery.rider and delivery.rider.user.first_name else "our delivery partner"
+        body = f"{rider_name} aapka order lene jaa rahe hain."
+    elif entry.to_status == Status.PICKED_UP:
+        body = "Aapka order rider ne pick up kar liya hai aur jald hi aapke paas hoga!"
+    elif entry.to_status == Status.DELIVERED:
+        body = f"Aapka order {order.order_id} successfully deliver ho gaya hai. Thank you!"
+    if not body:
+        return
+
+    args = (order.user_id, f"Order {order.order_id} Update", body, {"order_id": order.order_id, "status": entry.to_status})
+
+    def _send():
+        try:
+            send_fcm_push_notification_task.delay(*args)
+        except Exception as e:
+            # Celery down hone par bhi processing na ruke
+            logger.error(f"Error triggering push notification task: {e}")
+    transaction.on_commit(_send)
+
+
+def record_timeline(entry, delivery):
+    from orders.events import record_order_event
+    from orders.models import OrderEvent
+
+    store_id = delivery.order.store_id
+    record_order_event(
+        delivery.order_id, store_id, OrderEvent.EventType.DELIVERY_STATUS,
+        to_status=entry.to_status, from_status=entry.from_status
+    )
+    if entry.to_status == Status.ACCEPTED and entry.rider_id_snapshot:
+        record_order_event(
+            delivery.order_id, store_id, OrderEvent.EventType.RIDER_ASSIGNED,
+            data={'rider_id': entry.rider_id_snapshot}
+        )
+
+
+def refresh_eta(entry, delivery):
+    from .eta import update_delivery_eta
+
+    # Caches se pehle, taaki snapshot / status cache mein naya ETA jaaye
+    update_delivery_eta(delivery)
+
+
+def finalize_trail(entry, delivery):
+    from .trails import enqueue_finalize
+
+    enqueue_finalize(delivery.id)
+
+
+def refresh_caches(entry, delivery):
+    from orders.snapshots import patch_order_snapshot
+    from orders.status_cache import refresh_order_status_cache
+    from .locations import refresh_active_order
+
+    order_pk = delivery.order_id
+    transaction.on_commit(lambda: patch_order_snapshot(order_pk))
+    transaction.on_commit(lambda: refresh_order_status_cache(order_pk))
+    transaction.on_commit(lambda: refresh_active_order(delivery))
+
+
+EFFECT_HANDLERS = {
+    ORDER_STATUS: apply_order_status,
+    RIDER_STATUS: apply_rider_status,
+    EARNING: create_earning,
+    PUSH: send_push,
+    TIMELINE: record_timeline,
+    ETA: refresh_eta,
+    TRAIL: finalize_trail,
+    CACHES: refresh_caches,
+}
+
+
+def process_outbox_entry(entry, delivery):
+    """
+    Ek (locked) entry ke saare effects. Return: True agar entry final state
+    mein pahunchi, False agar retry honi hai (us delivery ki aage ki rows ruki rahengi).
+    """
+    entry.attempts += 1
+    try:
+        with transaction.atomic():
+            if delivery is not None:
+                for effect in entry.effects:
+                    EFFECT_HANDLERS[effect](entry, delivery)
+            entry.status = DeliveryOutbox.EntryStatus.DONE
+            entry.processed_at = timezone.now()
+            entry.save(update_fields=['status', 'attempts', 'processed_at'])
+        return True
+    except Exception as e:
+        logger.error(f"Delivery outbox entry {entry.id} ({entry.from_status} -> {entry.to_status}) error (attempt {entry.attempts}): {e}")
+        entry.last_error = str(e)
+        if entry.attempts >= settings.DELIVERY_OUTBOX_MAX_ATTEMPTS:
+            entry.status = DeliveryOutbox.EntryStatus.FAILED
+            entry.processed_at = timezone.now()
+            entry.save(update_fields=['status', 'attempts', 'last_error', 'processed_at'])
+            return True
+        entry.save(update_fields=['attempts', 'last_error'])
+        return False
+
+
+def drain_delivery(delivery_id):
+    """
+    Ek delivery ki PENDING entries 'id' order mein. Rows select_for_update se
+    lock hoti hain: doosra worker wait karke unhe processed paayega.
+    Return: processed entries count.
+    """
+    processed = 0
+    with transaction.atomic():
+        entries = list(
+            DeliveryOutbox.objects.select_for_update().filter(
+                delivery_id=delivery_id,
+                status=DeliveryOutbox.EntryStatus.PENDING
+            ).order_by('id')
+        )
+        if not entries:
+            return 0
+        # Delivery archive ho chuki ho toh effects skip (entries DONE)
+        delivery = Delivery.objects.select_related('order__store', 'order__delivery_address', 'order__delivery_slot', 'rider__user').filter(pk=delivery_id).first()
+        for entry in entries:
+            if not process_outbox_entry(entry, delivery):
+                break
+            processed += 1
+    return processed
+
+
+def pending_delivery_ids(limit, older_than_seconds=0):
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    return list(
+        DeliveryOutbox.objects.filter(
+            status=DeliveryOutbox.EntryStatus.PENDING,
+            created_at__lte=cutoff
+        ).order_by('delivery_id').values_list('delivery_id', flat=True).distinct()[:limit]
+    )
+
+
+def purge_processed_entries():
+    """DELIVERY_OUTBOX_RETENTION_DAYS se purani DONE rows. Return: deleted count."""
+    cutoff = timezone.now() - timedelta(days=settings.DELIVERY_OUTBOX_RETENTION_DAYS)
+    deleted, _ = DeliveryOutbox.objects.filter(
+        status=DeliveryOutbox.EntryStatus.DONE,
+        processed_at__lt=cutoff
+    ).delete()
+    return deleted
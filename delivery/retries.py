@@ -0,0 +1,164 @@
+# delivery/retries.py
+"""
+Unassigned deliveries ka retry / escalation engine.
+
+'retry_unassigned_deliveries' task har minute chalta hai. Ek pass mein:
+1. Saari stuck deliveries (PENDING_ACCEPTANCE, rider nahi, RETRY_FIRST_AFTER_SECONDS
+   se purani, aur next_retry_at nikal chuka) ek query mein
+2. Har delivery ka state ek hi bulk UPDATE se badhta hai (Delivery.save
+   override nahi chalta):
+     retry_attempts  += 1
+     retry_radius_km  = min(RIDER_SEARCH_RADIUS_KM + attempts * RETRY_RADIUS_STEP_KM, RETRY_MAX_RADIUS_KM)
+     retry_incentive  = min(attempts * RETRY_INCENTIVE_STEP, RETRY_MAX_INCENTIVE)
+     next_retry_at    = now + min(attempts, RETRY_BACKOFF_MAX_STEPS) * RETRY_BACKOFF_SECONDS
+3. Batch dispatch (dispatch.py) on ho toh matching wahi karta hai (naya
+   radius aur incentive use karke). Off ho toh yahin har store ke liye ek
+   GEOSEARCH (sabse bade radius se) aur har delivery ke radius ke andar
+   RIDER_NOTIFY_LIMIT riders ko broadcast.
+Task ka kaam stores ke hisaab se badhta hai, deliveries ke nahi.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import DateTimeField, DecimalField, DurationField, ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from .geo_index import nearby_idle_riders
+from .models import Delivery
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+
+def radius_for_attempt(attempts):
+    return min(
+        settings.RIDER_SEARCH_RADIUS_KM + attempts * settings.RETRY_RADIUS_STEP_KM,
+        settings.RETRY_MAX_RADIUS_KM
+    )
+
+
+def incentive_for_attempt(attempts):
+    return min(attempts * settings.RETRY_INCENTIVE_STEP, settings.RETRY_MAX_INCENTIVE)
+
+
+def stuck_deliveries(now):
+    return Delivery.objects.filter(
+        status=Delivery.DeliveryStatus.PENDING_ACCEPTANCE,
+        rider__isnull=True,
+        updated_at__lt=now - timedelta(seconds=settings.RETRY_FIRST_AFTER_SECONDS),
+    ).filter(
+        Q(next_retry_at__isnull=True) | Q(next_retry_at__lte=now)
+    ).order_by('next_retry_at', 'id')
+
+
+def bump_retry_state(delivery_ids, now):
+    """
+    Ek UPDATE: attempts, radius, incentive aur next_retry_at (formulas
+    radius_for_attempt / incentive_for_attempt jaise, SQL mein).
+    Return: updated rows.
+    """
+    if not delivery_ids:
+        return 0
+    attempts = F('retry_attempts') + 1
+    return Delivery.objects.filter(id__in=delivery_ids).update(
+        retry_attempts=attempts,
+        retry_radius_km=Least(
+            ExpressionWrapper(
+                Value(settings.RIDER_SEARCH_RADIUS_KM) + attempts * Value(settings.RETRY_RADIUS_STEP_KM),
+                output_field=FloatField()
+            ),
+            Value(settings.RETRY_MAX_RADIUS_KM),
+            output_field=FloatField()
+        ),
+        retry_incentive=Least(
+            ExpressionWrapper(attempts * Value(settings.RETRY_INCENTIVE_STEP), output_field=DecimalField()),
+            Value(settings.RETRY_MAX_INCENTIVE),
+            output_field=DecimalField()
+        ),
+        next_retry_at=ExpressionWrapper(
+            Value(now) + ExpressionWrapper(
+                Least(attempts, Value(settings.RETRY_BACKOFF_MAX_STEPS))
+                * Value(timedelta(seconds=settings.RETRY_BACKOFF_SECONDS)),
+                output_field=DurationField()
+            ),
+            output_field=DateTimeField()
+        ),
+    )
+
+
+def _broadcast(deliveries):
+    """
+    Har store ke liye ek GEOSEARCH, phir har delivery ke naye radius ke andar
+    RIDER_NOTIFY_LIMIT nearest riders ko notification. Return: messages sent.
+    """
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+
+    from .serializers import RiderDeliverySerializer
+
+    by_store = {}
+    for delivery in deliveries:
+        by_store.setdefault(delivery.order.store_id, []).append(delivery)
+
+    channel_layer = get_channel_layer()
+    sent = 0
+    for store_deliveries in by_store.values():
+        store_location = store_deliveries[0].order.store.location
+        if not store_location:
+            continue
+        radii = {delivery.id: radius_for_attempt(delivery.retry_attempts) for delivery in store_deliveries}
+        riders = nearby_idle_riders(
+            store_location,
+            radius_km=max(radii.values()),
+            limit=settings.RETRY_CANDIDATES_PER_STORE
+        )
+        if not riders:
+            logger.warning(f"RETRY: Store {store_deliveries[0].order.store_id} ke {len(store_deliveries)} stuck orders, but still no riders nearby.")
+            continue
+
+        payloads = RiderDeliverySerializer(store_deliveries, many=True).data
+        for delivery, payload in zip(store_deliveries, payloads):
+            rider_ids = [rider_id for rider_id, distance in riders if distance <= radii[delivery.id]]
+            for rider_id in rider_ids[:settings.RIDER_NOTIFY_LIMIT]:
+                async_to_sync(channel_layer.group_send)(
+                    f"rider_{rider_id}",
+                    {
+                        "type": "new.delivery.notification",
+                        "delivery": payload
+                    }
+                )
+                sent += 1
+    return sent
+
+
+def retry_stuck_deliveries(broadcast=True):
+    """
+    Ek retry pass. broadcast=False (batch dispatch on) par sirf state bump.
+    Return: (stuck deliveries, notifications sent).
+    """
+    now = timezone.now()
+    queryset = stuck_deliveries(now)
+
+    if not broadcast:
+        delivery_ids = list(queryset.values_list('id', flat=True)[:settings.RETRY_MAX_BATCH])
+        bump_retry_state(delivery_ids, now)
+        return len(delivery_ids), 0
+
+    deliveries = list(
+        queryset.select_related('order__store', 'order__delivery_address')
+        .prefetch_related('order__payments')[:settings.RETRY_MAX_BATCH]
+    )
+    if not deliveries:
+        return 0, 0
+    bump_retry_state([delivery.id for delivery in deliveries], now)
+
+    # In-memory objects ko naye state par le aayein (payload mein incentive)
+    for delivery in deliveries:
+        delivery.retry_attempts += 1
+        delivery.retry_radius_km = radius_for_attempt(delivery.retry_attempts)
+        delivery.retry_incentive = Decimal(incentive_for_attempt(delivery.retry_attempts))
+
+    return len(deliveries), _broadcast(deliveries)
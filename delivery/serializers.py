@@ -30,8 +30,8 @@ class RiderLocationUpdateSerializer(serializers.Serializer):
     """
     Rider se Latitude/Longitude input lene ke liye.
     """
-    latitude = serializers.FloatField(required=True)
-    longitude = serializers.FloatField(required=True)
+    latitude = serializers.FloatField(required=True, min_value=-85.0, max_value=85.0)
+    longitude = serializers.FloatField(required=True, min_value=-180.0, max_value=180.0)
 
     def update(self, instance, validated_data):
         instance.current_location = Point(
@@ -106,15 +106,21 @@ class RiderDeliverySerializer(serializers.ModelSerializer):
             'payment_method',   
             'final_total',
             'distance_to_store',
-            'estimated_delivery_time'
+            'estimated_delivery_time',
+            'retry_incentive'
         ]
-        read_only_fields = ['estimated_delivery_time']
+        read_only_fields = ['estimated_delivery_time', 'retry_incentive']
     def get_payment_method(self, obj):
         """
         Safely order ka payment method nikalta hai.
         'obj' yahaan ek 'Delivery' instance hai.
         """
-        payment = obj.order.payments.first()
+        # Prefetched ho toh cache se (batch jobs mein har delivery par query nahi)
+        if 'payments' in getattr(obj.order, '_prefetched_objects_cache', {}):
+            payments = sorted(obj.order.payments.all(), key=lambda payment: payment.pk)
+            payment = payments[0] if payments else None
+        else:
+            payment = obj.order.payments.first()
         if payment:
             return payment.payment_method
         return None
@@ -0,0 +1,44 @@
+# delivery/signals.py
+"""
+1. RiderProfile save hone par (online/offline, delivery start/end,
+   account deactivate) rider geo index (geo_index.py) ko commit ke baad
+   sync karta hai. Location pings profile save nahi karte (locations.py).
+2. Delivery save hone par rider ka cached active order (tracking
+   broadcast ke liye) refresh karta hai. Status transitions (transitions.py)
+   .update() se hote hain; unke liye yeh kaam outbox.py karta hai.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Delivery, RiderProfile
+
+
+@receiver(post_save, sender=RiderProfile, dispatch_uid='delivery_geo_index_on_rider_save')
+def sync_rider_geo_index(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .geo_index import sync_rider
+
+    # User pehle se load ho tabhi is_active check (har ping par extra query nahi);
+    # deactivated users ko rebuild task hata deta hai.
+    user_field = RiderProfile._meta.get_field('user')
+    user_is_active = instance.user.is_active if user_field.is_cached(instance) else True
+    transaction.on_commit(lambda: sync_rider(instance, user_is_active))
+
+
+@receiver(post_delete, sender=RiderProfile, dispatch_uid='delivery_geo_index_on_rider_delete')
+def remove_rider_from_geo_index(sender, instance, **kwargs):
+    from .geo_index import remove_rider
+
+    rider_id = instance.id
+    transaction.on_commit(lambda: remove_rider(rider_id))
+
+
+@receiver(post_save, sender=Delivery, dispatch_uid='delivery_active_order_on_delivery_save')
+def refresh_rider_active_order(sender, instance, raw=False, **kwargs):
+    if raw or not instance.rider_id:
+        return
+    from .locations import refresh_active_order
+
+    transaction.on_commit(lambda: refresh_active_order(instance))
@@ -2,16 +2,9 @@
 
 import logging # <-- ADD
 from celery import shared_task
-from django.utils import timezone
-from datetime import timedelta
-from django.contrib.gis.measure import D
-from django.contrib.gis.db.models.functions import Distance
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 from django.conf import settings # <-- Naya import
 
-from .models import Delivery, RiderProfile
-from .serializers import RiderDeliverySerializer
+from .geo_index import prune_stale_riders, rebuild_index
 
 # Setup logger
 logger = logging.getLogger(__name__) # <-- ADD
@@ -21,68 +14,131 @@ logger = logging.getLogger(__name__) # <-- ADD
 def retry_unassigned_deliveries():
     """
     Har minute chalta hai.
-    Unn orders ko dhoondhta hai jo 1 minute se zyada se 'PENDING_ACCEPTANCE' 
-    mein phase hue hain aur unke liye dobara riders ko notify karta hai.
-    """
-    
-    # Aise orders dhoondein jo 1 min pehle update hue the
-    # aur abhi tak PENDING_ACCEPTANCE mein hain
-    time_threshold = timezone.now() - timedelta(minutes=1)
-    
-    stuck_deliveries = Delivery.objects.filter(
-        status=Delivery.DeliveryStatus.PENDING_ACCEPTANCE,
-        rider__isnull=True,
-        updated_at__lt=timezone.now() - timedelta(minutes=1)
-    ).select_related('order__store', 'order__store__location')
-
-
-    if not stuck_deliveries.exists():
-        logger.info(f"CELERY TASK (retry_unassigned): No stuck deliveries found. All good.") # <-- CHANGED
+    Unn orders ko dhoondhta hai jo 'PENDING_ACCEPTANCE' mein phase hue hain,
+    unka search radius / incentive badhata hai (ek bulk UPDATE) aur riders ko
+    dobara notify karta hai (delivery/retries.py).
+    --- UPDATED: Batch dispatch on ho toh notify dispatcher karta hai ---
+    """
+    from .retries import retry_stuck_deliveries
+
+    stuck, sent = retry_stuck_deliveries(broadcast=not settings.DELIVERY_BATCH_DISPATCH)
+    if not stuck:
+        logger.info("CELERY TASK (retry_unassigned): No stuck deliveries found. All good.")
         return "No stuck deliveries found."
 
-    logger.info(f"CELERY TASK (retry_unassigned): Found {stuck_deliveries.count()} stuck deliveries. Retrying...") # <-- CHANGED
-    
-    channel_layer = get_channel_layer()
-    
-    # Har stuck delivery ke liye, nazdeeki riders dhoondein
-    for delivery in stuck_deliveries:
-        store_location = delivery.order.store.location
-        if not store_location:
-            continue
-
-        # FIX: Hardcoded 10km ko settings se replace kiya
-        nearby_available_riders = RiderProfile.objects.filter(
-            user__is_active=True,  # <-- YEH NAYA CHECK ADD HUA
-            is_online=True,
-            on_delivery=False,
-            current_location__isnull=False,
-            current_location__distance_lte=(store_location, D(km=settings.RIDER_SEARCH_RADIUS_KM)) 
-        ).annotate(
-            distance_to_store=Distance('current_location', store_location)
-        ).order_by('distance_to_store')[:10]
-
-        if not nearby_available_riders.exists():
-            logger.warning(f"RETRY: Order {delivery.order.order_id} stuck, but still no riders nearby.") # <-- CHANGED
-            continue
-
-        # Delivery data serialize karein
-        # Serializer context ke bina media URL nahi bana payega, par data bhej dega
-        delivery_data = RiderDeliverySerializer(delivery).data
-        
-        for rider in nearby_available_riders:
-            group_name = f"rider_{rider.id}"
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
-                    "type": "new.delivery.notification", 
-                    "delivery": delivery_data
-                }
-            )
-        
-        logger.info(f"RETRY: Notified {len(nearby_available_riders)} riders for stuck order {delivery.order.order_id}") # <-- CHANGED
-        
-        # Delivery ka updated_at timestamp update karein
-        # taaki yeh agle 1 min tak dobara check na ho
-        delivery.save(update_fields=['updated_at'])
-
-    return f"Retried {stuck_deliveries.count()} deliveries."
\ No newline at end of file
+    logger.info(f"CELERY TASK (retry_unassigned): Escalated {stuck} stuck deliveries, {sent} rider notifications sent.")
+    return f"Retried {stuck} deliveries."
+
+
+@shared_task(name="drain_delivery_outbox", ignore_result=True)
+def drain_delivery_outbox(delivery_id=None):
+    """
+    Delivery transition outbox (delivery/outbox.py) drain karta hai.
+    Transition commit ke baad us delivery ke liye enqueue hota hai; beat har
+    minute bina argument ke chalata hai (retries / chhooti hui entries, purani
+    DONE rows ki safai).
+    """
+    from .outbox import drain_delivery, pending_delivery_ids, purge_processed_entries
+
+    if delivery_id is not None:
+        drain_delivery(delivery_id)
+        return
+
+    processed = 0
+    delivery_ids = pending_delivery_ids(
+        settings.DELIVERY_OUTBOX_DRAIN_BATCH,
+        older_than_seconds=settings.DELIVERY_OUTBOX_SWEEP_AFTER_SECONDS
+    )
+    for pending_id in delivery_ids:
+        processed += drain_delivery(pending_id)
+    purged = purge_processed_entries()
+    if processed or purged:
+        logger.info(f"CELERY TASK (drain_delivery_outbox): Processed {processed} entries, purged {purged}.")
+
+
+@shared_task(name="dispatch_pending_deliveries", ignore_result=True)
+def dispatch_pending_deliveries():
+    """
+    Har DISPATCH_TICK_SECONDS: pending deliveries ko idle riders se batch
+    match karke targeted offers bhejta hai (delivery/dispatch.py).
+    """
+    if not settings.DELIVERY_BATCH_DISPATCH:
+        return
+    from .dispatch import run_dispatch_tick
+
+    run_dispatch_tick()
+
+
+@shared_task(name="prune_rider_geo_index", ignore_result=True)
+def prune_rider_geo_index():
+    """
+    Har minute: RIDER_GEO_STALE_SECONDS se ping na karne wale riders ko
+    geo index se hatata hai (delivery/geo_index.py).
+    """
+    pruned = prune_stale_riders()
+    if pruned:
+        logger.info(f"CELERY TASK (prune_rider_geo_index): {pruned} stale riders removed.")
+
+
+@shared_task(name="rebuild_rider_geo_index", ignore_result=True)
+def rebuild_rider_geo_index():
+    """
+    Har 10 minute: rider geo index ko DB se poora dobara banata hai
+    (missed updates, deactivated users, Redis restart).
+    """
+    count = rebuild_index()
+    logger.info(f"CELERY TASK (rebuild_rider_geo_index): {count} riders indexed.")
+
+
+@shared_task(name="flush_rider_locations", ignore_result=True)
+def flush_rider_locations():
+    """
+    Har RIDER_LOCATION_FLUSH_SECONDS: buffered rider positions ko
+    RiderProfile.current_location mein bulk_update karta hai (delivery/locations.py).
+    """
+    from .locations import flush_positions
+
+    flushed = flush_positions()
+    if flushed:
+        logger.debug(f"CELERY TASK (flush_rider_locations): {flushed} rider positions flushed.")
+
+
+@shared_task(name="fit_eta_model", ignore_result=True)
+def fit_eta_model():
+    """
+    Roz raat: delivered deliveries ke timestamps se ETA quantile table
+    dobara fit karta hai (delivery/eta.py).
+    """
+    from .eta import fit_eta_table
+
+    table = fit_eta_table()
+    if table is None:
+        logger.info("CELERY TASK (fit_eta_model): Koi usable delivery data nahi, defaults use honge.")
+        return
+    logger.info(f"CELERY TASK (fit_eta_model): {table['samples']} deliveries se {len(table['cells'])} cells fit hue.")
+
+
+@shared_task(name="append_location_trails", ignore_result=True)
+def append_location_trails():
+    """
+    Har TRAIL_APPEND_SECONDS: rider location stream ke naye pings active
+    deliveries ke trails mein jodta hai (delivery/trails.py).
+    """
+    from .trails import run_append_pass
+
+    appended = run_append_pass()
+    if appended:
+        logger.debug(f"CELERY TASK (append_location_trails): {appended} trail points appended.")
+
+
+@shared_task(name="finalize_delivery_trail", ignore_result=True)
+def finalize_delivery_trail(delivery_id):
+    """
+    DELIVERED / CANCELLED transition ke baad: trail ke aakhri pings aur
+    distance (delivery/trails.py).
+    """
+    from .trails import finalize_trail
+
+    trail = finalize_trail(delivery_id)
+    if trail is not None:
+        logger.info(f"CELERY TASK (finalize_delivery_trail): Delivery {delivery_id} trail finalized ({trail.point_count} points, {trail.distance_km} km).")
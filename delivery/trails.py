@@ -0,0 +1,405 @@
+# delivery/trails.py
+"""
+Delivery location trails (route replay).
+
+RiderProfile.current_location sirf aakhri position rakhta hai aur har
+ping ko row banana bahut bada padta. Isliye har delivery ka route ek
+DeliveryTrail row mein encoded polyline ke roop mein rehta hai:
+
+  har point = (lat * 1e5, lng * 1e5, started_at se seconds) integers,
+  pichle point se delta, Google polyline varint encoding mein
+
+Aam delivery (kuch sau points) kuch KB ki hoti hai aur ek read mein serve hoti hai.
+
+'append_location_trails' task har TRAIL_APPEND_SECONDS 'rider_loc_stream'
+(locations.py) ko cursor se padhta hai. Har ping us rider ki delivery ke
+window (accepted_at -> delivered / cancelled) mein ho toh us delivery ke
+trail mein judta hai. Ek waqt par ek hi pass chalta hai (Redis lock).
+DELIVERED / CANCELLED transition ka TRAIL effect (outbox.py)
+'finalize_delivery_trail' task enqueue karta hai: aakhri pings append,
+distance_km, finalized_at. Us waqt trail row na ho aur pings baad mein
+aayein (delivery khatam hue TRAIL_FINALIZE_DELAY_SECONDS ho chuke), toh
+append pass hi trail ko finalize kar deta hai.
+
+Replay (DeliveryTrailView) map zoom ke hisaab se Douglas-Peucker se
+simplified path deta hai.
+"""
+import logging
+import math
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from orders.fees import EARTH_RADIUS_KM
+from .locations import ACTIVE_DELIVERY_STATUSES, STREAM_KEY
+from .models import Delivery, DeliveryTrail
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+CURSOR_KEY = 'trail_stream_cursor'
+LOCK_KEY = 'trail_append_lock'
+COORD_SCALE = 1e5
+# Zoom 0 par equator par ek pixel kitne meter (256px Web Mercator tiles)
+METERS_PER_PIXEL_Z0 = 156543.03392
+
+Status = Delivery.DeliveryStatus
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+# --- Encoding ---
+
+def _encode_value(value, out):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_points(points, previous=None):
+    """
+    Integer tuples ko polyline string banata hai (har dimension pichle point
+    se delta). previous: pehle se encoded aakhri point (append ke liye).
+    """
+    out = []
+    previous = list(previous) if previous else None
+    for point in points:
+        if previous is None:
+            previous = [0] * len(point)
+        for index, value in enumerate(point):
+            _encode_value(value - previous[index], out)
+        previous = list(point)
+    return ''.join(out)
+
+
+def decode_points(encoded, dims=3):
+    """Polyline string -> (N, dims) int64 array (absolute values)."""
+    values = []
+    result = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        result |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(result >> 1) if result & 1 else result >> 1)
+            result = shift = 0
+    if not values:
+        return np.zeros((0, dims), dtype=np.int64)
+    return np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, dims), axis=0)
+
+
+def encode_polyline(latitudes, longitudes):
+    """Standard (2D, precision 5) Google polyline, map SDKs ke liye."""
+    points = zip(
+        (int(round(latitude * COORD_SCALE)) for latitude in latitudes),
+        (int(round(longitude * COORD_SCALE)) for longitude in longitudes),
+    )
+    return encode_points(points)
+
+
+# --- Geometry ---
+
+def path_distance_km(latitudes, longitudes):
+    if len(latitudes) < 2:
+        return 0.0
+    phi = np.radians(latitudes)
+    d_phi = np.diff(phi)
+    d_lambda = np.radians(np.diff(longitudes))
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi[:-1]) * np.cos(phi[1:]) * np.sin(d_lambda / 2) ** 2
+    return float(np.sum(2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))))
+
+
+def simplify_indices(latitudes, longitudes, tolerance_m):
+    """
+    Douglas-Peucker (iterative, har segment ke distances NumPy se).
+    Return: rakhe gaye points ke indexes (pehla aur aakhri hamesha).
+    """
+    count = len(latitudes)
+    if count <= 2 or tolerance_m <= 0:
+        return np.arange(count)
+    # Local equirectangular projection (meters), delivery radius ke liye kaafi
+    mean_lat = math.radians(float(np.mean(latitudes)))
+    x = np.radians(longitudes) * math.cos(mean_lat) * EARTH_RADIUS_KM * 1000
+    y = np.radians(latitudes) * EARTH_RADIUS_KM * 1000
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        length = math.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(px, py)
+        else:
+            distances = np.abs(dx * py - dy * px) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance_m:
+            index = start + 1 + farthest
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return np.nonzero(keep)[0]
+
+
+def tolerance_for_zoom(zoom, latitude):
+    """Zoom level par TRAIL_SIMPLIFY_PIXELS kitne meter hain."""
+    meters_per_pixel = METERS_PER_PIXEL_Z0 * math.cos(math.radians(latitude)) / (2 ** zoom)
+    return meters_per_pixel * settings.TRAIL_SIMPLIFY_PIXELS
+
+
+def trail_points(trail):
+    """Return: (latitudes, longitudes, unix timestamps) arrays."""
+    decoded = decode_points(trail.path)
+    base = trail.started_at.timestamp()
+    return decoded[:, 0] / COORD_SCALE, decoded[:, 1] / COORD_SCALE, decoded[:, 2] + base
+
+
+def replay_payload(trail, zoom=None):
+    """
+    API response. zoom diya ho toh us zoom ke liye simplified path, warna
+    saare points.
+    """
+    latitudes, longitudes, timestamps = trail_points(trail)
+    if zoom is not None and len(latitudes):
+        indices = simplify_indices(latitudes, longitudes, tolerance_for_zoom(zoom, float(np.mean(latitudes))))
+        latitudes, longitudes, timestamps = latitudes[indices], longitudes[indices], timestamps[indices]
+    return {
+        'delivery_id': trail.delivery_id,
+        'order_id': trail.order_id_str,
+        'rider_id': trail.rider_id_snapshot,
+        'started_at': trail.started_at,
+        'finalized_at': trail.finalized_at,
+        'distance_km': trail.distance_km,
+        'point_count': trail.point_count,
+        'zoom': zoom,
+        'polyline': encode_polyline(latitudes, longitudes),
+        'points': [
+            [round(float(latitude), 5), round(float(longitude), 5), int(timestamp)]
+            for latitude, longitude, timestamp in zip(latitudes, longitudes, timestamps)
+        ],
+    }
+
+
+# --- Appending from the location stream ---
+
+def _parse_entry(fields):
+    try:
+        return (
+            int(fields[b'rider']),
+            float(fields[b'ts']),
+            float(fields[b'lat']),
+            float(fields[b'lng']),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _delivery_windows(rider_ids, min_ts, max_ts):
+    """
+    Rider id -> [(delivery values, window start, window end)] un deliveries ke
+    liye jinka window pings ke time range se milta hai (ek query).
+    """
+    since = datetime.fromtimestamp(min_ts, tz=dt_timezone.utc)
+    until = datetime.fromtimestamp(max_ts, tz=dt_timezone.utc)
+    rows = Delivery.objects.filter(
+        rider_id__in=rider_ids,
+        accepted_at__isnull=False,
+        accepted_at__lte=until,
+    ).filter(
+        Q(status__in=ACTIVE_DELIVERY_STATUSES)
+        | Q(status=Status.DELIVERED, delivered_at__gte=since)
+        | Q(status=Status.CANCELLED, updated_at__gte=since)
+    ).values('id', 'rider_id', 'status', 'accepted_at', 'delivered_at', 'updated_at', 'order__order_id', 'order__store_id')
+
+    windows = {}
+    for row in rows:
+        if row['status'] == Status.DELIVERED:
+            end = row['delivered_at'].timestamp()
+        elif row['status'] == Status.CANCELLED:
+            end = row['updated_at'].timestamp()
+        else:
+            end = math.inf
+        windows.setdefault(row['rider_id'], []).append((row, row['accepted_at'].timestamp(), end))
+    return windows
+
+
+def _append(trail, pings):
+    """pings: [(timestamp, lat, lng)] time order mein. Return: kitne points jude."""
+    base = trail.started_at.timestamp()
+    previous = trail.last_point or None
+    new_points = []
+    for timestamp, latitude, longitude in pings:
+        if trail.point_count + len(new_points) >= settings.TRAIL_MAX_POINTS:
+            break
+        point = [int(round(latitude * COORD_SCALE)), int(round(longitude * COORD_SCALE)), int(timestamp - base)]
+        last = new_points[-1] if new_points else previous
+        # Out-of-order ya same-second duplicate ping skip
+        if last is not None and point[2] <= last[2]:
+            continue
+        new_points.append(point)
+    if not new_points:
+        return 0
+    trail.path += encode_points(new_points, previous=previous)
+    trail.point_count += len(new_points)
+    trail.last_point = new_points[-1]
+    return len(new_points)
+
+
+def _apply_pings(by_rider):
+    """by_rider: rider_id -> [(timestamp, lat, lng)]. Return: appended points."""
+    if not by_rider:
+        return 0
+    all_ts = [ping[0] for pings in by_rider.values() for ping in pings]
+    windows = _delivery_windows(list(by_rider), min(all_ts), max(all_ts))
+
+    by_delivery = {}
+    info = {}
+    ended_at = {}
+    for rider_id, pings in by_rider.items():
+        for row, start, end in windows.get(rider_id, ()):
+            matched = [ping for ping in pings if start <= ping[0] <= end]
+            if matched:
+                by_delivery.setdefault(row['id'], []).extend(matched)
+                info[row['id']] = row
+                ended_at[row['id']] = end
+    if not by_delivery:
+        return 0
+
+    now = timezone.now()
+    # Finalize task (TRAIL_FINALIZE_DELAY_SECONDS baad) nikal chuka ho aur trail
+    # tab bana hi nahi tha: late pings wala trail yahin finalize ho
+    finalize_before = now.timestamp() - settings.TRAIL_FINALIZE_DELAY_SECONDS
+    appended = 0
+    with transaction.atomic():
+        trails = {
+            trail.delivery_id: trail
+            for trail in DeliveryTrail.objects.select_for_update().filter(delivery_id__in=list(by_delivery))
+        }
+        to_create, to_update = [], []
+        for delivery_id, pings in by_delivery.items():
+            pings.sort(key=lambda ping: ping[0])
+            trail = trails.get(delivery_id)
+            if trail is None:
+                row = info[delivery_id]
+                trail = DeliveryTrail(
+                    delivery_id=delivery_id,
+                    order_id_str=row['order__order_id'],
+                    store_id_snapshot=row['order__store_id'],
+                    rider_id_snapshot=row['rider_id'],
+                    started_at=datetime.fromtimestamp(int(pings[0][0]), tz=dt_timezone.utc),
+                )
+                to_create.append(trail)
+            elif trail.finalized_at:
+                continue
+            else:
+                to_update.append(trail)
+            appended += _append(trail, pings)
+            if ended_at[delivery_id] <= finalize_before:
+                _set_finalized(trail, now)
+        DeliveryTrail.objects.bulk_create(to_create)
+        if to_update:
+            # bulk_update auto_now nahi lagata
+            for trail in to_update:
+                trail.updated_at = now
+            DeliveryTrail.objects.bulk_update(
+                to_update, ['path', 'point_count', 'last_point', 'distance_km', 'finalized_at', 'updated_at']
+            )
+    return appended
+
+
+def append_from_stream(client=None):
+    """
+    Stream ke naye pings (cursor ke baad) trails mein. Cursor DB commit ke
+    baad hi aage badhta hai. Return: appended points.
+    """
+    client = client or _redis()
+    cursor = client.get(CURSOR_KEY) or b'0-0'
+    appended = 0
+    for _ in range(settings.TRAIL_MAX_BATCHES):
+        response = client.xread({STREAM_KEY: cursor}, count=settings.TRAIL_STREAM_BATCH)
+        entries = response[0][1] if response else []
+        if not entries:
+            break
+        by_rider = {}
+        for _, fields in entries:
+            parsed = _parse_entry(fields)
+            if parsed:
+                rider_id, timestamp, latitude, longitude = parsed
+                by_rider.setdefault(rider_id, []).append((timestamp, latitude, longitude))
+        appended += _apply_pings(by_rider)
+        cursor = entries[-1][0]
+        client.set(CURSOR_KEY, cursor)
+        if len(entries) < settings.TRAIL_STREAM_BATCH:
+            break
+    return appended
+
+
+def run_append_pass(wait_seconds=0):
+    """
+    Ek append pass (Redis lock; wait_seconds=0 par lock na mile toh skip).
+    Return: appended points, ya None agar skip hua.
+    """
+    client = _redis()
+    lock = client.lock(LOCK_KEY, timeout=max(settings.TRAIL_APPEND_SECONDS * 4, 60))
+    if wait_seconds:
+        acquired = lock.acquire(blocking=True, blocking_timeout=wait_seconds)
+    else:
+        acquired = lock.acquire(blocking=False)
+    if not acquired:
+        return None
+    try:
+        return append_from_stream(client)
+    finally:
+        try:
+            lock.release()
+        except Exception:
+            pass
+
+
+def finalize_trail(delivery_id):
+    """
+    Delivery terminal status mein: bache hue pings append, phir distance aur
+    finalized_at. Return: trail (ya None agar koi ping nahi mila).
+    """
+    if run_append_pass(wait_seconds=settings.TRAIL_APPEND_SECONDS) is None:
+        logger.warning(f"Trail finalize (delivery {delivery_id}): append lock nahi mila, stream ke bina finalize.")
+    trail = DeliveryTrail.objects.filter(delivery_id=delivery_id, finalized_at__isnull=True).first()
+    if trail is None:
+        # Baad mein aaye pings ka trail _apply_pings khud finalize karta hai
+        return None
+    _set_finalized(trail, timezone.now())
+    DeliveryTrail.objects.filter(pk=trail.pk).update(
+        distance_km=trail.distance_km, finalized_at=trail.finalized_at, updated_at=trail.finalized_at
+    )
+    return trail
+
+
+def _set_finalized(trail, now):
+    latitudes, longitudes, _ = trail_points(trail)
+    trail.distance_km = round(path_distance_km(latitudes, longitudes), 3)
+    trail.finalized_at = now
+
+
+def enqueue_finalize(delivery_id):
+    """Transition commit ke baad (outbox.py). Client ke buffered pings ke liye thoda ruk kar."""
+    from .tasks import finalize_delivery_trail
+
+    def _enqueue():
+        try:
+            finalize_delivery_trail.apply_async((delivery_id,), countdown=settings.TRAIL_FINALIZE_DELAY_SECONDS)
+        except Exception as e:
+            logger.error(f"Trail finalize task enqueue fail (delivery {delivery_id}): {e}")
+    transaction.on_commit(_enqueue)
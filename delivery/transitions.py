@@ -0,0 +1,161 @@
+# delivery/transitions.py
+"""
+Delivery status state machine.
+
+Har allowed (from -> to) transition TRANSITIONS table mein hai: kaunsa
+timestamp field set hota hai aur commit ke baad kaunse side effects
+chalne hain. Transition ek hi conditional UPDATE hai:
+
+    UPDATE delivery_delivery SET status = <to>, <timestamp> = now, ...
+    WHERE id = <id> AND status = <from> [AND rider_id IS NULL]
+
+Row match na ho (kisi aur ne pehle status badal diya) toh 0 rows, aur
+transition False return karta hai: check aur apply ek round trip mein,
+select_for_update ki zaroorat nahi. Usi transaction mein DeliveryOutbox
+row likhi jaati hai; effects (order status, rider geo index, earning,
+push, OrderEvent timeline, ETA, location trail, snapshot / status caches) delivery/outbox.py
+commit ke baad chalata hai.
+
+Rider ka on_delivery flag outbox mein nahi, isi transaction mein badalta
+hai: ACCEPTED par 'on_delivery=False' wala conditional UPDATE, taaki rider
+do deliveries ek saath accept na kar sake (0 rows = transition abort).
+
+Note: .update() post_save signals nahi chalata; timeline aur caches
+isliye outbox ke ALWAYS_EFFECTS mein hain.
+"""
+import logging
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Subquery
+from django.utils import timezone
+
+from .models import Delivery, DeliveryOutbox, RiderProfile
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+Status = Delivery.DeliveryStatus
+
+# --- Side effects (delivery/outbox.py handlers) ---
+ORDER_STATUS = 'ORDER_STATUS'
+RIDER_STATUS = 'RIDER_STATUS'
+EARNING = 'EARNING'
+PUSH = 'PUSH'
+TIMELINE = 'TIMELINE'
+CACHES = 'CACHES'
+ETA = 'ETA'
+TRAIL = 'TRAIL'
+
+# Har transition ke baad
+ALWAYS_EFFECTS = (TIMELINE, ETA, CACHES)
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Transition:
+    timestamp_field: str = None
+    effects: tuple = ()
+    assigns_rider: bool = False
+
+
+TRANSITIONS = {
+    (Status.AWAITING_PREPARATION, Status.PENDING_ACCEPTANCE): Transition(),
+    (Status.PENDING_ACCEPTANCE, Status.ACCEPTED): Transition('accepted_at', (RIDER_STATUS, PUSH), assigns_rider=True),
+    (Status.ACCEPTED, Status.AT_STORE): Transition('at_store_at'),
+    (Status.AT_STORE, Status.PICKED_UP): Transition('picked_up_at', (ORDER_STATUS, PUSH)),
+    (Status.PICKED_UP, Status.DELIVERED): Transition('delivered_at', (ORDER_STATUS, RIDER_STATUS, EARNING, PUSH, TRAIL)),
+    (Status.AWAITING_PREPARATION, Status.CANCELLED): Transition(),
+    (Status.PENDING_ACCEPTANCE, Status.CANCELLED): Transition(),
+    (Status.ACCEPTED, Status.CANCELLED): Transition(effects=(RIDER_STATUS, TRAIL)),
+    (Status.AT_STORE, Status.CANCELLED): Transition(effects=(RIDER_STATUS, TRAIL)),
+}
+
+# Rider app (UpdateDeliveryStatusView) se allowed target statuses
+RIDER_STATUSES = (Status.AT_STORE, Status.PICKED_UP, Status.DELIVERED)
+
+
+def can_transition(from_status, to_status):
+    return (from_status, to_status) in TRANSITIONS
+
+
+def transition_by_id(delivery_id, from_status, to_status, rider_id=None):
+    """
+    Delivery ko from_status -> to_status le jaata hai (ek UPDATE + ek outbox INSERT).
+    rider_id sirf rider assign karne wale transition (ACCEPTED) par.
+    Return: updated field values ka dict, ya None agar row expected status mein nahi thi.
+    """
+    rule = TRANSITIONS.get((from_status, to_status))
+    if rule is None:
+        raise InvalidTransition(f"Delivery transition {from_status} -> {to_status} allowed nahi hai.")
+    if rule.assigns_rider and rider_id is None:
+        raise InvalidTransition(f"{to_status} transition ke liye rider chahiye.")
+
+    now = timezone.now()
+    values = {'status': to_status, 'updated_at': now}
+    if rule.timestamp_field:
+        values[rule.timestamp_field] = now
+    filters = {'pk': delivery_id, 'status': from_status}
+    if rule.assigns_rider:
+        values['rider_id'] = rider_id
+        filters['rider__isnull'] = True
+
+    with transaction.atomic():
+        if RIDER_STATUS in rule.effects and not _set_rider_on_delivery(delivery_id, to_status, rider_id, now):
+            # Rider pehle se kisi aur delivery par hai
+            return None
+        if not Delivery.objects.filter(**filters).update(**values):
+            # Rider flag bhi wapas (same transaction)
+            transaction.set_rollback(True)
+            return None
+        entry = DeliveryOutbox.objects.create(
+            delivery_id=delivery_id,
+            from_status=from_status,
+            to_status=to_status,
+            rider_id_snapshot=rider_id,
+            effects=list(rule.effects + ALWAYS_EFFECTS),
+        )
+        transaction.on_commit(lambda: _enqueue_outbox(entry.delivery_id))
+    return values
+
+
+def _set_rider_on_delivery(delivery_id, to_status, rider_id, now):
+    """
+    Rider ka on_delivery flag delivery UPDATE ke saath hi (same transaction)
+    set karta hai. ACCEPTED par conditional (on_delivery=False): rider ek hi
+    active delivery le sakta hai. Return: False agar rider busy tha.
+    """
+    if to_status == Status.ACCEPTED:
+        return bool(
+            RiderProfile.objects.filter(pk=rider_id, on_delivery=False).update(on_delivery=True, updated_at=now)
+        )
+    RiderProfile.objects.filter(
+        pk=Subquery(Delivery.objects.filter(pk=delivery_id).values('rider_id')[:1])
+    ).update(on_delivery=False, updated_at=now)
+    return True
+
+
+def transition(delivery, to_status, rider_id=None):
+    """
+    Instance wala variant: delivery ka current (in-memory) status expected
+    'from' hai. Success par instance bhi update hota hai. Return: True/False.
+    """
+    values = transition_by_id(delivery.pk, delivery.status, to_status, rider_id=rider_id)
+    if values is None:
+        return False
+    for field, value in values.items():
+        setattr(delivery, field, value)
+    return True
+
+
+def _enqueue_outbox(delivery_id):
+    from .tasks import drain_delivery_outbox
+
+    try:
+        drain_delivery_outbox.delay(delivery_id)
+    except Exception as e:
+        # Sweeper (beat) baad mein utha lega
+        logger.error(f"Delivery outbox task enqueue fail (delivery {delivery_id}): {e}")
@@ -11,7 +11,8 @@ from .views import (
     RiderEarningsView,
     RiderCashDepositView,
     RiderApplicationView,
-    RiderDocumentUploadView
+    RiderDocumentUploadView,
+    DeliveryTrailView
 )
 
 urlpatterns = [
@@ -51,6 +52,11 @@ urlpatterns = [
          StaffUpdateOrderStatusView.as_view(),
          name='staff-update-order'),
 
+    # --- NAYA: Delivery route replay ---
+    path('staff/order/<str:order_id>/trail/',
+         DeliveryTrailView.as_view(),
+         name='staff-delivery-trail'),
+
      path('deposit-cash/', 
          RiderCashDepositView.as_view(), 
          name='rider-deposit-cash'),
@@ -1,11 +1,9 @@
 import logging
+from django.conf import settings
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
-from django.conf import settings
-from django.contrib.gis.measure import D
-from django.contrib.gis.db.models.functions import Distance
 
-from .models import RiderProfile
+from .geo_index import nearby_idle_riders
 from .serializers import RiderDeliverySerializer
 
 # Ek logger setup karein
@@ -15,7 +13,13 @@ def notify_nearby_riders(delivery_object, request_context=None):
     """
     Ek helper function jo ek 'PENDING_ACCEPTANCE' delivery ke liye
     nearby available riders ko WebSocket notification bhejta hai.
+    --- UPDATED: DELIVERY_BATCH_DISPATCH on ho toh broadcast nahi hota;
+    agla dispatch tick (delivery/dispatch.py) targeted offer bhejta hai ---
     """
+    if settings.DELIVERY_BATCH_DISPATCH:
+        logger.info(f"Order {delivery_object.order.order_id} READY, batch dispatch queue mein.")
+        return
+
     try:
         order = delivery_object.order
         store_location = order.store.location
@@ -23,20 +27,10 @@ def notify_nearby_riders(delivery_object, request_context=None):
         if not store_location:
             raise Exception("Store ki location set nahi hai.")
 
-        nearby_available_riders = RiderProfile.objects.filter(
-            user__is_active=True,
-            is_online=True,
-            on_delivery=False,
-            current_location__isnull=False,
-            current_location__distance_lte=(
-                store_location, 
-                D(km=settings.RIDER_SEARCH_RADIUS_KM)
-            )
-        ).annotate(
-            distance_to_store=Distance('current_location', store_location)
-        ).order_by('distance_to_store')[:10]
+        # --- UPDATED: Redis geo index se (Postgres query nahi) ---
+        nearby_rider_ids = [rider_id for rider_id, _ in nearby_idle_riders(store_location)]
 
-        if not nearby_available_riders.exists():
+        if not nearby_rider_ids:
             logger.info(f"Order {order.order_id} READY, lekin koi nearby rider available nahi hai.")
             return
 
@@ -51,8 +45,8 @@ def notify_nearby_riders(delivery_object, request_context=None):
             context=context
         ).data
 
-        for rider in nearby_available_riders:
-            group_name = f"rider_{rider.id}"
+        for rider_id in nearby_rider_ids:
+            group_name = f"rider_{rider_id}"
             async_to_sync(channel_layer.group_send)(
                 group_name,
                 {
@@ -61,7 +55,7 @@ def notify_nearby_riders(delivery_object, request_context=None):
                 }
             )
         
-        logger.info(f"Order {order.order_id} READY. Notified {len(nearby_available_riders)} nearby riders.")
+        logger.info(f"Order {order.order_id} READY. Notified {len(nearby_rider_ids)} nearby riders.")
 
     except Exception as e:
         logger.error(f"CRITICAL: Order {delivery_object.order.order_id} ready, but failed to send rider notification: {e}")
\ No newline at end of file
@@ -16,14 +16,14 @@ from django.contrib.gis.measure import D
 from django.conf import settings
 from rest_framework.exceptions import NotFound # <-- Naya Import
 from rest_framework.parsers import MultiPartParser, FormParser # <-- Naya Import
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 # Model Imports
 from orders.models import Order, Payment
 from .models import RiderProfile, Delivery, RiderEarning, RiderCashDeposit
 from .models import RiderApplication, RiderDocument # <-- NAYE MODELS
+from .models import DeliveryTrail
 
 # Serializer Imports
+from .transitions import RIDER_STATUSES, can_transition, transition, transition_by_id
 from .serializers import (
     RiderProfileDetailSerializer,
     RiderProfileUpdateSerializer,
@@ -38,6 +38,7 @@ from .serializers import (
     RiderDocumentUploadSerializer       # <-- NAYA
 )
 from orders.serializers import OrderDetailSerializer
+from orders.fulfilment import HELD_FOR_SLOT, is_held
 
 # Permission Imports
 from accounts.permissions import IsRider, IsStoreStaff
@@ -60,44 +61,28 @@ class RiderProfileView(generics.RetrieveUpdateAPIView):
         return profile
 
 class RiderLocationUpdateView(generics.UpdateAPIView):
+    """
+    --- UPDATED ---
+    Rider ka location ping (HTTP fallback; app normally WebSocket par
+    LOCATION frames bhejta hai). Position Redis buffer mein jaati hai (locations.py),
+    DB mein 'flush_rider_locations' task batch mein likhta hai. Active order
+    (tracking broadcast) bhi cache se aata hai, isliye ping par koi DB
+    write/query nahi hoti.
+    """
     permission_classes = [IsAuthenticated, IsRider]
     serializer_class = RiderLocationUpdateSerializer
-    def get_object(self):
-        profile, created = RiderProfile.objects.get_or_create(user=self.request.user)
-        return profile
+
     def update(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = self.get_serializer(instance, data=request.data) 
+        from .locations import broadcast_rider_location, record_ping
+
+        serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        updated_location_data = serializer.save()
-        try:
-            active_delivery = Delivery.objects.get(
-                rider=instance,
-                status__in=[
-                    Delivery.DeliveryStatus.ACCEPTED,
-                    Delivery.DeliveryStatus.AT_STORE,
-                    Delivery.DeliveryStatus.PICKED_UP
-                ]
-            )
-            if active_delivery:
-                    order_id = active_delivery.order.order_id
-                    group_name = f"order_{order_id}"
-                    channel_layer = get_channel_layer()
-                    location_payload = {
-                        'latitude': updated_location_data.current_location.y,
-                        'longitude': updated_location_data.current_location.x
-                    }
-                    async_to_sync(channel_layer.group_send)(
-                        group_name,
-                        {
-                            "type": "rider.location.update", 
-                            "location": location_payload
-                        }
-                    )
-        except Delivery.DoesNotExist:
-            pass # No active delivery
-        except Exception as e:
-            logger.error(f"Error broadcasting location for {instance.user.username}: {e}") # <-- CHANGED
+        latitude = serializer.validated_data['latitude']
+        longitude = serializer.validated_data['longitude']
+
+        rider_id = request.user.rider_profile.id
+        if record_ping(rider_id, latitude, longitude):
+            broadcast_rider_location(rider_id, latitude, longitude)
         return Response({"success": "Location updated successfully."}, status=status.HTTP_200_OK)
 
 class AvailableDeliveryListView(generics.ListAPIView):
@@ -131,24 +116,38 @@ class AcceptDeliveryView(generics.GenericAPIView):
                 {"error": "You are already on an active delivery."}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-        try:
-            with transaction.atomic():
-                delivery = Delivery.objects.select_for_update().get(
-                    id=delivery_id, 
-                    status=Delivery.DeliveryStatus.PENDING_ACCEPTANCE,
-                    rider__isnull=True
+        # --- NAYA: Batch dispatch offer kisi aur rider ko hai toh row lock tak mat jao ---
+        from .dispatch import offered_rider_id, release_offer
+        offered_to = offered_rider_id(delivery_id)
+        if offered_to and offered_to != rider_profile.id:
+            return Response(
+                {"error": "Delivery is currently offered to another rider."},
+                status=status.HTTP_409_CONFLICT
+            )
+        # --- UPDATED: Ek conditional UPDATE (delivery/transitions.py), row lock nahi ---
+        accepted = transition_by_id(
+            delivery_id,
+            Delivery.DeliveryStatus.PENDING_ACCEPTANCE,
+            Delivery.DeliveryStatus.ACCEPTED,
+            rider_id=rider_profile.id
+        )
+        if not accepted:
+            # on_delivery isi transaction mein set hota hai; race mein doosri delivery jeet gayi
+            if RiderProfile.objects.filter(pk=rider_profile.id, on_delivery=True).exists():
+                return Response(
+                    {"error": "You are already on an active delivery."},
+                    status=status.HTTP_409_CONFLICT
                 )
-                delivery.rider = rider_profile
-                delivery.status = Delivery.DeliveryStatus.ACCEPTED
-                delivery.accepted_at = timezone.now()
-                delivery.save() 
-            serializer = RiderDeliverySerializer(delivery)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Delivery.DoesNotExist:
             return Response(
                 {"error": "Delivery not available or already taken."}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        release_offer(delivery_id, rider_profile.id)
+        delivery = Delivery.objects.select_related(
+            'order__store', 'order__delivery_address'
+        ).prefetch_related('order__payments').get(id=delivery_id)
+        serializer = RiderDeliverySerializer(delivery)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
 class UpdateDeliveryStatusView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated, IsRider]
@@ -166,26 +165,17 @@ class UpdateDeliveryStatusView(generics.GenericAPIView):
                 rider=rider_profile
             )
             current_status = delivery.status
-            
-            if current_status == Delivery.DeliveryStatus.ACCEPTED and \
-               new_status == Delivery.DeliveryStatus.AT_STORE:
-                delivery.at_store_at = timezone.now()
-                delivery.status = new_status
-                delivery.save()
-            
-            elif current_status == Delivery.DeliveryStatus.AT_STORE and \
-                 new_status == Delivery.DeliveryStatus.PICKED_UP:
-                delivery.picked_up_at = timezone.now()
-                delivery.status = new_status
-                delivery.save()
-            
-            elif current_status == Delivery.DeliveryStatus.PICKED_UP and \
-                 new_status == Delivery.DeliveryStatus.DELIVERED:
-                with transaction.atomic():
-                    delivery.delivered_at = timezone.now()
-                    delivery.status = new_status
+
+            # --- UPDATED: Transition table (delivery/transitions.py) ---
+            if new_status not in RIDER_STATUSES or not can_transition(current_status, new_status):
+                return Response(
+                    {"error": f"Invalid status transition from '{current_status}' to '{new_status}'."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            with transaction.atomic():
+                if new_status == Delivery.DeliveryStatus.DELIVERED:
                     order = delivery.order
-                    
                     if order.payment_status == Order.PaymentStatus.PENDING:
                         payment = order.payments.select_for_update().first()
                         if payment and payment.payment_method == Payment.PaymentMethod.COD:
@@ -195,12 +185,14 @@ class UpdateDeliveryStatusView(generics.GenericAPIView):
                             order.save(update_fields=['payment_status'])
                             rider_profile.cash_on_hand = F('cash_on_hand') + order.final_total
                             rider_profile.save(update_fields=['cash_on_hand'])
-                    delivery.save() # RiderEarning create karne ke liye
-            else:
-                return Response(
-                    {"error": f"Invalid status transition from '{current_status}' to '{new_status}'."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+                # Order status, rider status, earning aur push outbox se (commit ke baad)
+                if not transition(delivery, new_status):
+                    # Beech mein kisi aur request ne status badal diya; COD changes bhi rollback
+                    transaction.set_rollback(True)
+                    return Response(
+                        {"error": "Delivery status was changed by another request. Please refresh."},
+                        status=status.HTTP_409_CONFLICT
+                    )
             serializer = RiderDeliverySerializer(delivery)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Exception as e:
@@ -237,10 +229,11 @@ class StaffNewOrderListView(generics.ListAPIView):
         store = staff_profile.store
         if not store:
             return Order.objects.none()
+        # --- UPDATED: Slot ke liye ruke orders release hone par hi dikhenge ---
         return Order.objects.filter(
             store=store,
             status=Order.OrderStatus.CONFIRMED
-        ).prefetch_related(
+        ).exclude(HELD_FOR_SLOT).select_related('delivery_slot').prefetch_related(
             'items', 
             'items__inventory_item__variant__product'
         ).order_by('created_at')
@@ -268,6 +261,10 @@ class StaffUpdateOrderStatusView(generics.GenericAPIView):
             delivery = Delivery.objects.get(order=order) 
         except (Order.DoesNotExist, Delivery.DoesNotExist):
             return Response({"error": "Order not found at your store."}, status=status.HTTP_404_NOT_FOUND)
+
+        # --- NAYA: Slot order release se pehle aage nahi badhta (orders/fulfilment.py) ---
+        if is_held(order):
+            return Response({"error": "This scheduled order is not released for picking yet."}, status=status.HTTP_400_BAD_REQUEST)
         
         if new_status == Order.OrderStatus.PREPARING and \
            order.status == Order.OrderStatus.CONFIRMED:
@@ -283,8 +280,9 @@ class StaffUpdateOrderStatusView(generics.GenericAPIView):
             with transaction.atomic():
                 order.status = Order.OrderStatus.READY_FOR_PICKUP
                 order.save()
-                delivery.status = Delivery.DeliveryStatus.PENDING_ACCEPTANCE
-                delivery.save()
+                # --- UPDATED: Transition table (delivery/transitions.py) ---
+                if can_transition(delivery.status, Delivery.DeliveryStatus.PENDING_ACCEPTANCE):
+                    transition(delivery, Delivery.DeliveryStatus.PENDING_ACCEPTANCE)
 
             try:
                 # --- UPDATED CALL ---
@@ -299,6 +297,40 @@ class StaffUpdateOrderStatusView(generics.GenericAPIView):
         
         return Response({"error": "Invalid status transition."}, status=status.HTTP_400_BAD_REQUEST)
 
+class DeliveryTrailView(generics.GenericAPIView):
+    """
+    --- NAYA: Delivery route replay (support / ops) ---
+    GET /api/delivery/staff/order/<order_id>/trail/?zoom=<0-22>
+    Trail ek row se padha jaata hai (delivery/trails.py). zoom diya ho toh
+    us zoom ke liye Douglas-Peucker se simplified path, warna saare points.
+    Admin sab trails dekh sakta hai, store staff sirf apne store ke.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        # --- GUARDED IMPORT ---
+        from .trails import replay_payload
+        # --- END GUARDED IMPORT ---
+
+        trail = DeliveryTrail.objects.filter(order_id_str=self.kwargs.get('order_id')).first()
+        user = request.user
+        if not user.is_staff:
+            staff_profile = getattr(user, 'store_staff_profile', None)
+            if staff_profile is None:
+                return Response({"error": "Only store staff can view delivery trails."}, status=status.HTTP_403_FORBIDDEN)
+            if trail is not None and trail.store_id_snapshot != staff_profile.store_id:
+                trail = None
+        if trail is None:
+            return Response({"error": "Trail not found for this order."}, status=status.HTTP_404_NOT_FOUND)
+
+        zoom = request.query_params.get('zoom')
+        if zoom is not None:
+            try:
+                zoom = min(max(int(zoom), 0), 22)
+            except ValueError:
+                return Response({"error": "zoom must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(replay_payload(trail, zoom=zoom), status=status.HTTP_200_OK)
+
 class RiderEarningsView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated, IsRider]
     serializer_class = RiderEarningSerializer
@@ -1,6 +1,6 @@
 # orders/admin.py
 from django.contrib import admin
-from .models import Coupon, Order, OrderItem, Payment
+from .models import Coupon, Order, OrderItem, Payment, OrderSnapshot, RazorpayWebhookEvent, OrderEvent, DeliverySlot, OrderInvoice
 from delivery.models import Delivery # Delivery se import karein
 
 @admin.register(Coupon)
@@ -16,7 +16,8 @@ class CouponAdmin(admin.ModelAdmin):
         'valid_from', 
         'valid_to', 
         'times_used', 
-        'max_uses'
+        'max_uses',
+        'max_uses_per_user'
     )
     list_filter = ('discount_type', 'is_active', 'valid_to')
     search_fields = ('code',)
@@ -30,7 +31,7 @@ class OrderItemInline(admin.TabularInline):
     """
     model = OrderItem
     extra = 0
-    fields = ('product_name', 'variant_name', 'price_at_order', 'quantity', 'item_total_price')
+    fields = ('product_name', 'variant_name', 'price_at_order', 'quantity', 'item_total_price', 'tax_rate', 'line_discount', 'line_tax')
     readonly_fields = fields # Sab kuch readonly hai kyunki yeh snapshot hai
 
 class PaymentInline(admin.TabularInline):
@@ -115,4 +116,67 @@ class PaymentAdmin(admin.ModelAdmin):
     """
     list_display = ('transaction_id', 'order', 'payment_method', 'amount', 'status')
     list_filter = ('status', 'payment_method')
-    search_fields = ('transaction_id', 'order__order_id', 'razorpay_order_id')
\ No newline at end of file
+    search_fields = ('transaction_id', 'order__order_id', 'razorpay_order_id')
+
+@admin.register(OrderSnapshot)
+class OrderSnapshotAdmin(admin.ModelAdmin):
+    """
+    Order snapshots sirf dekhne ke liye (signals se apne aap bante hain).
+    """
+    list_display = ('order_id_str', 'user', 'version', 'created_at', 'updated_at')
+    search_fields = ('order_id_str', 'user__username')
+    readonly_fields = ('order', 'order_id_str', 'user', 'detail', 'summary', 'version', 'created_at', 'updated_at')
+
+
+@admin.register(RazorpayWebhookEvent)
+class RazorpayWebhookEventAdmin(admin.ModelAdmin):
+    """
+    Razorpay webhook inbox (debugging / failed events dekhne ke liye).
+    """
+    list_display = ('event_id', 'event', 'razorpay_order_id', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('status', 'event')
+    search_fields = ('event_id', 'razorpay_order_id')
+    readonly_fields = ('event_id', 'event', 'razorpay_order_id', 'payload', 'received_at', 'processed_at')
+
+
+@admin.register(OrderEvent)
+class OrderEventAdmin(admin.ModelAdmin):
+    """
+    Order timeline events (append-only, sirf dekhne ke liye).
+    """
+    list_display = ('order', 'seq', 'event_type', 'from_status', 'to_status', 'store', 'created_at')
+    list_filter = ('event_type', 'store')
+    search_fields = ('order__order_id',)
+    readonly_fields = ('order', 'store', 'seq', 'event_type', 'from_status', 'to_status', 'data', 'created_at')
+
+
+@admin.register(DeliverySlot)
+class DeliverySlotAdmin(admin.ModelAdmin):
+    """
+    Scheduled delivery slots aur unki capacity.
+    """
+    list_display = ('store', 'start_at', 'end_at', 'max_orders', 'max_items', 'max_rider_minutes', 'is_active')
+    list_filter = ('store', 'is_active')
+    list_editable = ('max_orders', 'max_items', 'max_rider_minutes', 'is_active')
+    date_hierarchy = 'start_at'
+
+
+@admin.register(OrderInvoice)
+class OrderInvoiceAdmin(admin.ModelAdmin):
+    """
+    Generated GST invoices. 'Regenerate' action chune hue invoices ko
+    background mein dobara render karta hai (template badalne par).
+    """
+    list_display = ('invoice_number', 'order', 'template_version', 'content_hash', 'generated_at')
+    list_filter = ('template_version',)
+    search_fields = ('invoice_number', 'order__order_id', 'content_hash')
+    readonly_fields = ('order', 'invoice_number', 'content_hash', 'pdf', 'template_version', 'generated_at')
+    actions = ['regenerate_invoices']
+
+    @admin.action(description="Regenerate selected invoices")
+    def regenerate_invoices(self, request, queryset):
+        from .tasks import generate_order_invoice_task
+        order_pks = list(queryset.values_list('order_id', flat=True))
+        for order_pk in order_pks:
+            generate_order_invoice_task.delay(order_pk, force=True)
+        self.message_user(request, f"{len(order_pks)} invoices regeneration ke liye queue ho gaye.")
@@ -0,0 +1,150 @@
+# orders/archive.py
+"""
+Purane (finished) orders ko live tables se '<table>_archive' tables mein
+move karne ka job.
+
+Live tables (orders_order, delivery_delivery, wms_picktask, ...) mein sirf
+recent aur chal rahe orders rehte hain, isliye store dashboards, manager
+lists aur retry jobs ke indexes order volume ke saath nahi badhte.
+Archived data wahi columns rakhta hai (migration 0005 'CREATE TABLE ...
+(LIKE ... INCLUDING ALL)') aur ArchivedOrder / ArchivedOrderSnapshot
+(unmanaged models) se padha ja sakta hai.
+
+Ek order ke saath uske saare rows (items, payments, snapshot, events,
+invoice, delivery, pick tasks) ek hi transaction mein move hote hain.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Order, OrderItem, Payment, OrderSnapshot, OrderEvent, OrderInvoice
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+ARCHIVABLE_STATUSES = (
+    Order.OrderStatus.DELIVERED,
+    Order.OrderStatus.CANCELLED,
+    Order.OrderStatus.FAILED,
+)
+
+
+def archive_table_name(model):
+    return f"{model._meta.db_table}_archive"
+
+
+def archive_plan():
+    """
+    (model, order_fk_column) list. Children pehle, Order aakhir mein
+    (FK constraints deferred hain, phir bhi order saaf rakha hai).
+    """
+    # --- GUARDED IMPORTS (Circular dependency se bachne ke liye) ---
+    from delivery.models import Delivery
+    from wms.models import PickTask
+    # --- END GUARDED IMPORTS ---
+    return [
+        (OrderItem, 'order_id'),
+        (Payment, 'order_id'),
+        (OrderSnapshot, 'order_id'),
+        (OrderEvent, 'order_id'),
+        (OrderInvoice, 'order_id'),
+        (PickTask, 'order_id'),
+        (Delivery, 'order_id'),
+        (Order, 'id'),
+    ]
+
+
+def archive_columns_missing(cursor, model):
+    """Live table ke woh columns jo archive table mein nahi hain (schema drift check)."""
+    live = {col.name for col in connection.introspection.get_table_description(cursor, model._meta.db_table)}
+    archived = {col.name for col in connection.introspection.get_table_description(cursor, archive_table_name(model))}
+    return sorted(live - archived)
+
+
+def archivable_order_ids(cutoff, limit):
+    """
+    Cutoff se purane finished orders. Support tickets waale orders live
+    rehte hain (ticket ka order link na toote).
+    """
+    return list(
+        Order.objects.filter(
+            created_at__lt=cutoff,
+            status__in=ARCHIVABLE_STATUSES,
+            support_tickets__isnull=True
+        ).order_by('id').values_list('id', flat=True)[:limit]
+    )
+
+
+def ensure_snapshots(order_ids):
+    """Jin orders ka snapshot nahi bana, unka archive se pehle bana dein (history ke liye)."""
+    from .snapshots import write_order_snapshot
+    missing = Order.objects.filter(id__in=order_ids, snapshot__isnull=True).values_list('id', flat=True)
+    for order_pk in missing:
+        write_order_snapshot(order_pk)
+
+
+def move_orders_to_archive(order_ids):
+    """
+    Diye gaye orders aur unke child rows ko archive tables mein copy karke
+    live tables se delete karta hai (ek transaction).
+    RiderEarning move nahi hota (payouts se linked ledger hai); uska
+    delivery link on_delete=SET_NULL jaisa NULL ho jaata hai aur
+    order_id_str bacha rehta hai.
+    """
+    from delivery.models import Delivery, RiderEarning
+
+    moved = {}
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {RiderEarning._meta.db_table} SET delivery_id = NULL "
+            f"WHERE delivery_id IN (SELECT id FROM {Delivery._meta.db_table} WHERE order_id = ANY(%s))",
+            [order_ids]
+        )
+        for model, fk_column in archive_plan():
+            columns = ', '.join(
+                connection.ops.quote_name(field.column) for field in model._meta.concrete_fields
+            )
+            table = model._meta.db_table
+            cursor.execute(
+                f"INSERT INTO {archive_table_name(model)} ({columns}) "
+                f"SELECT {columns} FROM {table} WHERE {fk_column} = ANY(%s) "
+                f"ON CONFLICT DO NOTHING",
+                [order_ids]
+            )
+            cursor.execute(f"DELETE FROM {table} WHERE {fk_column} = ANY(%s)", [order_ids])
+            moved[model._meta.label] = cursor.rowcount
+    return moved
+
+
+def archive_old_orders():
+    """
+    ORDER_ARCHIVE_AFTER_DAYS se purane finished orders ko batches mein archive karta hai.
+    Return: {model label: moved rows}
+    """
+    cutoff = timezone.now() - timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS)
+    totals = {}
+
+    with connection.cursor() as cursor:
+        for model, _ in archive_plan():
+            missing = archive_columns_missing(cursor, model)
+            if missing:
+                logger.critical(
+                    f"ORDER ARCHIVE: {archive_table_name(model)} mein columns missing hain {missing}. "
+                    "Archive table ko migrate karein; job skip ho raha hai."
+                )
+                return totals
+
+    for _ in range(settings.ORDER_ARCHIVE_MAX_BATCHES):
+        order_ids = archivable_order_ids(cutoff, settings.ORDER_ARCHIVE_BATCH_SIZE)
+        if not order_ids:
+            break
+        ensure_snapshots(order_ids)
+        for label, count in move_orders_to_archive(order_ids).items():
+            totals[label] = totals.get(label, 0) + count
+    else:
+        logger.warning("ORDER ARCHIVE: Max batches reached, baaki orders agle run mein archive honge.")
+
+    return totals
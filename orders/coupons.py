@@ -0,0 +1,219 @@
+# orders/coupons.py
+"""
+Coupon redemption counters (Redis).
+
+Pehle har confirm hone wala order Coupon row par select_for_update leta tha
+(times_used + 1), isliye viral coupon par saare confirmations ek hi row ke
+peeche line lagate the, aur is_valid() bina reservation ke check karta tha.
+
+Ab usage Redis (django cache) ke atomic INCR counters se aata hai:
+- 'coupon_used_<id>': coupon kitni baar redeem hua (max_uses se compare)
+- 'coupon_used_<id>_user_<user_id>': user ne kitni baar redeem kiya
+  (max_uses_per_user se compare)
+Limit se upar gaya INCR turant DECR ho jaata hai, isliye overshoot nahi hota.
+
+Token checkout par (PENDING order banne se pehle) liya jaata hai, slot
+capacity (slots.py) ki tarah; payment confirm hone par koi limit check
+nahi hota, isliye captured payment coupon ki wajah se kabhi fail nahi hota.
+Order FAILED ho toh signals.py token wapas karta hai; bina payment ke
+COUPON_PENDING_HOLD_MINUTES se purane PENDING orders ka token
+'reconcile_coupon_usage' wapas karta hai.
+Counter pehli baar DB ke orders se initialize hota hai, aur
+'reconcile_coupon_usage' task har minute counters ko DB ke hisaab se
+sync karke Coupon.times_used batch mein likhta hai. Redis na mile toh
+purana row-lock path chalta hai.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Coupon, Order
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+# In statuses ke orders ne coupon use nahi kiya (baaki sab 'used' gine jaate hain,
+# purane times_used behaviour ki tarah cancelled orders bhi). PENDING order
+# token hold karta hai jab tak woh COUPON_PENDING_HOLD_MINUTES se purana na ho.
+UNREDEEMED_STATUSES = (
+    Order.OrderStatus.FAILED,
+)
+
+# Expiry ke baad counters itni der aur rehte hain (aakhri reconcile ke liye)
+COUNTER_GRACE = timedelta(days=1)
+
+
+class CouponLimitReached(Exception):
+    """Coupon (ya user) ki usage limit poori ho chuki hai."""
+    pass
+
+
+def usage_key(coupon_id, user_id=None):
+    if user_id is None:
+        return f"coupon_used_{coupon_id}"
+    return f"coupon_used_{coupon_id}_user_{user_id}"
+
+
+def _counter_timeout(coupon):
+    seconds = (coupon.valid_to + COUNTER_GRACE - timezone.now()).total_seconds()
+    return max(int(seconds), 60)
+
+
+def _stale_pending(now=None):
+    now = now or timezone.now()
+    return Q(
+        status=Order.OrderStatus.PENDING,
+        created_at__lt=now - timedelta(minutes=settings.COUPON_PENDING_HOLD_MINUTES)
+    )
+
+
+def _redeemed_orders(coupon, user_id=None):
+    orders = Order.objects.filter(coupon=coupon).exclude(
+        status__in=UNREDEEMED_STATUSES
+    ).exclude(_stale_pending())
+    if user_id is not None:
+        orders = orders.filter(user_id=user_id)
+    return orders
+
+
+def _ensure_counter(coupon, user_id=None):
+    """Counter na ho toh DB se initialize karta hai (cache.add = sirf agar absent)."""
+    key = usage_key(coupon.id, user_id)
+    if cache.get(key) is None:
+        cache.add(key, _redeemed_orders(coupon, user_id).count(), timeout=_counter_timeout(coupon))
+    return key
+
+
+def coupon_usage(coupon, user_id=None):
+    """Coupon (ya user) ka current usage count. Redis na mile toh DB."""
+    try:
+        return cache.get(_ensure_counter(coupon, user_id))
+    except Exception as e:
+        logger.warning(f"Coupon {coupon.code} usage Redis se nahi mila, DB use ho raha hai: {e}")
+        if user_id is None:
+            return coupon.times_used
+        return _redeemed_orders(coupon, user_id).count()
+
+
+def _take_token(coupon, limit, user_id=None):
+    key = _ensure_counter(coupon, user_id)
+    if cache.incr(key) > limit:
+        cache.decr(key)
+        return False
+    return True
+
+
+def redeem_coupon(coupon, user_id):
+    """
+    Checkout par (order banne se pehle) ek redemption reserve karta hai.
+    Limit poori ho toh CouponLimitReached. Return: True agar Redis se
+    reserve hua (order na ban paaye toh release_coupon call karein), False
+    agar Redis down tha aur DB row-lock fallback chala.
+    """
+    try:
+        if not _take_token(coupon, coupon.max_uses):
+            raise CouponLimitReached("Coupon has reached its usage limit.")
+        if coupon.max_uses_per_user is not None:
+            if not _take_token(coupon, coupon.max_uses_per_user, user_id):
+                cache.decr(usage_key(coupon.id))
+                raise CouponLimitReached("You have already used this coupon the maximum number of times.")
+        return True
+    except CouponLimitReached:
+        raise
+    except Exception as e:
+        logger.warning(f"Coupon {coupon.code} Redis counter fail hua, DB row-lock fallback: {e}")
+
+    # --- Fallback: purana row-lock path ---
+    locked = Coupon.objects.select_for_update().get(id=coupon.id)
+    if locked.times_used >= locked.max_uses:
+        raise CouponLimitReached("Coupon has reached its usage limit.")
+    if locked.max_uses_per_user is not None and _redeemed_orders(locked, user_id).count() >= locked.max_uses_per_user:
+        raise CouponLimitReached("You have already used this coupon the maximum number of times.")
+    Coupon.objects.filter(id=coupon.id).update(times_used=F('times_used') + 1)
+    return False
+
+
+def release_coupon(coupon, user_id):
+    """redeem_coupon() ka reservation wapas karta hai (order fail hone par)."""
+    try:
+        cache.decr(usage_key(coupon.id))
+        if coupon.max_uses_per_user is not None:
+            cache.decr(usage_key(coupon.id, user_id))
+    except Exception as e:
+        logger.error(f"Coupon {coupon.code} ka reservation release nahi ho paaya: {e}")
+
+
+def release_coupon_for_order(order_pk):
+    """Order ke coupon ka token wapas karta hai (signals.py se, commit ke baad)."""
+    order = Order.objects.filter(pk=order_pk, coupon__isnull=False).select_related('coupon').first()
+    if order is not None:
+        release_coupon(order.coupon, order.user_id)
+
+
+def _apply_drift(key, counter, db_count):
+    drift = counter - db_count
+    if drift > 0:
+        cache.decr(key, drift)
+    elif drift < 0:
+        cache.incr(key, -drift)
+    return drift != 0
+
+
+def reconcile_coupon_usage():
+    """
+    Active / haal hi mein expire hue coupons ke Redis counters ko DB ke
+    hisaab se sync karta hai (e.g., bina payment ke pade PENDING orders ka
+    token wapas) aur phir Coupon.times_used batch mein likhta hai.
+    SET ke bajaye drift ka INCR/DECR hota hai taaki beech mein liye gaye
+    tokens overwrite na hon. Return: updated coupons.
+    """
+    now = timezone.now()
+    coupons = list(Coupon.objects.filter(valid_to__gte=now - COUNTER_GRACE))
+    if not coupons:
+        return 0
+
+    redeemed = Order.objects.filter(coupon__in=coupons).exclude(
+        status__in=UNREDEEMED_STATUSES
+    ).exclude(_stale_pending(now))
+    db_counts = dict(redeemed.values('coupon_id').annotate(used=Count('id')).values_list('coupon_id', 'used'))
+    counters = cache.get_many([usage_key(coupon.id) for coupon in coupons])
+
+    # Per-user counters: sirf un users ke jinke stale PENDING orders ne token pakda tha
+    stale_users = set(
+        Order.objects.filter(
+            _stale_pending(now),
+            coupon__in=[coupon for coupon in coupons if coupon.max_uses_per_user is not None],
+            created_at__gte=now - timedelta(minutes=settings.COUPON_PENDING_HOLD_MINUTES) - COUNTER_GRACE,
+        ).values_list('coupon_id', 'user_id').distinct()
+    )
+    user_counts = {}
+    if stale_users:
+        user_counts = {
+            (row['coupon_id'], row['user_id']): row['used']
+            for row in redeemed.filter(
+                user_id__in={user_id for _, user_id in stale_users}
+            ).values('coupon_id', 'user_id').annotate(used=Count('id'))
+        }
+    user_keys = {pair: usage_key(*pair) for pair in stale_users}
+    user_counters = cache.get_many(list(user_keys.values())) if user_keys else {}
+    for pair, key in user_keys.items():
+        if user_counters.get(key) is not None:
+            _apply_drift(key, user_counters[key], user_counts.get(pair, 0))
+
+    changed = []
+    for coupon in coupons:
+        key = usage_key(coupon.id)
+        used = db_counts.get(coupon.id, 0)
+        if counters.get(key) is not None:
+            _apply_drift(key, counters[key], used)
+        if used != coupon.times_used:
+            coupon.times_used = used
+            changed.append(coupon)
+
+    if changed:
+        Coupon.objects.bulk_update(changed, ['times_used'])
+    return len(changed)
@@ -0,0 +1,71 @@
+# orders/events.py
+"""
+OrderEvent (append-only timeline) likhne ke helpers.
+
+Order aur Delivery ka status kai jagah se badalta hai (delivery outbox,
+PickTaskCompleteView, StaffUpdateOrderStatusView, OrderCancelView,
+ManualPackView, ...). Har jagah alag code likhne ke bajaye signals.py
+post_init par purana status yaad rakhta hai aur post_save par badlaav
+dikhne par yahan se event likhta hai - usi DB transaction mein jismein
+save hua. Delivery status transitions (delivery/transitions.py) .update()
+se hote hain, isliye unke events delivery/outbox.py seedha likhta hai.
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+
+from .models import OrderEvent
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+# Do saves ek hi order par 'seq' ke liye race karein toh itni baar retry
+SEQ_RETRIES = 3
+
+
+def record_order_event(order_id, store_id, event_type, to_status='', from_status='', data=None):
+    """
+    Order ke liye agla event (seq = last + 1) likhta hai.
+    (order, seq) unique hai; race hone par savepoint rollback karke retry hota hai.
+    """
+    for _ in range(SEQ_RETRIES):
+        try:
+            with transaction.atomic():
+                last_seq = OrderEvent.objects.filter(order_id=order_id).aggregate(
+                    last=Max('seq')
+                )['last'] or 0
+                return OrderEvent.objects.create(
+                    order_id=order_id,
+                    store_id=store_id,
+                    seq=last_seq + 1,
+                    event_type=event_type,
+                    from_status=from_status or '',
+                    to_status=to_status or '',
+                    data=data or {}
+                )
+        except IntegrityError:
+            continue
+    logger.error(f"Order {order_id} ka {event_type} event ({from_status} -> {to_status}) save nahi ho paaya.")
+    return None
+
+
+def remember_tracked_fields(instance, fields):
+    """
+    Instance ke tracked fields ki current value yaad rakhta hai.
+    Deferred fields ko touch nahi karta (warna extra query hogi).
+    """
+    instance._event_tracked = {name: instance.__dict__.get(name) for name in fields}
+
+
+def changed_tracked_fields(instance, fields):
+    """Last remember ke baad kaunse tracked fields badle: {name: (old, new)}."""
+    previous = getattr(instance, '_event_tracked', {})
+    changes = {}
+    for name in fields:
+        if name not in instance.__dict__:
+            continue
+        old, new = previous.get(name), instance.__dict__[name]
+        if old != new:
+            changes[name] = (old, new)
+    return changes
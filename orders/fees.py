@@ -0,0 +1,223 @@
+# orders/fees.py
+"""
+Delivery fee service.
+
+Destination ko geohash cell (DELIVERY_FEE_GEOHASH_PRECISION, default 7 =
+~150m x 150m) mein quantize kiya jaata hai. Har (store, cell) ka base fee,
+distance aur rider travel time cache mein 'delivery_fee_<store>_<cell>' key
+par rehta hai, isliye cart quote aur checkout dono mein fee ek O(1) lookup
+hai. Distance cell ke center se nikalta hai (precision 7 par error ~100m,
+yaani fee mein paise ka farq).
+
+'warm_delivery_fee_cache' task pichle orders ke addresses se cells pehle
+se bhar deta hai; naya cell miss ho toh yahin calculate karke cache ho jaata
+hai (koi DB query nahi). Surge multiplier store-level hai aur alag key
+('delivery_surge_<store>') mein rehta hai, taaki surge badalne par cells
+dobara calculate na karne padein.
+"""
+import logging
+import math
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0088
+PAISE = Decimal('0.01')
+
+
+def geohash_encode(latitude, longitude, precision=None):
+    """(lat, lng) -> geohash string."""
+    precision = precision or settings.DELIVERY_FEE_GEOHASH_PRECISION
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # Geohash mein pehla bit longitude ka hota hai
+    while len(chars) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def geohash_center(cell):
+    """Geohash cell ka center (lat, lng)."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = GEOHASH_BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lng_range[0] + lng_range[1]) / 2
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Do points ke beech seedhi (great-circle) doori km mein."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def fee_key(store_id, cell):
+    return f"delivery_fee_{store_id}_{cell}"
+
+
+def surge_key(store_id):
+    return f"delivery_surge_{store_id}"
+
+
+def fee_for_distance(distance_km):
+    """Purana formula: BASE + km * FEE_PER_KM, MIN/MAX ke beech clamp."""
+    fee = settings.BASE_DELIVERY_FEE + (Decimal(str(distance_km)) * settings.FEE_PER_KM)
+    fee = min(fee, settings.MAX_DELIVERY_FEE)
+    fee = max(fee, settings.MIN_DELIVERY_FEE)
+    return fee.quantize(PAISE, rounding=ROUND_HALF_UP)
+
+
+def travel_minutes_for_distance(distance_km):
+    """Store se cell tak rider ka andaazan travel time (road factor ke saath)."""
+    road_km = distance_km * settings.DELIVERY_ROAD_FACTOR
+    return max(1, math.ceil(road_km / settings.RIDER_AVG_SPEED_KMPH * 60))
+
+
+def compute_cell_entry(store_location, cell):
+    """Ek (store, cell) ka cache entry: base fee, distance, travel time."""
+    lat, lng = geohash_center(cell)
+    distance_km = round(haversine_km(store_location.y, store_location.x, lat, lng), 3)
+    return {
+        'fee': str(fee_for_distance(distance_km)),
+        'distance_km': distance_km,
+        'travel_minutes': travel_minutes_for_distance(distance_km),
+    }
+
+
+def get_surge_multiplier(store_id):
+    try:
+        value = cache.get(surge_key(store_id))
+    except Exception as e:
+        logger.warning(f"Surge multiplier cache read fail (store {store_id}): {e}")
+        value = None
+    return Decimal(value) if value else Decimal('1.00')
+
+
+def set_surge_multiplier(store_id, multiplier, minutes):
+    """
+    Store par 'minutes' tak surge lagata hai. multiplier 1.00 ho toh surge hata deta hai.
+    Multiplier DELIVERY_SURGE_MAX_MULTIPLIER par cap hota hai.
+    """
+    multiplier = min(Decimal(multiplier), settings.DELIVERY_SURGE_MAX_MULTIPLIER).quantize(PAISE)
+    if multiplier <= Decimal('1.00'):
+        cache.delete(surge_key(store_id))
+        return Decimal('1.00')
+    cache.set(surge_key(store_id), str(multiplier), timeout=minutes * 60)
+    return multiplier
+
+
+def quote_delivery_fee(store, location):
+    """
+    Store aur destination Point ke liye delivery quote (ek cache round trip).
+    Return dict: cell, distance_km, travel_minutes, base_fee, surge_multiplier, delivery_fee.
+    Store ya destination ki location na ho toh MIN_DELIVERY_FEE.
+    """
+    if not store.location or not location:
+        fee = settings.MIN_DELIVERY_FEE
+        return {
+            'cell': None,
+            'distance_km': None,
+            'travel_minutes': None,
+            'base_fee': fee,
+            'surge_multiplier': Decimal('1.00'),
+            'delivery_fee': fee,
+        }
+
+    cell = geohash_encode(location.y, location.x)
+    key = fee_key(store.id, cell)
+    try:
+        cached = cache.get_many([key, surge_key(store.id)])
+    except Exception as e:
+        logger.warning(f"Delivery fee cache read fail (store {store.id}, cell {cell}): {e}")
+        cached = {}
+
+    entry = cached.get(key)
+    if entry is None:
+        entry = compute_cell_entry(store.location, cell)
+        try:
+            cache.set(key, entry, timeout=settings.DELIVERY_FEE_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Delivery fee cache set fail (store {store.id}, cell {cell}): {e}")
+
+    base_fee = Decimal(entry['fee'])
+    surge = Decimal(cached.get(surge_key(store.id)) or '1.00')
+    return {
+        'cell': cell,
+        'distance_km': entry['distance_km'],
+        'travel_minutes': entry['travel_minutes'],
+        'base_fee': base_fee,
+        'surge_multiplier': surge,
+        'delivery_fee': (base_fee * surge).quantize(PAISE, rounding=ROUND_HALF_UP),
+    }
+
+
+def warm_delivery_fee_cache():
+    """
+    Pichle DELIVERY_FEE_WARM_LOOKBACK_DAYS ke orders ke (store, address cell)
+    pairs ke fee entries cache mein bharta hai. Return: kitne cells likhe gaye.
+    """
+    from store.models import Store
+    from .models import Order
+
+    since = timezone.now() - timedelta(days=settings.DELIVERY_FEE_WARM_LOOKBACK_DAYS)
+    stores = Store.objects.filter(is_active=True, location__isnull=False).in_bulk()
+    if not stores:
+        return 0
+
+    rows = Order.objects.filter(
+        created_at__gte=since,
+        store_id__in=list(stores),
+        delivery_address__location__isnull=False,
+    ).values_list('store_id', 'delivery_address__location').iterator(chunk_size=2000)
+
+    cells = set()
+    for store_id, location in rows:
+        cells.add((store_id, geohash_encode(location.y, location.x)))
+
+    written = 0
+    batch = {}
+    for store_id, cell in cells:
+        batch[fee_key(store_id, cell)] = compute_cell_entry(stores[store_id].location, cell)
+        if len(batch) >= 1000:
+            cache.set_many(batch, timeout=settings.DELIVERY_FEE_CACHE_TTL)
+            written += len(batch)
+            batch = {}
+    if batch:
+        cache.set_many(batch, timeout=settings.DELIVERY_FEE_CACHE_TTL)
+        written += len(batch)
+    return written
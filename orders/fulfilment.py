@@ -0,0 +1,241 @@
+# orders/fulfilment.py
+"""
+Order fulfilment release (picking + uske baad dispatch).
+
+Turant delivery wala order payment confirm hote hi release hota hai:
+picker assign, stock allocate, PickTasks (wms/allocation.py). Scheduled
+slot wala order CONFIRMED rehta hai aur uske PickTasks nahi bante;
+'release_slot_orders' task har minute un slot orders ko release karta hai
+jinka slot SLOT_RELEASE_LEAD_MINUTES ke andar shuru ho raha hai. Picking
+khatam hone par hi delivery PENDING_ACCEPTANCE (dispatch) mein jaati hai,
+isliye picking aur rider ka kaam dono booked window ke paas aa jaate hain.
+
+Order.fulfilment_released_at batata hai ki order release ho chuka hai.
+Held order (slot hai, release nahi hua) staff ki 'new orders' list mein
+nahi aata aur staff use manually aage nahi badha sakte.
+
+WMS mein stock pick par katta hai, isliye slot order confirm hote waqt
+stock reserve nahi hota, sirf check_stock() hota hai (kam ho toh order
+wahin fail + refund). Release ke waqt allocation fail ho toh order
+SLOT_RELEASE_MAX_ATTEMPTS runs tak retry hota hai; uske baad (ya slot
+khatam hone par) fail_slot_order() order ko FAILED karke refund queue
+karta hai aur customer ko batata hai (slot capacity / coupon token
+signals.py wapas karta hai).
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Order
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+# Slot order jiski picking abhi shuru nahi hui
+HELD_FOR_SLOT = Q(delivery_slot__isnull=False, fulfilment_released_at__isnull=True)
+
+
+def release_at(slot_start_at):
+    """Slot order kab release hoga."""
+    return slot_start_at - timedelta(minutes=settings.SLOT_RELEASE_LEAD_MINUTES)
+
+
+def is_held(order):
+    """Order slot ke liye ruka hua hai (abhi picking nahi honi)."""
+    return bool(order.delivery_slot_id) and order.fulfilment_released_at is None
+
+
+def should_release_now(order, now=None):
+    if not order.delivery_slot_id:
+        return True
+    now = now or timezone.now()
+    return release_at(order.delivery_slot.start_at) <= now
+
+
+def release_attempts_key(order_pk):
+    return f"slot_release_attempts_{order_pk}"
+
+
+def check_stock(order_items):
+    """
+    Held slot order ke liye abhi kaafi summary stock hai ya nahi
+    (StockAllocationError warna). Stock reserve nahi hota.
+    """
+    # --- GUARDED IMPORTS (Circular dependency se bachne ke liye) ---
+    from wms.allocation import build_allocation_lines
+    # --- END GUARDED IMPORTS ---
+
+    build_allocation_lines(order_items)
+
+
+def assign_picker(store):
+    """
+    Store ka agla picker (round-robin: sabse purana last_task_assigned_at).
+    Return: User ya None.
+    """
+    # --- GUARDED IMPORTS (Circular dependency se bachne ke liye) ---
+    from accounts.models import StoreStaffProfile
+    # --- END GUARDED IMPORTS ---
+
+    staff_profile = StoreStaffProfile.objects.filter(
+        store=store,
+        can_pick_orders=True
+    ).order_by(
+        'last_task_assigned_at'  # NULLs first, fir sabse purana
+    ).first()
+    if staff_profile is None:
+        return None
+    staff_profile.last_task_assigned_at = timezone.now()
+    staff_profile.save(update_fields=['last_task_assigned_at'])
+    return staff_profile.user
+
+
+def start_fulfilment(order, order_items=None):
+    """
+    Picker assign karke poore order ke PickTasks banata hai aur order ko
+    released mark karta hai. Transaction ke andar (locked order ke saath)
+    call karein; shortage par StockAllocationError.
+    """
+    # --- GUARDED IMPORTS (Circular dependency se bachne ke liye) ---
+    from wms.allocation import allocate_order
+    # --- END GUARDED IMPORTS ---
+
+    if order_items is None:
+        order_items = list(order.items.all())
+
+    picker_user = assign_picker(order.store_id)
+    if picker_user:
+        logger.info(f"Assigning PickTasks for Order {order.order_id} to Picker {picker_user.username} (Round-Robin)")
+    else:
+        logger.warning(f"WARNING: Order {order.order_id} ke liye koi available picker (can_pick_orders=True) nahi mila.")
+
+    # Poore order ka stock ek saath allocate (2 stock queries + 1 bulk_create)
+    allocate_order(order, order_items, picker_user=picker_user)
+
+    order.fulfilment_released_at = timezone.now()
+    Order.objects.filter(pk=order.pk).update(fulfilment_released_at=order.fulfilment_released_at)
+
+
+def _record_failed_attempt(order_pk):
+    """Release ki fail hui koshishon ki ginti (cache counter). Return: ab tak ki ginti."""
+    key = release_attempts_key(order_pk)
+    try:
+        cache.add(key, 0, timeout=settings.SLOT_RELEASE_ATTEMPTS_TTL)
+        return cache.incr(key)
+    except Exception as e:
+        logger.warning(f"Slot order {order_pk} ke release attempts count nahi ho paaye: {e}")
+        return 0
+
+
+def fail_slot_order(order_pk, reason):
+    """
+    Held slot order jo release nahi ho paaya use FAILED karta hai:
+    captured Razorpay payment ka refund queue, delivery cancel, customer
+    ko push. Status change ka OrderEvent (reason ke saath) signals.py
+    likhta hai; slot capacity aur coupon token bhi wahin se wapas.
+    Return: True agar order fail kiya gaya.
+    """
+    # --- GUARDED IMPORTS (Circular dependency se bachne ke liye) ---
+    from accounts.tasks import send_fcm_push_notification_task
+    from delivery.models import Delivery
+    from delivery.transitions import can_transition, transition
+    from .tasks import process_razorpay_refund_task
+    # --- END GUARDED IMPORTS ---
+
+    with transaction.atomic():
+        order = Order.objects.select_for_update(of=('self',)).filter(
+            HELD_FOR_SLOT, pk=order_pk, status=Order.OrderStatus.CONFIRMED
+        ).first()
+        if order is None:
+            return False
+
+        payment_to_refund = None
+        payment = order.payments.filter(
+            status=Order.PaymentStatus.SUCCESSFUL,
+            payment_method='RAZORPAY'
+        ).first()
+        if payment and payment.transaction_id:
+            payment_to_refund = payment
+            payment.status = Order.PaymentStatus.REFUND_INITIATED
+            payment.save(update_fields=['status'])
+            order.payment_status = Order.PaymentStatus.REFUND_INITIATED
+        else:
+            order.payment_status = Order.PaymentStatus.REFUNDED
+
+        order.status = Order.OrderStatus.FAILED
+        order._event_data = {'reason': reason}
+        order.save(update_fields=['status', 'payment_status', 'updated_at'])
+
+        delivery = Delivery.objects.filter(order=order).first()
+        if delivery and can_transition(delivery.status, Delivery.DeliveryStatus.CANCELLED):
+            transition(delivery, Delivery.DeliveryStatus.CANCELLED)
+
+        user_id, order_id = order.user_id, order.order_id
+
+        def _after_commit():
+            try:
+                if payment_to_refund:
+                    process_razorpay_refund_task.delay(payment_to_refund.id)
+                if user_id:
+                    send_fcm_push_notification_task.delay(
+                        user_id,
+                        f"Order {order_id} Update",
+                        "Maaf kijiye, aapka scheduled order pura nahi ho paaya. Payment refund kar diya jaayega.",
+                        {"order_id": order_id, "status": Order.OrderStatus.FAILED}
+                    )
+            except Exception as e:
+                # Refund sweeper / support baad mein utha lenge
+                logger.error(f"Slot order {order_id} ke refund / push tasks queue nahi ho paaye: {e}")
+            try:
+                cache.delete(release_attempts_key(order_pk))
+            except Exception:
+                pass
+        transaction.on_commit(_after_commit)
+
+    logger.warning(f"Slot order {order_id} FAILED (release nahi ho paaya): {reason}")
+    return True
+
+
+def release_due_slot_orders(now=None):
+    """
+    Jin CONFIRMED slot orders ka slot SLOT_RELEASE_LEAD_MINUTES ke andar
+    shuru ho raha hai (ya nikal chuka), unki picking shuru karta hai.
+    Har order alag transaction mein; fail hua order agle run mein dobara,
+    SLOT_RELEASE_MAX_ATTEMPTS ke baad ya slot khatam hone par fail_slot_order().
+    Return: (released, failed)
+    """
+    now = now or timezone.now()
+    due = list(
+        Order.objects.filter(
+            HELD_FOR_SLOT,
+            status=Order.OrderStatus.CONFIRMED,
+            delivery_slot__start_at__lte=now + timedelta(minutes=settings.SLOT_RELEASE_LEAD_MINUTES),
+        ).order_by('delivery_slot__start_at', 'id').values_list('id', 'delivery_slot__end_at')
+    )
+
+    released = failed = 0
+    for order_pk, slot_end_at in due:
+        try:
+            with transaction.atomic():
+                order = Order.objects.select_for_update(skip_locked=True).filter(
+                    HELD_FOR_SLOT, pk=order_pk, status=Order.OrderStatus.CONFIRMED
+                ).first()
+                if order is None:
+                    continue
+                start_fulfilment(order)
+            released += 1
+        except Exception as e:
+            failed += 1
+            attempts = _record_failed_attempt(order_pk)
+            logger.error(f"Slot order {order_pk} release nahi ho paaya (attempt {attempts}): {e}")
+            if attempts >= settings.SLOT_RELEASE_MAX_ATTEMPTS or slot_end_at <= now:
+                try:
+                    fail_slot_order(order_pk, str(e))
+                except Exception as fail_error:
+                    logger.error(f"Slot order {order_pk} ko FAILED mark nahi kar paaye: {fail_error}")
+    return released, failed
@@ -0,0 +1,221 @@
+# orders/invoices.py
+"""
+GST invoice PDF generation.
+
+Order DELIVERED hone par signals.py commit ke baad 'generate_order_invoice'
+task queue karta hai. Task header (store, address, dates) OrderSnapshot se
+aur lines OrderItem rows (frozen tax_rate / line_tax) se leta hai, PDF
+banata hai, aur use storage mein 'invoices/<hash[:2]>/<sha256>.pdf' par
+rakhta hai. Path content hash hai, isliye same content dobara render ho
+toh file dobara nahi likhi jaati, aur file ko hamesha ke liye cache
+(CDN / S3 / nginx) kiya ja sakta hai. Download API sirf URL deti hai.
+
+PDF writer yahin hai (Courier text, koi extra dependency nahi) aur
+deterministic hai: same input = same bytes = same hash.
+Template badle toh INVOICE_TEMPLATE_VERSION badhayein; 'regenerate_invoices'
+task purane version ke invoices batches mein dobara render karta hai (har
+batch ke baad khud ko agle batch ke liye queue karta hai, jab tak koi
+purana invoice na bache). Archive ho chuke orders ke invoices
+(ArchivedOrderInvoice, orders/archive.py) frozen hain: woh purane template
+mein hi rehte hain, dobara render nahi hote.
+"""
+import hashlib
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .models import Order, OrderInvoice
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+PAGE_WIDTH = 595   # A4 (points)
+PAGE_HEIGHT = 842
+MARGIN = 40
+FONT_SIZE = 9
+LINE_HEIGHT = 12
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT
+LINE_WIDTH = 92    # Courier 9pt mein A4 par itne characters
+
+
+def invoice_number(order):
+    return f"INV-{order.order_id}"
+
+
+def invoice_path(content_hash):
+    return f"invoices/{content_hash[:2]}/{content_hash}.pdf"
+
+
+def _money(value):
+    return f"{Decimal(value or 0):.2f}"
+
+
+def _row(left, right=''):
+    """Left text aur right-aligned amount ek line mein."""
+    right = str(right)
+    left = str(left)[:LINE_WIDTH - len(right) - 1]
+    return left.ljust(LINE_WIDTH - len(right)) + right
+
+
+def render_invoice_lines(order, snapshot):
+    """
+    Invoice ka text layout (list of lines).
+    Header snapshot.detail se, lines order ke OrderItems se.
+    """
+    detail = snapshot.detail if snapshot else {}
+    store = detail.get('store') or {}
+    address = detail.get('delivery_address') or {}
+    rule = '-' * LINE_WIDTH
+
+    lines = [
+        settings.INVOICE_SELLER_NAME,
+        f"GSTIN: {settings.INVOICE_SELLER_GSTIN}",
+        f"Store: {store.get('name', '')}",
+        rule,
+        'TAX INVOICE',
+        f"Invoice No: {invoice_number(order)}",
+        f"Order ID:   {order.order_id}",
+        f"Order Date: {order.created_at:%d-%m-%Y %H:%M}",
+        rule,
+        'Bill To:',
+        order.user.get_full_name() or order.user.username,
+        address.get('full_address', ''),
+        f"{address.get('city', '')} {address.get('pincode', '')}".strip(),
+        rule,
+        _row('Item', 'Qty     Rate    GST%   Discount        GST      Amount'),
+        rule,
+    ]
+
+    default_rate = settings.TAX_RATE * 100
+    for item in order.items.all():
+        name = f"{item.product_name} ({item.variant_name})"
+        rate = item.tax_rate if item.tax_rate is not None else default_rate
+        numbers = (
+            f"{item.quantity:>3} {_money(item.price_at_order):>8} {_money(rate):>6} "
+            f"{_money(item.line_discount):>10} {_money(item.line_tax):>10} {_money(item.item_total_price):>11}"
+        )
+        lines.append(_row(name, numbers))
+
+    lines += [
+        rule,
+        _row('Item Subtotal', _money(order.item_subtotal)),
+        _row('Discount', f"-{_money(order.discount_amount)}"),
+        _row('GST', _money(order.taxes_amount)),
+        _row('Delivery Fee', _money(order.delivery_fee)),
+        _row('Rider Tip', _money(order.rider_tip)),
+        rule,
+        _row('Grand Total (Rs.)', _money(order.final_total)),
+        rule,
+        'This is a computer generated invoice.',
+    ]
+    return lines
+
+
+def _pdf_escape(text):
+    text = text.encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def build_pdf(lines):
+    """
+    Text lines se minimal PDF 1.4 (A4, Courier). Multi-page.
+    Koi timestamp nahi likha jaata, isliye output deterministic hai.
+    """
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+
+    # Object numbers: 1 catalog, 2 pages tree, 3 font, phir har page ke liye (page, content)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+    ]
+    page_refs = []
+    for page_lines in pages:
+        stream_lines = [f"BT /F1 {FONT_SIZE} Tf {LINE_HEIGHT} TL {MARGIN} {PAGE_HEIGHT - MARGIN} Td"]
+        for line in page_lines:
+            stream_lines.append(f"({_pdf_escape(line)}) '")
+        stream_lines.append("ET")
+        stream = '\n'.join(stream_lines).encode('latin-1')
+
+        page_number = len(objects) + 1
+        content_number = page_number + 1
+        page_refs.append(f"{page_number} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_number} 0 R >>".encode('latin-1')
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(page_refs)} >>".encode('latin-1')
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(output)
+
+
+def generate_order_invoice(order_pk, force=False):
+    """
+    DELIVERED order ka invoice render karke save karta hai.
+    Current template version ka invoice pehle se ho toh skip (force=True par nahi).
+    Return: OrderInvoice ya None.
+    """
+    from .snapshots import write_order_snapshot
+
+    try:
+        order = Order.objects.select_related('user', 'snapshot').prefetch_related('items').get(pk=order_pk)
+    except Order.DoesNotExist:
+        return None
+
+    if order.status != Order.OrderStatus.DELIVERED:
+        return None
+
+    version = settings.INVOICE_TEMPLATE_VERSION
+    existing = OrderInvoice.objects.filter(order=order).first()
+    if existing and existing.template_version == version and not force:
+        return existing
+
+    snapshot = getattr(order, 'snapshot', None) or write_order_snapshot(order.pk)
+    pdf_bytes = build_pdf(render_invoice_lines(order, snapshot))
+    content_hash = hashlib.sha256(pdf_bytes).hexdigest()
+    path = invoice_path(content_hash)
+
+    # Content-addressed: same hash ki file pehle se hai toh dobara mat likho
+    if not default_storage.exists(path):
+        saved_path = default_storage.save(path, ContentFile(pdf_bytes))
+        if saved_path != path:
+            logger.warning(f"Invoice storage ne path badla: {path} -> {saved_path}")
+            path = saved_path
+
+    invoice, _ = OrderInvoice.objects.update_or_create(
+        order=order,
+        defaults={
+            'invoice_number': invoice_number(order),
+            'content_hash': content_hash,
+            'pdf': path,
+            'template_version': version,
+        }
+    )
+    logger.info(f"Invoice {invoice.invoice_number} generated ({content_hash[:12]}, template v{version})")
+    return invoice
+
+
+def stale_invoice_order_ids(limit, after_order_pk=None):
+    """
+    Purane template version ke invoices (bulk regeneration ke liye),
+    order_id ke order mein 'after_order_pk' ke baad se (keyset pagination).
+    """
+    invoices = OrderInvoice.objects.exclude(template_version=settings.INVOICE_TEMPLATE_VERSION)
+    if after_order_pk is not None:
+        invoices = invoices.filter(order_id__gt=after_order_pk)
+    return list(invoices.order_by('order_id').values_list('order_id', flat=True)[:limit])
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSnapshot',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='orders.order')),
+                ('order_id_str', models.CharField(help_text='Order ID ka copy (bina join ke lookup ke liye)', max_length=15, unique=True)),
+                ('detail', models.JSONField(default=dict, help_text='OrderDetailSerializer jaisa poora document')),
+                ('summary', models.JSONField(default=dict, help_text='OrderHistorySerializer jaisa compact projection')),
+                ('version', models.PositiveIntegerField(default=1, help_text='Har update par badhta hai')),
+                ('created_at', models.DateTimeField(help_text='Order ka created_at (history sorting ke liye)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Order Snapshot',
+                'verbose_name_plural': 'Order Snapshots',
+                'indexes': [models.Index(fields=['user', '-created_at'], name='orders_snap_user_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_ordersnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RazorpayWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(help_text='X-Razorpay-Event-Id header (na ho toh body ka SHA256)', max_length=100, unique=True)),
+                ('event', models.CharField(help_text='e.g., payment.captured', max_length=100)),
+                ('razorpay_order_id', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSED', 'Processed'), ('IGNORED', 'Ignored'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Razorpay Webhook Event',
+                'verbose_name_plural': 'Razorpay Webhook Events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'received_at'], name='orders_rzp_evt_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_razorpaywebhookevent'),
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField(help_text='Order ke andar event ka number')),
+                ('event_type', models.CharField(choices=[('ORDER_STATUS', 'Order Status'), ('PAYMENT_STATUS', 'Payment Status'), ('DELIVERY_STATUS', 'Delivery Status'), ('RIDER_ASSIGNED', 'Rider Assigned')], max_length=20)),
+                ('from_status', models.CharField(blank=True, max_length=30)),
+                ('to_status', models.CharField(blank=True, max_length=30)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='orders.order')),
+                ('store', models.ForeignKey(help_text='Order ka store (store-wise event stream ke liye copy)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_events', to='store.store')),
+            ],
+            options={
+                'verbose_name': 'Order Event',
+                'verbose_name_plural': 'Order Events',
+                'ordering': ['order', 'seq'],
+                'constraints': [models.UniqueConstraint(fields=('order', 'seq'), name='orders_event_order_seq_uniq')],
+                'indexes': [models.Index(fields=['store', 'id'], name='orders_event_store_id_idx')],
+            },
+        ),
+    ]
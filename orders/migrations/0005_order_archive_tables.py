@@ -0,0 +1,82 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Live table -> '<table>_archive' (orders/archive.py dekhein).
+# LIKE ... INCLUDING ALL se columns, defaults aur indexes copy hote hain,
+# foreign keys nahi (archive rows kisi live row par depend nahi karte).
+ARCHIVED_TABLES = [
+    'orders_order',
+    'orders_orderitem',
+    'orders_payment',
+    'orders_ordersnapshot',
+    'orders_orderevent',
+    'delivery_delivery',
+    'wms_picktask',
+]
+
+
+def create_sql():
+    return [
+        f"CREATE TABLE IF NOT EXISTS {table}_archive (LIKE {table} INCLUDING ALL);"
+        for table in ARCHIVED_TABLES
+    ]
+
+
+def drop_sql():
+    return [f"DROP TABLE IF EXISTS {table}_archive;" for table in ARCHIVED_TABLES]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_orderevent'),
+        ('delivery', '0003_riderprofile_approval_status'),
+        ('wms', '0002_location_pick_x_location_pick_y'),
+        ('store', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(create_sql(), reverse_sql=drop_sql()),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('order_id', models.CharField(max_length=15)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('PREPARING', 'Preparing'), ('READY_FOR_PICKUP', 'Ready for Pickup'), ('OUT_FOR_DELIVERY', 'Out for Delivery'), ('DELIVERED', 'Delivered'), ('CANCELLED', 'Cancelled'), ('FAILED', 'Failed')], max_length=20)),
+                ('payment_status', models.CharField(choices=[('PENDING', 'Pending'), ('SUCCESSFUL', 'Successful'), ('FAILED', 'Failed'), ('REFUND_INITIATED', 'Refund Initiated'), ('REFUNDED', 'Refunded')], max_length=20)),
+                ('final_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField()),
+                ('store', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='store.store')),
+                ('user', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Order',
+                'verbose_name_plural': 'Archived Orders',
+                'db_table': 'orders_order_archive',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderSnapshot',
+            fields=[
+                ('order_pk', models.BigIntegerField(db_column='order_id', primary_key=True, serialize=False)),
+                ('order_id_str', models.CharField(max_length=15)),
+                ('detail', models.JSONField(default=dict)),
+                ('summary', models.JSONField(default=dict)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('user', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Order Snapshot',
+                'verbose_name_plural': 'Archived Order Snapshots',
+                'db_table': 'orders_ordersnapshot_archive',
+                'managed': False,
+            },
+        ),
+    ]
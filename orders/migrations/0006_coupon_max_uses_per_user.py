@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_archive_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coupon',
+            name='max_uses_per_user',
+            field=models.PositiveIntegerField(blank=True, help_text='Ek user kitni baar istemaal kar sakta hai (khaali = koi limit nahi)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='coupon',
+            name='times_used',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Yeh coupon kitni baar istemaal ho chuka hai (Redis counter se sync, orders/coupons.py)'),
+        ),
+    ]
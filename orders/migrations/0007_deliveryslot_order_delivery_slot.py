@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_coupon_max_uses_per_user'),
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliverySlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('start_at', models.DateTimeField()),
+                ('end_at', models.DateTimeField()),
+                ('max_orders', models.PositiveIntegerField(help_text='Is slot mein max orders')),
+                ('max_items', models.PositiveIntegerField(help_text='Is slot mein max items (picking capacity)')),
+                ('max_rider_minutes', models.PositiveIntegerField(help_text='Is slot mein riders ke kul available minutes')),
+                ('is_active', models.BooleanField(default=True)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_slots', to='store.store')),
+            ],
+            options={
+                'verbose_name': 'Delivery Slot',
+                'verbose_name_plural': 'Delivery Slots',
+                'ordering': ['store', 'start_at'],
+                'constraints': [models.UniqueConstraint(fields=('store', 'start_at'), name='orders_slot_store_start_uniq')],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='delivery_slot',
+            field=models.ForeignKey(blank=True, help_text='Scheduled delivery slot (khaali = turant delivery)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='orders.deliveryslot'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='rider_minutes_estimate',
+            field=models.PositiveIntegerField(default=0, help_text='Slot capacity ke liye is order ke estimated rider minutes'),
+        ),
+        # Archive table (orders/archive.py) ko live table ke saath sync rakhein
+        migrations.RunSQL(
+            [
+                "ALTER TABLE orders_order_archive ADD COLUMN IF NOT EXISTS delivery_slot_id bigint NULL;",
+                "ALTER TABLE orders_order_archive ADD COLUMN IF NOT EXISTS rider_minutes_estimate integer NOT NULL DEFAULT 0;",
+            ],
+            reverse_sql=[
+                "ALTER TABLE orders_order_archive DROP COLUMN IF EXISTS rider_minutes_estimate;",
+                "ALTER TABLE orders_order_archive DROP COLUMN IF EXISTS delivery_slot_id;",
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_deliveryslot_order_delivery_slot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='tax_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='GST slab % (order ke time freeze)', max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='line_discount',
+            field=models.DecimalField(decimal_places=2, default=0.0, help_text='Order discount ka is line par hissa', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='line_tax',
+            field=models.DecimalField(decimal_places=2, default=0.0, help_text='Is line ka GST amount', max_digits=10),
+        ),
+        # Archive table (orders/archive.py) ko live table ke saath sync rakhein
+        migrations.RunSQL(
+            [
+                "ALTER TABLE orders_orderitem_archive ADD COLUMN IF NOT EXISTS tax_rate numeric(5, 2) NULL;",
+                "ALTER TABLE orders_orderitem_archive ADD COLUMN IF NOT EXISTS line_discount numeric(10, 2) NOT NULL DEFAULT 0;",
+                "ALTER TABLE orders_orderitem_archive ADD COLUMN IF NOT EXISTS line_tax numeric(10, 2) NOT NULL DEFAULT 0;",
+            ],
+            reverse_sql=[
+                "ALTER TABLE orders_orderitem_archive DROP COLUMN IF EXISTS line_tax;",
+                "ALTER TABLE orders_orderitem_archive DROP COLUMN IF EXISTS line_discount;",
+                "ALTER TABLE orders_orderitem_archive DROP COLUMN IF EXISTS tax_rate;",
+            ],
+        ),
+    ]
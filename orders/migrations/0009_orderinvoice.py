@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_orderitem_line_tax'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderInvoice',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='invoice', serialize=False, to='orders.order')),
+                ('invoice_number', models.CharField(max_length=20, unique=True)),
+                ('content_hash', models.CharField(db_index=True, help_text='PDF bytes ka SHA-256 (storage path isi se banta hai)', max_length=64)),
+                ('pdf', models.FileField(max_length=255, upload_to='invoices/')),
+                ('template_version', models.PositiveIntegerField(help_text='Kis INVOICE_TEMPLATE_VERSION se render hua')),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Order Invoice',
+                'verbose_name_plural': 'Order Invoices',
+            },
+        ),
+        # Archive table (orders/archive.py) ko live table ke saath banayein
+        migrations.RunSQL(
+            ["CREATE TABLE IF NOT EXISTS orders_orderinvoice_archive (LIKE orders_orderinvoice INCLUDING ALL);"],
+            reverse_sql=["DROP TABLE IF EXISTS orders_orderinvoice_archive;"],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderInvoice',
+            fields=[
+                ('order_pk', models.BigIntegerField(db_column='order_id', primary_key=True, serialize=False)),
+                ('invoice_number', models.CharField(max_length=20)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('pdf', models.FileField(max_length=255, upload_to='')),
+                ('template_version', models.PositiveIntegerField()),
+                ('generated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Archived Order Invoice',
+                'verbose_name_plural': 'Archived Order Invoices',
+                'db_table': 'orders_orderinvoice_archive',
+                'managed': False,
+            },
+        ),
+    ]
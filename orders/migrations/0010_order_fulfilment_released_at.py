@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_orderinvoice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='fulfilment_released_at',
+            field=models.DateTimeField(blank=True, help_text='Kab picking (PickTasks) shuru hui. Slot order slot se thoda pehle release hota hai (orders/fulfilment.py)', null=True),
+        ),
+        # Pehle se confirm hue orders ke PickTasks ban chuke hain: unhe released maanein
+        migrations.RunSQL(
+            "UPDATE orders_order SET fulfilment_released_at = updated_at WHERE status NOT IN ('PENDING', 'FAILED');",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        # Archive table (orders/archive.py) ko live table ke saath sync rakhein
+        migrations.RunSQL(
+            "ALTER TABLE orders_order_archive ADD COLUMN IF NOT EXISTS fulfilment_released_at timestamp with time zone NULL;",
+            reverse_sql="ALTER TABLE orders_order_archive DROP COLUMN IF EXISTS fulfilment_released_at;",
+        ),
+    ]
@@ -66,7 +66,12 @@ class Coupon(TimestampedModel):
     times_used = models.PositiveIntegerField(
         default=0,
         editable=False,
-        help_text="Yeh coupon kitni baar istemaal ho chuka hai"
+        help_text="Yeh coupon kitni baar istemaal ho chuka hai (Redis counter se sync, orders/coupons.py)"
+    )
+    max_uses_per_user = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Ek user kitni baar istemaal kar sakta hai (khaali = koi limit nahi)"
     )
 
     class Meta:
@@ -75,19 +80,28 @@ class Coupon(TimestampedModel):
     def __str__(self):
         return self.code
 
-    def is_valid(self, cart_total):
+    def is_valid(self, cart_total, user=None):
         """
         Check karta hai ki coupon valid hai ya nahi (cart total ke aadhar par).
+        'user' diya ho toh per-user limit bhi check hoti hai.
+        Usage Redis counter se aata hai (orders/coupons.py); yeh sirf check hai,
+        asli reservation checkout par redeem_coupon() karta hai.
         Return: (True, "Valid") ya (False, "Error Message")
         """
+        # Guarded import (coupons.py is module se models import karta hai)
+        from .coupons import coupon_usage
+
         if not self.is_active:
             return False, "Coupon is not active."
         if timezone.now() < self.valid_from:
             return False, "Coupon is not yet valid."
         if timezone.now() > self.valid_to:
             return False, "Coupon has expired."
-        if self.times_used >= self.max_uses:
+        if coupon_usage(self) >= self.max_uses:
             return False, "Coupon has reached its usage limit."
+        if user is not None and self.max_uses_per_user is not None:
+            if coupon_usage(self, user.id) >= self.max_uses_per_user:
+                return False, "You have already used this coupon the maximum number of times."
         if cart_total < self.min_purchase_amount:
             return False, f"Minimum purchase of ₹{self.min_purchase_amount} required."
         
@@ -110,6 +124,36 @@ class Coupon(TimestampedModel):
         return Decimal('0.00')
 
 
+class DeliverySlot(TimestampedModel):
+    """
+    Store ka ek scheduled delivery window (e.g., 6-7 PM).
+    Capacity limits yahan hain; live counters Redis mein (orders/slots.py).
+    'generate_delivery_slots' task aane wale dinon ke slots banata hai.
+    """
+    store = models.ForeignKey(
+        Store,
+        on_delete=models.CASCADE,
+        related_name='delivery_slots'
+    )
+    start_at = models.DateTimeField()
+    end_at = models.DateTimeField()
+    max_orders = models.PositiveIntegerField(help_text="Is slot mein max orders")
+    max_items = models.PositiveIntegerField(help_text="Is slot mein max items (picking capacity)")
+    max_rider_minutes = models.PositiveIntegerField(help_text="Is slot mein riders ke kul available minutes")
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = "Delivery Slot"
+        verbose_name_plural = "Delivery Slots"
+        ordering = ['store', 'start_at']
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'start_at'], name='orders_slot_store_start_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.store.name}: {self.start_at:%d %b %H:%M}-{self.end_at:%H:%M}"
+
+
 class Order(TimestampedModel):
     """
     Checkout ke baad create hua main order object.
@@ -218,6 +262,25 @@ class Order(TimestampedModel):
         help_text="Subtotal + Delivery Fee + Taxes - Discount"
     )
 
+    # --- NAYA: Scheduled delivery (khaali = turant delivery) ---
+    delivery_slot = models.ForeignKey(
+        DeliverySlot,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='orders',
+        help_text="Scheduled delivery slot (khaali = turant delivery)"
+    )
+    rider_minutes_estimate = models.PositiveIntegerField(
+        default=0,
+        help_text="Slot capacity ke liye is order ke estimated rider minutes"
+    )
+    fulfilment_released_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Kab picking (PickTasks) shuru hui. Slot order slot se thoda pehle release hota hai (orders/fulfilment.py)"
+    )
+
     special_instructions = models.TextField(
         null=True, 
         blank=True,
@@ -231,10 +294,14 @@ class Order(TimestampedModel):
         based on the order's current items, coupon, delivery_fee, and tip.
         """
         
+        # Guarded import (tax.py -> inventory models)
+        from .tax import apply_line_taxes
+
         # 1. Calculate Item Subtotal from all OrderItems
-        item_subtotal = self.items.aggregate(
-            total=Sum(F('price_at_order') * F('quantity'))
-        )['total'] or Decimal('0.00')
+        items = list(self.items.all())
+        item_subtotal = sum(
+            (item.price_at_order * item.quantity for item in items), Decimal('0.00')
+        )
         self.item_subtotal = item_subtotal
 
         # 2. Calculate Discount
@@ -250,10 +317,9 @@ class Order(TimestampedModel):
         
         self.discount_amount = discount_amount
 
-        # 3. Calculate Taxes (on discounted subtotal)
+        # 3. Calculate Taxes (per-line GST slabs, discount lines mein baant kar)
         subtotal_after_discount = (item_subtotal - discount_amount)
-        tax_rate = getattr(settings, 'TAX_RATE', Decimal('0.05'))
-        taxes_amount = (subtotal_after_discount * tax_rate).quantize(Decimal('0.01'))
+        _, taxes_amount = apply_line_taxes(items, discount_amount)
         self.taxes_amount = taxes_amount
         
         # 4. Calculate Final Total
@@ -270,6 +336,7 @@ class Order(TimestampedModel):
         self.final_total = final_total
         
         if save:
+            OrderItem.objects.bulk_update(items, ['tax_rate', 'line_discount', 'line_tax'])
             self.save(update_fields=[
                 'item_subtotal', 
                 'discount_amount', 
@@ -319,6 +386,27 @@ class OrderItem(models.Model):
     )
     quantity = models.PositiveIntegerField()
 
+    # --- NAYA: Per-line GST (orders/tax.py) ---
+    tax_rate = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="GST slab % (order ke time freeze)"
+    )
+    line_discount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0.00,
+        help_text="Order discount ka is line par hissa"
+    )
+    line_tax = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0.00,
+        help_text="Is line ka GST amount"
+    )
+
     def __str__(self):
         return f"{self.quantity} x {self.product_name} ({self.variant_name}) @ {self.price_at_order}"
 
@@ -381,4 +469,268 @@ class Payment(TimestampedModel):
     )
 
     def __str__(self):
-        return f"Payment {self.transaction_id} for Order {self.order.order_id}"
\ No newline at end of file
+        return f"Payment {self.transaction_id} for Order {self.order.order_id}"
+
+class OrderSnapshot(models.Model):
+    """
+    Order ka pre-rendered JSON receipt (orders/snapshots.py dekhein).
+    Order confirm hone par likha jaata hai, aur status change par
+    sirf status waale hisse patch hote hain. Order detail/history reads
+    isi ek row se serve hote hain (nested serializers ke bina).
+    """
+    order = models.OneToOneField(
+        Order,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='snapshot'
+    )
+    order_id_str = models.CharField(
+        max_length=15,
+        unique=True,
+        help_text="Order ID ka copy (bina join ke lookup ke liye)"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='order_snapshots'
+    )
+    detail = models.JSONField(
+        default=dict,
+        help_text="OrderDetailSerializer jaisa poora document"
+    )
+    summary = models.JSONField(
+        default=dict,
+        help_text="OrderHistorySerializer jaisa compact projection"
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        help_text="Har update par badhta hai"
+    )
+    created_at = models.DateTimeField(
+        help_text="Order ka created_at (history sorting ke liye)"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Order Snapshot"
+        verbose_name_plural = "Order Snapshots"
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='orders_snap_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Snapshot v{self.version} for Order {self.order_id_str}"
+
+
+class RazorpayWebhookEvent(models.Model):
+    """
+    Razorpay webhooks ka durable inbox.
+    Webhook view sirf raw event yahan insert karke turant 200 deta hai;
+    Celery worker (orders.webhooks) inhe har razorpay_order_id ke liye
+    order mein process karta hai. 'event_id' unique hai taaki Razorpay
+    ke retries dobara process na hon.
+    """
+    class EventStatus(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        PROCESSED = 'PROCESSED', 'Processed'
+        IGNORED = 'IGNORED', 'Ignored'
+        FAILED = 'FAILED', 'Failed'
+
+    event_id = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="X-Razorpay-Event-Id header (na ho toh body ka SHA256)"
+    )
+    event = models.CharField(max_length=100, help_text="e.g., payment.captured")
+    razorpay_order_id = models.CharField(max_length=100, blank=True, db_index=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=20,
+        choices=EventStatus.choices,
+        default=EventStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Razorpay Webhook Event"
+        verbose_name_plural = "Razorpay Webhook Events"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'received_at'], name='orders_rzp_evt_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} ({self.event_id}) - {self.status}"
+
+
+class OrderEvent(models.Model):
+    """
+    Order / Delivery ki har status transition ka append-only log.
+    Transition ke saath hi (usi transaction mein) signals se likha jaata hai
+    (orders/events.py dekhein). 'seq' har order ke andar 1, 2, 3... badhta hai;
+    store-wise stream ke liye global 'id' cursor use hota hai.
+    """
+    class EventType(models.TextChoices):
+        ORDER_STATUS = 'ORDER_STATUS', 'Order Status'
+        PAYMENT_STATUS = 'PAYMENT_STATUS', 'Payment Status'
+        DELIVERY_STATUS = 'DELIVERY_STATUS', 'Delivery Status'
+        RIDER_ASSIGNED = 'RIDER_ASSIGNED', 'Rider Assigned'
+
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='events'
+    )
+    store = models.ForeignKey(
+        Store,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='order_events',
+        help_text="Order ka store (store-wise event stream ke liye copy)"
+    )
+    seq = models.PositiveIntegerField(help_text="Order ke andar event ka number")
+    event_type = models.CharField(max_length=20, choices=EventType.choices)
+    from_status = models.CharField(max_length=30, blank=True)
+    to_status = models.CharField(max_length=30, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Order Event"
+        verbose_name_plural = "Order Events"
+        ordering = ['order', 'seq']
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'seq'], name='orders_event_order_seq_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['store', 'id'], name='orders_event_store_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_id} #{self.seq}: {self.event_type} {self.from_status} -> {self.to_status}"
+
+
+# --- NAYA: Archive tables (read-only, orders/archive.py dekhein) ---
+
+class OrderInvoice(models.Model):
+    """
+    DELIVERED order ka GST invoice PDF (orders/invoices.py dekhein).
+    PDF storage mein content hash ke path par rehta hai; same content
+    dobara render ho toh wahi file reuse hoti hai.
+    """
+    order = models.OneToOneField(
+        Order,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='invoice'
+    )
+    invoice_number = models.CharField(max_length=20, unique=True)
+    content_hash = models.CharField(
+        max_length=64,
+        db_index=True,
+        help_text="PDF bytes ka SHA-256 (storage path isi se banta hai)"
+    )
+    pdf = models.FileField(upload_to='invoices/', max_length=255)
+    template_version = models.PositiveIntegerField(
+        help_text="Kis INVOICE_TEMPLATE_VERSION se render hua"
+    )
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Order Invoice"
+        verbose_name_plural = "Order Invoices"
+
+    def __str__(self):
+        return f"Invoice {self.invoice_number}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    'orders_order_archive' ka read-only view (analytics ke liye zaroori columns).
+    Table migration 0005 banata hai; Django ise manage nahi karta.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    order_id = models.CharField(max_length=15)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        db_constraint=False,
+        related_name='+'
+    )
+    store = models.ForeignKey(
+        Store,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        db_constraint=False,
+        related_name='+'
+    )
+    status = models.CharField(max_length=20, choices=Order.OrderStatus.choices)
+    payment_status = models.CharField(max_length=20, choices=Order.PaymentStatus.choices)
+    final_total = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'orders_order_archive'
+        verbose_name = "Archived Order"
+        verbose_name_plural = "Archived Orders"
+
+    def __str__(self):
+        return f"Archived Order {self.order_id}"
+
+
+class ArchivedOrderSnapshot(models.Model):
+    """
+    'orders_ordersnapshot_archive' ka read-only view.
+    Archived orders ki customer history / detail isi se serve hoti hai.
+    """
+    order_pk = models.BigIntegerField(primary_key=True, db_column='order_id')
+    order_id_str = models.CharField(max_length=15)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        db_constraint=False,
+        related_name='+'
+    )
+    detail = models.JSONField(default=dict)
+    summary = models.JSONField(default=dict)
+    version = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'orders_ordersnapshot_archive'
+        verbose_name = "Archived Order Snapshot"
+        verbose_name_plural = "Archived Order Snapshots"
+
+    def __str__(self):
+        return f"Archived Snapshot for Order {self.order_id_str}"
+
+
+class ArchivedOrderInvoice(models.Model):
+    """
+    'orders_orderinvoice_archive' ka read-only view.
+    Archived orders ke invoice downloads isi se serve hote hain.
+    """
+    order_pk = models.BigIntegerField(primary_key=True, db_column='order_id')
+    invoice_number = models.CharField(max_length=20)
+    content_hash = models.CharField(max_length=64)
+    pdf = models.FileField(max_length=255)
+    template_version = models.PositiveIntegerField()
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'orders_orderinvoice_archive'
+        verbose_name = "Archived Order Invoice"
+        verbose_name_plural = "Archived Order Invoices"
+
+    def __str__(self):
+        return f"Archived Invoice {self.invoice_number}"
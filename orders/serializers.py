@@ -6,7 +6,7 @@ from accounts.serializers import AddressSerializer
 from store.serializers import StoreSerializer
 from delivery.serializers import DeliveryDetailSerializer 
 from rest_framework import serializers
-from .models import Order, OrderItem, Payment, Coupon 
+from .models import Order, OrderItem, Payment, Coupon, OrderEvent, DeliverySlot
 from accounts.serializers import AddressSerializer
 from store.serializers import StoreSerializer
 from delivery.serializers import DeliveryDetailSerializer
@@ -59,6 +59,12 @@ class CheckoutSerializer(serializers.Serializer):
         min_value=Decimal('0.00'), 
         help_text="Optional tip for the rider"
     )
+    delivery_slot_id = serializers.IntegerField(
+        required=False,
+        allow_null=True,
+        default=None,
+        help_text="Scheduled delivery slot ki ID (khaali = turant delivery)"
+    )
 
     def validate_delivery_address_id(self, value):
         user = self.context['request'].user
@@ -103,7 +109,10 @@ class OrderItemSerializer(serializers.ModelSerializer):
             'variant_name',
             'price_at_order',
             'quantity',
-            'item_total_price'
+            'item_total_price',
+            'tax_rate',
+            'line_discount',
+            'line_tax'
         ]
 
 class OrderDetailSerializer(serializers.ModelSerializer):
@@ -115,6 +124,9 @@ class OrderDetailSerializer(serializers.ModelSerializer):
     delivery_address = AddressSerializer(read_only=True)
     delivery = DeliveryDetailSerializer(read_only=True)
     coupon = CouponSerializer(read_only=True)
+    # --- NAYA: Scheduled delivery window (khaali = turant delivery) ---
+    delivery_slot_start = serializers.DateTimeField(source='delivery_slot.start_at', read_only=True, default=None)
+    delivery_slot_end = serializers.DateTimeField(source='delivery_slot.end_at', read_only=True, default=None)
     
     class Meta:
         model = Order
@@ -122,6 +134,8 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             'order_id',
             'status',
             'payment_status',
+            'delivery_slot_start',
+            'delivery_slot_end',
             'item_subtotal',
             'delivery_fee',
             'taxes_amount',
@@ -155,6 +169,53 @@ class OrderHistorySerializer(serializers.ModelSerializer):
         ]
         read_only_fields = fields
 
+    def to_representation(self, instance):
+        # --- NAYA: Snapshot ho toh pre-rendered summary hi bhej dein ---
+        if not self.context.get('skip_snapshot'):
+            try:
+                snapshot = instance.snapshot
+            except Order.snapshot.RelatedObjectDoesNotExist:
+                snapshot = None
+            if snapshot is not None and snapshot.summary:
+                return snapshot.summary
+        return super().to_representation(instance)
+
+class DeliverySlotSerializer(serializers.ModelSerializer):
+    """
+    Checkout par dikhne wale available slots (remaining capacity ke saath).
+    """
+    remaining_orders = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DeliverySlot
+        fields = ['id', 'start_at', 'end_at', 'remaining_orders']
+        read_only_fields = fields
+
+    def get_remaining_orders(self, obj):
+        remaining = self.context.get('remaining', {}).get(obj.id)
+        return remaining['orders'] if remaining else None
+
+
+class OrderEventSerializer(serializers.ModelSerializer):
+    """
+    Order timeline (OrderEvent) ka ek event.
+    """
+    order_id = serializers.CharField(source='order.order_id', read_only=True)
+
+    class Meta:
+        model = OrderEvent
+        fields = [
+            'id',
+            'order_id',
+            'seq',
+            'event_type',
+            'from_status',
+            'to_status',
+            'data',
+            'created_at'
+        ]
+        read_only_fields = fields
+
 # --- NAYA SERIALIZER ---
 class RiderRatingSerializer(serializers.Serializer):
     """
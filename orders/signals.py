@@ -0,0 +1,131 @@
+# orders/signals.py
+"""
+Order / Delivery change hone par:
+1. OrderEvent timeline mein transition append karta hai (usi transaction mein).
+2. Status / payment / delivery status ya rider badalne par OrderSnapshot
+   ke status hisse patch karta hai (receipt frozen rehta hai) aur bulk
+   status cache (status_cache.py) refresh karta hai. Items ya totals
+   badlein (OrderItem save/delete, recalculate_totals(save=True)) toh
+   snapshot poora dobara banta hai. Sab transaction commit ke baad taaki
+   kabhi rolled-back data na dikhe; sirf updated_at jaise saves par kuch
+   nahi hota.
+3. DELIVERED hone par invoice PDF task queue karta hai (invoices.py).
+4. CANCELLED/FAILED par slot capacity aur FAILED par coupon token wapas.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .events import changed_tracked_fields, record_order_event, remember_tracked_fields
+from .models import Order, OrderEvent, OrderItem
+
+ORDER_TRACKED_FIELDS = ('status', 'payment_status')
+DELIVERY_TRACKED_FIELDS = ('status', 'rider_id')
+# recalculate_totals(save=True) yahi fields save karta hai
+ORDER_TOTAL_FIELDS = frozenset(('item_subtotal', 'discount_amount', 'taxes_amount', 'final_total'))
+SLOT_RELEASING_STATUSES = (Order.OrderStatus.CANCELLED, Order.OrderStatus.FAILED)
+
+
+def _schedule_snapshot_refresh(order_pk):
+    # Guarded import (app loading ke waqt serializers import na ho)
+    from .snapshots import patch_order_snapshot
+    from .status_cache import refresh_order_status_cache
+    transaction.on_commit(lambda: patch_order_snapshot(order_pk))
+    transaction.on_commit(lambda: refresh_order_status_cache(order_pk))
+
+
+def _schedule_snapshot_rebuild(order_pk):
+    # Items / totals badle: receipt hissa bhi purana hai, poora snapshot dobara
+    from .snapshots import write_order_snapshot
+    transaction.on_commit(lambda: write_order_snapshot(order_pk))
+
+
+# --- NAYA: OrderEvent timeline ---
+
+@receiver(post_init, sender=Order, dispatch_uid='orders_event_track_order')
+def track_order_fields(sender, instance, **kwargs):
+    remember_tracked_fields(instance, ORDER_TRACKED_FIELDS)
+
+
+@receiver(post_init, sender='delivery.Delivery', dispatch_uid='orders_event_track_delivery')
+def track_delivery_fields(sender, instance, **kwargs):
+    remember_tracked_fields(instance, DELIVERY_TRACKED_FIELDS)
+
+
+@receiver(post_save, sender=Order, dispatch_uid='orders_event_on_order_save')
+def record_order_transition(sender, instance, created, raw=False, **kwargs):
+    """Order.status / payment_status badalne par event likhta hai."""
+    if raw:
+        return
+    changes = changed_tracked_fields(instance, ORDER_TRACKED_FIELDS)
+    if created:
+        changes['status'] = ('', instance.status)
+    if 'status' in changes:
+        old, new = changes['status']
+        # Caller reason jaisa extra data '_event_data' se de sakta hai (e.g. fulfilment.py)
+        record_order_event(
+            instance.pk, instance.store_id, OrderEvent.EventType.ORDER_STATUS,
+            to_status=new, from_status=old, data=getattr(instance, '_event_data', None)
+        )
+        # Scheduled order cancel / fail hua toh slot capacity wapas (orders/slots.py)
+        if instance.delivery_slot_id and not created and new in SLOT_RELEASING_STATUSES:
+            from .slots import release_slot_for_order
+            order_pk = instance.pk
+            transaction.on_commit(lambda: release_slot_for_order(order_pk))
+        # Fail hua order coupon ka token wapas kare (orders/coupons.py)
+        if instance.coupon_id and not created and new == Order.OrderStatus.FAILED:
+            from .coupons import release_coupon_for_order
+            order_pk = instance.pk
+            transaction.on_commit(lambda: release_coupon_for_order(order_pk))
+        # Delivered order ka GST invoice background mein (orders/invoices.py)
+        if new == Order.OrderStatus.DELIVERED:
+            from .tasks import generate_order_invoice_task
+            order_pk = instance.pk
+            transaction.on_commit(lambda: generate_order_invoice_task.delay(order_pk))
+    if 'payment_status' in changes and not created:
+        old, new = changes['payment_status']
+        record_order_event(
+            instance.pk, instance.store_id, OrderEvent.EventType.PAYMENT_STATUS,
+            to_status=new, from_status=old
+        )
+    # Naya (PENDING) order: snapshot abhi nahi banta
+    if changes and not created:
+        _schedule_snapshot_refresh(instance.pk)
+    update_fields = kwargs.get('update_fields')
+    if not created and update_fields and ORDER_TOTAL_FIELDS & set(update_fields):
+        _schedule_snapshot_rebuild(instance.pk)
+    remember_tracked_fields(instance, ORDER_TRACKED_FIELDS)
+
+
+@receiver(post_save, sender='delivery.Delivery', dispatch_uid='orders_event_on_delivery_save')
+def record_delivery_transition(sender, instance, created, raw=False, **kwargs):
+    """Delivery.status badalne ya rider assign hone par event likhta hai."""
+    if raw:
+        return
+    changes = changed_tracked_fields(instance, DELIVERY_TRACKED_FIELDS)
+    if created:
+        changes['status'] = ('', instance.status)
+    store_id = instance.order.store_id
+    if 'status' in changes:
+        old, new = changes['status']
+        record_order_event(
+            instance.order_id, store_id, OrderEvent.EventType.DELIVERY_STATUS,
+            to_status=new, from_status=old
+        )
+    if 'rider_id' in changes and instance.rider_id:
+        record_order_event(
+            instance.order_id, store_id, OrderEvent.EventType.RIDER_ASSIGNED,
+            data={'rider_id': instance.rider_id}
+        )
+    if changes:
+        _schedule_snapshot_refresh(instance.order_id)
+    remember_tracked_fields(instance, DELIVERY_TRACKED_FIELDS)
+
+
+@receiver(post_save, sender=OrderItem, dispatch_uid='orders_snapshot_on_item_save')
+@receiver(post_delete, sender=OrderItem, dispatch_uid='orders_snapshot_on_item_delete')
+def rebuild_snapshot_on_item_change(sender, instance, raw=False, **kwargs):
+    """Order item badla / hata (e.g. dashboard item cancel): snapshot dobara."""
+    if raw:
+        return
+    _schedule_snapshot_rebuild(instance.order_id)
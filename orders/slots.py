@@ -0,0 +1,262 @@
+# orders/slots.py
+"""
+Delivery slot capacity engine.
+
+Har DeliverySlot ke teen counters Redis (django cache) mein rehte hain:
+orders, items aur rider-minutes. Checkout slot chunta hai toh
+reserve_slot() teeno counters atomic INCR karta hai; koi bhi limit paar
+ho jaaye toh saare INCR wapas DECR ho jaate hain aur slot 'full' maana
+jaata hai. Order CANCELLED/FAILED hone par release_slot() capacity lauta
+deta hai (signals.py).
+
+Counters pehli baar DB se initialize hote hain. 'reconcile_slot_capacity'
+task un PENDING orders ki capacity wapas karta hai jo payment ke bina
+SLOT_PENDING_HOLD_MINUTES se zyada pade hain.
+"""
+import logging
+import math
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import DeliverySlot, Order
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+# In statuses ke orders slot capacity nahi lete
+RELEASED_STATUSES = (
+    Order.OrderStatus.CANCELLED,
+    Order.OrderStatus.FAILED,
+)
+
+COUNTERS = ('orders', 'items', 'rider_minutes')
+
+
+class SlotUnavailable(Exception):
+    """Slot full hai, band hai, ya is store ka nahi hai."""
+    pass
+
+
+def slot_key(slot_id, counter):
+    return f"slot_{slot_id}_{counter}"
+
+
+def slot_limits(slot):
+    return {
+        'orders': slot.max_orders,
+        'items': slot.max_items,
+        'rider_minutes': slot.max_rider_minutes,
+    }
+
+
+def estimate_rider_minutes(distance_km=None):
+    """Ek order ke liye rider kitne minute busy rahega (round trip estimate)."""
+    minutes = settings.SLOT_RIDER_MINUTES_BASE
+    if distance_km:
+        minutes += distance_km * settings.SLOT_RIDER_MINUTES_PER_KM
+    return int(math.ceil(minutes))
+
+
+def _counter_timeout(slot):
+    return max(int((slot.end_at + timedelta(days=1) - timezone.now()).total_seconds()), 60)
+
+
+def _held_orders(slot_ids, now=None):
+    """Woh orders jo slot capacity le rahe hain (purane unpaid PENDING chhod kar)."""
+    now = now or timezone.now()
+    stale_pending = Q(
+        status=Order.OrderStatus.PENDING,
+        created_at__lt=now - timedelta(minutes=settings.SLOT_PENDING_HOLD_MINUTES)
+    )
+    return Order.objects.filter(delivery_slot_id__in=slot_ids).exclude(
+        status__in=RELEASED_STATUSES
+    ).exclude(stale_pending)
+
+
+def usage_from_db(slot_ids):
+    """Slot id -> {'orders', 'items', 'rider_minutes'} (ek aggregate query)."""
+    rows = _held_orders(slot_ids).values('delivery_slot_id').annotate(
+        orders=Count('id', distinct=True),
+        items=Sum('items__quantity'),
+    )
+    minutes = dict(
+        _held_orders(slot_ids).values('delivery_slot_id').annotate(
+            total=Sum('rider_minutes_estimate')
+        ).values_list('delivery_slot_id', 'total')
+    )
+    usage = {slot_id: {'orders': 0, 'items': 0, 'rider_minutes': 0} for slot_id in slot_ids}
+    for row in rows:
+        usage[row['delivery_slot_id']].update({
+            'orders': row['orders'],
+            'items': row['items'] or 0,
+            'rider_minutes': minutes.get(row['delivery_slot_id']) or 0,
+        })
+    return usage
+
+
+def slot_usage(slots):
+    """
+    Slots ka current usage Redis se (missing counters DB se initialize).
+    Return: {slot_id: {'orders', 'items', 'rider_minutes'}}
+    """
+    keys = [slot_key(slot.id, counter) for slot in slots for counter in COUNTERS]
+    cached = cache.get_many(keys)
+
+    missing = [slot for slot in slots if any(slot_key(slot.id, c) not in cached for c in COUNTERS)]
+    if missing:
+        db_usage = usage_from_db([slot.id for slot in missing])
+        for slot in missing:
+            for counter in COUNTERS:
+                key = slot_key(slot.id, counter)
+                # add() = sirf agar absent (doosre worker ne beech mein init kiya ho toh wahi rahe)
+                cache.add(key, db_usage[slot.id][counter], timeout=_counter_timeout(slot))
+                cached[key] = cache.get(key)
+
+    return {
+        slot.id: {counter: cached.get(slot_key(slot.id, counter)) or 0 for counter in COUNTERS}
+        for slot in slots
+    }
+
+
+def available_slots(store, now=None):
+    """
+    Store ke aane wale active slots jinmein abhi capacity hai.
+    Return: [(slot, remaining dict)]
+    """
+    now = now or timezone.now()
+    slots = list(DeliverySlot.objects.filter(
+        store=store,
+        is_active=True,
+        start_at__gt=now + timedelta(minutes=settings.SLOT_BOOKING_CUTOFF_MINUTES),
+    ).order_by('start_at'))
+    if not slots:
+        return []
+
+    usage = slot_usage(slots)
+    result = []
+    for slot in slots:
+        limits = slot_limits(slot)
+        remaining = {counter: limits[counter] - usage[slot.id][counter] for counter in COUNTERS}
+        if all(value > 0 for value in remaining.values()):
+            result.append((slot, remaining))
+    return result
+
+
+def reserve_slot(slot, items, rider_minutes):
+    """
+    Slot mein ek order ki capacity atomic reserve karta hai.
+    Kisi bhi counter ki limit paar ho toh sab wapas karke SlotUnavailable.
+    """
+    if not slot.is_active or slot.start_at <= timezone.now() + timedelta(minutes=settings.SLOT_BOOKING_CUTOFF_MINUTES):
+        raise SlotUnavailable("This delivery slot is no longer available.")
+
+    slot_usage([slot])  # Counters initialize karein
+    amounts = {'orders': 1, 'items': items, 'rider_minutes': rider_minutes}
+    limits = slot_limits(slot)
+    taken = []
+    try:
+        for counter in COUNTERS:
+            key = slot_key(slot.id, counter)
+            value = cache.incr(key, amounts[counter])
+            taken.append(counter)
+            if value > limits[counter]:
+                raise SlotUnavailable("This delivery slot is full. Please choose another slot.")
+    except Exception:
+        for counter in taken:
+            cache.decr(slot_key(slot.id, counter), amounts[counter])
+        raise
+
+
+def release_slot(slot_id, items, rider_minutes):
+    """reserve_slot() ki capacity wapas karta hai (order cancel / fail)."""
+    amounts = {'orders': 1, 'items': items, 'rider_minutes': rider_minutes}
+    for counter in COUNTERS:
+        try:
+            cache.decr(slot_key(slot_id, counter), amounts[counter])
+        except ValueError:
+            # Counter expire ho chuka hai; agli baar DB se initialize hoga
+            pass
+        except Exception as e:
+            logger.error(f"Slot {slot_id} ka {counter} release nahi ho paaya: {e}")
+
+
+def release_slot_for_order(order_pk):
+    """Order ke slot ki capacity wapas karta hai (signals.py se, commit ke baad)."""
+    order = Order.objects.filter(pk=order_pk).values('delivery_slot_id', 'rider_minutes_estimate').first()
+    if not order or not order['delivery_slot_id']:
+        return
+    items = Order.objects.filter(pk=order_pk).aggregate(total=Sum('items__quantity'))['total'] or 0
+    release_slot(order['delivery_slot_id'], items, order['rider_minutes_estimate'])
+
+
+def reconcile_slot_capacity():
+    """
+    Aane wale slots ke counters ko DB ke hisaab se sync karta hai
+    (e.g., bina payment ke pade PENDING orders ki capacity wapas).
+    SET ke bajaye drift ka INCR/DECR hota hai taaki beech mein hue
+    reservations overwrite na hon. Return: adjusted slots.
+    """
+    slots = list(DeliverySlot.objects.filter(end_at__gte=timezone.now(), is_active=True))
+    if not slots:
+        return 0
+
+    usage = slot_usage(slots)
+    db_usage = usage_from_db([slot.id for slot in slots])
+    adjusted = 0
+    for slot in slots:
+        changed = False
+        for counter in COUNTERS:
+            drift = usage[slot.id][counter] - db_usage[slot.id][counter]
+            if drift > 0:
+                cache.decr(slot_key(slot.id, counter), drift)
+            elif drift < 0:
+                cache.incr(slot_key(slot.id, counter), -drift)
+            changed = changed or drift != 0
+        adjusted += changed
+    return adjusted
+
+
+def generate_delivery_slots(days_ahead=None):
+    """
+    Har active store ke liye aaj + 'days_ahead' din ke slots banata hai
+    (opening-closing time ke beech, DELIVERY_SLOT_MINUTES ke windows).
+    Pehle se bane slots (store, start_at unique) skip hote hain.
+    Return: insert ke liye bheje gaye slots ki ginti.
+    """
+    # --- GUARDED IMPORTS (Circular dependency se bachne ke liye) ---
+    from store.models import Store
+    # --- END GUARDED IMPORTS ---
+
+    days_ahead = settings.DELIVERY_SLOT_DAYS_AHEAD if days_ahead is None else days_ahead
+    slot_length = timedelta(minutes=settings.DELIVERY_SLOT_MINUTES)
+    tz = timezone.get_current_timezone()
+    today = timezone.localdate()
+
+    slots = []
+    for store in Store.objects.filter(is_active=True):
+        opening = store.opening_time or datetime.min.time()
+        closing = store.closing_time
+        for day_offset in range(days_ahead + 1):
+            day = today + timedelta(days=day_offset)
+            start = timezone.make_aware(datetime.combine(day, opening), tz)
+            end_of_day = (
+                timezone.make_aware(datetime.combine(day, closing), tz)
+                if closing else start.replace(hour=0, minute=0) + timedelta(days=1)
+            )
+            while start + slot_length <= end_of_day:
+                slots.append(DeliverySlot(
+                    store=store,
+                    start_at=start,
+                    end_at=start + slot_length,
+                    max_orders=settings.DELIVERY_SLOT_MAX_ORDERS,
+                    max_items=settings.DELIVERY_SLOT_MAX_ITEMS,
+                    max_rider_minutes=settings.DELIVERY_SLOT_RIDER_MINUTES,
+                ))
+                start += slot_length
+
+    DeliverySlot.objects.bulk_create(slots, ignore_conflicts=True)
+    return len(slots)
@@ -0,0 +1,118 @@
+# orders/snapshots.py
+"""
+Order snapshot (pre-rendered JSON receipt).
+
+Order confirm hone par poora OrderDetailSerializer output ek baar
+OrderSnapshot.detail mein save hota hai, aur OrderHistorySerializer jaisa
+compact projection OrderSnapshot.summary mein. Iske baad receipt (items,
+totals, address, store) frozen rehta hai: status / payment / delivery
+change par sirf woh keys patch hoti hain (patch_order_snapshot, do chhoti
+queries, serializer prefetches ke bina; signals.py aur delivery/outbox.py
+dekhein). Confirm ke baad items / totals badlein (dashboard item cancel,
+recalculate_totals(save=True)) toh write_order_snapshot poora rebuild
+karta hai.
+
+Detail aur history APIs phir nested serializers aur prefetches ke bina
+sirf snapshot row padhkar response de dete hain.
+"""
+import logging
+
+from .models import Order, OrderSnapshot
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+# In statuses ke orders ka snapshot nahi banta (abhi confirm nahi hue)
+UNSNAPSHOTTED_STATUSES = (
+    Order.OrderStatus.PENDING,
+    Order.OrderStatus.FAILED,
+)
+
+
+def order_snapshot_queryset():
+    """Snapshot build karne ke liye poora data ek saath (OrderDetailView jaisa)."""
+    return Order.objects.prefetch_related('items').select_related(
+        'store', 'delivery_address', 'delivery', 'coupon', 'delivery_slot'
+    )
+
+
+def build_snapshot_documents(order):
+    """Order se (detail, summary) dicts banata hai."""
+    # Guarded import (serializers -> delivery -> orders circular import se bachne ke liye)
+    from .serializers import OrderDetailSerializer, OrderHistorySerializer
+
+    detail = OrderDetailSerializer(order).data
+    summary = OrderHistorySerializer(order, context={'skip_snapshot': True}).data
+    return dict(detail), dict(summary)
+
+
+def write_order_snapshot(order_pk):
+    """
+    Order ka snapshot (re)build karke save karta hai.
+    PENDING/FAILED orders skip hote hain. Return: OrderSnapshot ya None.
+    Best-effort hai: fail hone par sirf log karta hai (reads serializer par fallback karte hain).
+    """
+    try:
+        order = order_snapshot_queryset().get(pk=order_pk)
+    except Order.DoesNotExist:
+        return None
+
+    if order.status in UNSNAPSHOTTED_STATUSES:
+        return None
+
+    try:
+        detail, summary = build_snapshot_documents(order)
+        snapshot, created = OrderSnapshot.objects.get_or_create(
+            order=order,
+            defaults={
+                'order_id_str': order.order_id,
+                'user_id': order.user_id,
+                'detail': detail,
+                'summary': summary,
+                'created_at': order.created_at,
+            }
+        )
+        if not created:
+            snapshot.detail = detail
+            snapshot.summary = summary
+            snapshot.user_id = order.user_id
+            snapshot.version += 1
+            snapshot.save(update_fields=['detail', 'summary', 'user', 'version', 'updated_at'])
+        return snapshot
+    except Exception as e:
+        logger.error(f"Order {order.order_id} ka snapshot save nahi ho paaya: {e}")
+        return None
+
+
+def patch_order_snapshot(order_pk):
+    """
+    Status change ke baad snapshot ke sirf status hisse (order status,
+    payment status, delivery block) update karta hai. Snapshot abhi bana hi
+    nahi (order abhi confirm hua) toh poora build. Best-effort.
+    Return: OrderSnapshot ya None.
+    """
+    # Guarded import (serializers -> delivery -> orders circular import se bachne ke liye)
+    from delivery.models import Delivery
+    from delivery.serializers import DeliveryDetailSerializer
+
+    snapshot = OrderSnapshot.objects.filter(order_id=order_pk).only('order_id', 'detail', 'summary', 'version').first()
+    if snapshot is None:
+        return write_order_snapshot(order_pk)
+
+    try:
+        row = Order.objects.filter(pk=order_pk).values('status', 'payment_status').first()
+        if row is None:
+            return None
+        delivery_fields = DeliveryDetailSerializer.Meta.fields
+        delivery = Delivery.objects.filter(order_id=order_pk).only(*delivery_fields).first()
+
+        snapshot.detail['status'] = row['status']
+        snapshot.detail['payment_status'] = row['payment_status']
+        snapshot.detail['delivery'] = dict(DeliveryDetailSerializer(delivery).data) if delivery else None
+        snapshot.summary['status'] = row['status']
+        snapshot.version += 1
+        snapshot.save(update_fields=['detail', 'summary', 'version', 'updated_at'])
+        return snapshot
+    except Exception as e:
+        logger.error(f"Order {order_pk} ka snapshot patch nahi ho paaya: {e}")
+        return None
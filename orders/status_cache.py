@@ -0,0 +1,114 @@
+# orders/status_cache.py
+"""
+Bulk order-status lookup ka cache.
+
+Har order ka compact status tuple (status, payment, delivery status, ETA,
+rider) cache mein 'order_status_<order_id>' key par rehta hai. Order ya
+Delivery save hone par signals.py commit ke baad ise refresh karta hai.
+Bulk API pehle cache.get_many karta hai; miss hue orders ek hi query mein
+DB se aate hain (aur cache mein bhar diye jaate hain). Rider ki live
+position cache nahi hoti (woh har kuch second badalti hai), isliye saare
+riders ki position ek alag query mein aati hai.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Order
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+STATUS_FIELDS = (
+    'pk',
+    'order_id',
+    'user_id',
+    'status',
+    'payment_status',
+    'delivery__status',
+    'delivery__estimated_delivery_time',
+    'delivery__rider_id',
+)
+
+
+def order_status_key(order_id):
+    return f"order_status_{order_id}"
+
+
+def _row_to_entry(row):
+    eta = row['delivery__estimated_delivery_time']
+    return {
+        'order_id': row['order_id'],
+        'user_id': row['user_id'],
+        'status': row['status'],
+        'payment_status': row['payment_status'],
+        'delivery_status': row['delivery__status'],
+        'eta': eta.isoformat() if eta else None,
+        'rider_id': row['delivery__rider_id'],
+    }
+
+
+def load_status_entries(**filters):
+    """DB se status entries (ek query) laakar cache mein bharta hai. Return: {order_id: entry}"""
+    entries = {
+        row['order_id']: _row_to_entry(row)
+        for row in Order.objects.filter(**filters).values(*STATUS_FIELDS)
+    }
+    if entries:
+        try:
+            cache.set_many(
+                {order_status_key(order_id): entry for order_id, entry in entries.items()},
+                timeout=settings.ORDER_STATUS_CACHE_TTL
+            )
+        except Exception as e:
+            logger.warning(f"Order status cache set nahi ho paaya: {e}")
+    return entries
+
+
+def refresh_order_status_cache(order_pk):
+    """Ek order ka cache entry refresh (status change ke baad, signals.py)."""
+    load_status_entries(pk=order_pk)
+
+
+def get_status_entries(order_ids):
+    """
+    order_ids ke status entries: cache se, miss hue ek query mein DB se.
+    Return: {order_id: entry}
+    """
+    try:
+        cached = cache.get_many([order_status_key(order_id) for order_id in order_ids])
+    except Exception as e:
+        logger.warning(f"Order status cache read fail hua, DB use ho raha hai: {e}")
+        cached = {}
+
+    entries = {entry['order_id']: entry for entry in cached.values()}
+    missing = [order_id for order_id in order_ids if order_id not in entries]
+    if missing:
+        entries.update(load_status_entries(order_id__in=missing))
+    return entries
+
+
+def rider_positions(rider_ids):
+    """
+    Rider id -> {'latitude', 'longitude'}.
+    --- UPDATED: Pehle Redis last-known buffer (delivery/locations.py),
+    miss hue riders ek DB query mein. ---
+    """
+    # --- GUARDED IMPORTS (Circular dependency se bachne ke liye) ---
+    from delivery.locations import last_known_positions
+    from delivery.models import RiderProfile
+    # --- END GUARDED IMPORTS ---
+    if not rider_ids:
+        return {}
+    positions = {
+        rider_id: {'latitude': position['latitude'], 'longitude': position['longitude']}
+        for rider_id, position in last_known_positions(rider_ids).items()
+    }
+    missing = [rider_id for rider_id in rider_ids if rider_id not in positions]
+    if missing:
+        for rider_id, location in RiderProfile.objects.filter(
+            id__in=missing, current_location__isnull=False
+        ).values_list('id', 'current_location'):
+            positions[rider_id] = {'latitude': location.y, 'longitude': location.x}
+    return positions
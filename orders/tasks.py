@@ -107,4 +107,174 @@ def process_razorpay_refund_task(self, payment_id, amount_to_refund_paise=None,
         
     except Exception as e:
         logger.error(f"Refund Task ERROR (General) for Order {order.order_id}: {e}") # <-- CHANGED
-        raise self.retry(exc=e)
\ No newline at end of file
+        raise self.retry(exc=e)
+
+@shared_task(name="confirm_order", ignore_result=True)
+def confirm_order_task(order_id):
+    """
+    COD aur zero-amount orders ko background mein CONFIRM karta hai.
+    CheckoutView sirf PENDING order banata hai aur yeh task enqueue karta hai
+    (dedicated 'order_confirmation' queue par, settings.CELERY_TASK_ROUTES dekhein).
+    Result customer ko WebSocket ('order_<order_id>' group) par push hota hai,
+    ya woh OrderDetailView poll kar sakta hai.
+    """
+    # --- GUARDED IMPORTS (Circular dependency se bachne ke liye) ---
+    from .views import process_successful_payment
+    from .utils import broadcast_order_update
+    # --- END GUARDED IMPORTS ---
+
+    success, result = process_successful_payment(order_id)
+
+    try:
+        order = Order.objects.get(order_id=order_id)
+    except Order.DoesNotExist:
+        logger.error(f"confirm_order_task: Order {order_id} nahi mila.")
+        return
+
+    if success:
+        logger.info(f"confirm_order_task: Order {order_id} CONFIRMED.")
+        broadcast_order_update(order, message="Order confirmed.")
+    else:
+        logger.error(f"confirm_order_task: Order {order_id} confirm nahi ho paaya: {result}")
+        broadcast_order_update(order, message=f"Order could not be confirmed: {result}")
+
+
+@shared_task(name="drain_razorpay_webhooks", ignore_result=True)
+def drain_razorpay_webhooks(razorpay_order_id=None):
+    """
+    Razorpay webhook inbox (RazorpayWebhookEvent) ko drain karta hai.
+    Webhook view har naye event ke baad us razorpay_order_id ke liye
+    yeh task enqueue karta hai; beat har minute bina argument ke chalata hai
+    taaki retry waale / chhoote hue events bhi process ho jaayein.
+    """
+    from .webhooks import drain_order_events, pending_order_keys, webhook_inbox_metrics
+
+    if razorpay_order_id is not None:
+        keys = [razorpay_order_id]
+    else:
+        keys = pending_order_keys(settings.RAZORPAY_WEBHOOK_DRAIN_BATCH)
+
+    processed = 0
+    for key in keys:
+        processed += drain_order_events(key)
+
+    if razorpay_order_id is None:
+        metrics = webhook_inbox_metrics()
+        logger.info(
+            f"CELERY TASK (drain_razorpay_webhooks): Processed {processed} events. "
+            f"Backlog {metrics['backlog_events']} events, lag {metrics['lag_seconds']:.1f}s, "
+            f"failed {metrics['failed_events']}."
+        )
+
+
+@shared_task(name="archive_old_orders")
+def archive_old_orders_task():
+    """
+    Roz raat chalta hai (beat schedule dekhein).
+    ORDER_ARCHIVE_AFTER_DAYS se purane finished orders ko archive tables
+    mein move karta hai (orders/archive.py).
+    """
+    from .archive import archive_old_orders
+
+    moved = archive_old_orders()
+    logger.info(f"CELERY TASK (archive_old_orders): Moved rows {moved}")
+    return f"Archived {moved.get(Order._meta.label, 0)} orders."
+
+
+@shared_task(name="reconcile_coupon_usage", ignore_result=True)
+def reconcile_coupon_usage_task():
+    """
+    Har minute chalta hai: Redis coupon counters ko Coupon.times_used
+    mein ek bulk_update se likhta hai (orders/coupons.py).
+    """
+    from .coupons import reconcile_coupon_usage
+
+    updated = reconcile_coupon_usage()
+    if updated:
+        logger.info(f"CELERY TASK (reconcile_coupon_usage): {updated} coupons synced.")
+
+
+@shared_task(name="generate_delivery_slots", ignore_result=True)
+def generate_delivery_slots_task():
+    """
+    Roz raat chalta hai: har active store ke aane wale dinon ke
+    DeliverySlots banata hai (orders/slots.py).
+    """
+    from .slots import generate_delivery_slots
+
+    count = generate_delivery_slots()
+    logger.info(f"CELERY TASK (generate_delivery_slots): {count} slots checked/created.")
+
+
+@shared_task(name="reconcile_slot_capacity", ignore_result=True)
+def reconcile_slot_capacity_task():
+    """
+    Har 5 minute: slot capacity counters ko DB ke hisaab se sync karta hai
+    (unpaid PENDING orders ki capacity wapas).
+    """
+    from .slots import reconcile_slot_capacity
+
+    adjusted = reconcile_slot_capacity()
+    if adjusted:
+        logger.info(f"CELERY TASK (reconcile_slot_capacity): {adjusted} slots adjusted.")
+
+
+@shared_task(name="warm_delivery_fee_cache", ignore_result=True)
+def warm_delivery_fee_cache_task():
+    """
+    Roz raat chalta hai: pichle orders ke (store, geohash cell) pairs ke
+    delivery fee entries cache mein bharta hai (orders/fees.py).
+    """
+    from .fees import warm_delivery_fee_cache
+
+    written = warm_delivery_fee_cache()
+    logger.info(f"CELERY TASK (warm_delivery_fee_cache): {written} cells cached.")
+
+
+@shared_task(name="generate_order_invoice", ignore_result=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+def generate_order_invoice_task(order_pk, force=False):
+    """
+    Order DELIVERED hone par (signals.py) ya bulk regeneration se chalta hai:
+    GST invoice PDF render karke storage mein rakhta hai (orders/invoices.py).
+    """
+    from .invoices import generate_order_invoice
+
+    generate_order_invoice(order_pk, force=force)
+
+
+@shared_task(name="regenerate_invoices", ignore_result=True)
+def regenerate_invoices_task(after_order_pk=None):
+    """
+    Roz raat chalta hai: INVOICE_TEMPLATE_VERSION se purane invoices ko
+    batches mein dobara render karne ke liye queue karta hai. Batch poora
+    bhara ho toh agla batch (pichle batch ke aakhri order ke baad se)
+    INVOICE_REGENERATE_BATCH_DELAY seconds baad khud queue karta hai, jab
+    tak koi purana invoice na bache. Archived invoices purane template mein
+    hi rehte hain (orders/invoices.py).
+    """
+    from .invoices import stale_invoice_order_ids
+
+    order_pks = stale_invoice_order_ids(settings.INVOICE_REGENERATE_BATCH_SIZE, after_order_pk)
+    for order_pk in order_pks:
+        generate_order_invoice_task.delay(order_pk)
+    if order_pks:
+        logger.info(f"CELERY TASK (regenerate_invoices): {len(order_pks)} invoices queued.")
+    if len(order_pks) == settings.INVOICE_REGENERATE_BATCH_SIZE:
+        regenerate_invoices_task.apply_async(
+            args=[order_pks[-1]],
+            countdown=settings.INVOICE_REGENERATE_BATCH_DELAY
+        )
+
+
+@shared_task(name="release_slot_orders", ignore_result=True)
+def release_slot_orders_task():
+    """
+    Har minute: jin scheduled orders ka slot SLOT_RELEASE_LEAD_MINUTES mein
+    shuru hone wala hai unki picking (PickTasks) shuru karta hai
+    (orders/fulfilment.py).
+    """
+    from .fulfilment import release_due_slot_orders
+
+    released, failed = release_due_slot_orders()
+    if released or failed:
+        logger.info(f"CELERY TASK (release_slot_orders): {released} slot orders released, {failed} failed.")
@@ -0,0 +1,136 @@
+# orders/tax.py
+"""
+Per-category GST tax engine.
+
+Har line ka GST rate Product.gst_rate -> Category.gst_rate ->
+parent Category.gst_rate -> settings.TAX_RATE order mein resolve hota hai
+(ek query mein, poore order ke liye). Rate order ke time OrderItem.tax_rate
+mein freeze ho jaata hai; baad ke recalculations (partial cancel) wahi
+stored rate use karte hain.
+
+Calculation ek hi vectorized pass mein numpy int64 arrays par integer
+paise mein hoti hai:
+1. gross = price * quantity
+2. order discount lines mein gross ke proportion mein baanta jaata hai
+   (largest-remainder, taaki paise ka total exact rahe)
+3. tax = round_half_up((gross - discount) * rate_bps / 10000)
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+
+PAISE = Decimal('100')
+BPS = 10000
+
+
+def to_paise(amount):
+    return int((Decimal(amount) * PAISE).to_integral_value())
+
+
+def from_paise(paise):
+    return (Decimal(int(paise)) / PAISE).quantize(Decimal('0.01'))
+
+
+def rate_to_bps(rate_percent):
+    """18.00 (%) -> 1800 basis points."""
+    return int((Decimal(rate_percent) * 100).to_integral_value())
+
+
+def default_rate_percent():
+    """settings.TAX_RATE fraction hai (0.05) -> percent (5.00)."""
+    return (Decimal(getattr(settings, 'TAX_RATE', Decimal('0.05'))) * 100).quantize(Decimal('0.01'))
+
+
+def resolve_rates(inventory_ids):
+    """
+    StoreInventory id -> GST rate (%) ek query mein.
+    Product rate > category rate > parent category rate > default.
+    """
+    # --- GUARDED IMPORTS (Circular dependency se bachne ke liye) ---
+    from inventory.models import StoreInventory
+    # --- END GUARDED IMPORTS ---
+    default = default_rate_percent()
+    rows = StoreInventory.objects.filter(id__in=inventory_ids).values_list(
+        'id',
+        'variant__product__gst_rate',
+        'variant__product__category__gst_rate',
+        'variant__product__category__parent__gst_rate',
+    )
+    rates = {}
+    for inventory_id, product_rate, category_rate, parent_rate in rows:
+        for rate in (product_rate, category_rate, parent_rate):
+            if rate is not None:
+                rates[inventory_id] = rate
+                break
+        else:
+            rates[inventory_id] = default
+    return rates
+
+
+def allocate_discount(gross, discount_paise):
+    """
+    Order-level discount ko lines mein gross ke proportion mein baantta hai.
+    Floor ke baad bache paise sabse bade remainder waali lines ko milte hain.
+    """
+    subtotal = int(gross.sum())
+    allocation = np.zeros_like(gross)
+    if subtotal <= 0 or discount_paise <= 0:
+        return allocation
+
+    discount_paise = min(discount_paise, subtotal)
+    scaled = gross * discount_paise
+    allocation = scaled // subtotal
+    leftover = discount_paise - int(allocation.sum())
+    if leftover:
+        remainders = scaled % subtotal
+        # Stable sort: barabar remainder par pehli line ko priority
+        order = np.argsort(-remainders, kind='stable')[:leftover]
+        allocation[order] += 1
+    return allocation
+
+
+def compute_line_taxes(prices_paise, quantities, rates_bps, discount_paise=0):
+    """
+    Vectorized per-line calculation (integer paise).
+    Return: dict of numpy arrays: gross, discount, taxable, tax.
+    """
+    prices = np.asarray(prices_paise, dtype=np.int64)
+    qty = np.asarray(quantities, dtype=np.int64)
+    rates = np.asarray(rates_bps, dtype=np.int64)
+
+    gross = prices * qty
+    discount = allocate_discount(gross, int(discount_paise))
+    taxable = gross - discount
+    # Round half up: (x * rate + BPS/2) // BPS
+    tax = (taxable * rates + BPS // 2) // BPS
+    return {'gross': gross, 'discount': discount, 'taxable': taxable, 'tax': tax}
+
+
+def apply_line_taxes(items, discount_amount):
+    """
+    OrderItems par tax_rate / line_discount / line_tax set karta hai
+    (save nahi karta). Jin items ka rate pehle se freeze hai, wahi use hota hai.
+    Return: (item_subtotal, taxes_amount) Decimal mein.
+    """
+    if not items:
+        return Decimal('0.00'), Decimal('0.00')
+
+    unresolved = [item.inventory_item_id for item in items if item.tax_rate is None and item.inventory_item_id]
+    resolved = resolve_rates(unresolved) if unresolved else {}
+    default = default_rate_percent()
+    for item in items:
+        if item.tax_rate is None:
+            item.tax_rate = resolved.get(item.inventory_item_id, default)
+
+    result = compute_line_taxes(
+        [to_paise(item.price_at_order) for item in items],
+        [item.quantity for item in items],
+        [rate_to_bps(item.tax_rate) for item in items],
+        to_paise(discount_amount),
+    )
+    for item, line_discount, line_tax in zip(items, result['discount'], result['tax']):
+        item.line_discount = from_paise(line_discount)
+        item.line_tax = from_paise(line_tax)
+
+    return from_paise(result['gross'].sum()), from_paise(result['tax'].sum())
@@ -3,9 +3,14 @@ from .views import (
     CheckoutView, 
     OrderHistoryView, 
     OrderDetailView, 
+    OrderTimelineView,
+    OrderInvoiceView,
+    OrderStatusBulkView,
+    DeliverySlotListView,
     PaymentVerificationView,
     OrderCancelView,
     RazorpayWebhookView,
+    RazorpayWebhookMetricsView,
     RiderRatingView,
     ReorderView
 )
@@ -16,11 +21,18 @@ urlpatterns = [
     path('checkout/', CheckoutView.as_view(), name='checkout'),
     path('verify-payment/', PaymentVerificationView.as_view(), name='verify-payment'),
     path('', OrderHistoryView.as_view(), name='order-history'),
+    path('status/', OrderStatusBulkView.as_view(), name='order-status-bulk'),
+    path('delivery-slots/', DeliverySlotListView.as_view(), name='delivery-slots'),
     path('<str:order_id>/', OrderDetailView.as_view(), name='order-detail'),
+    path('<str:order_id>/timeline/', OrderTimelineView.as_view(), name='order-timeline'),
+    path('<str:order_id>/invoice/', OrderInvoiceView.as_view(), name='order-invoice'),
     path('<str:order_id>/cancel/', OrderCancelView.as_view(), name='order-cancel'),
     path('webhook/razorpay/', 
          RazorpayWebhookView.as_view(), 
          name='razorpay-webhook'),
+    path('webhook/razorpay/metrics/',
+         RazorpayWebhookMetricsView.as_view(),
+         name='razorpay-webhook-metrics'),
     path('<str:order_id>/reorder/', ReorderView.as_view(), name='reorder'),
     path('<str:order_id>/rate-delivery/', RiderRatingView.as_view(), name='rate-delivery'),
 ]
\ No newline at end of file
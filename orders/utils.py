@@ -0,0 +1,33 @@
+import logging
+from channels.layers import get_channel_layer
+from asgiref.sync import async_to_sync
+
+# Ek logger setup karein
+logger = logging.getLogger(__name__)
+
+
+def broadcast_order_update(order, message=None):
+    """
+    Order ka naya status customer ke tracking WebSocket group
+    ('order_<order_id>') par push karta hai.
+    Yeh best-effort hai: channel layer down ho toh sirf log karta hai.
+    """
+    payload = {
+        'order_id': order.order_id,
+        'status': order.status,
+        'payment_status': order.payment_status,
+    }
+    if message:
+        payload['message'] = message
+
+    try:
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            f"order_{order.order_id}",
+            {
+                "type": "order.status.update",
+                "order": payload
+            }
+        )
+    except Exception as e:
+        logger.error(f"Order {order.order_id} ka status broadcast nahi ho paaya: {e}")
@@ -3,7 +3,7 @@ from django.db import transaction
 from django.db.models import F, Avg
 from rest_framework import generics, status
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny 
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from django.views.decorators.csrf import csrf_exempt 
 from django.utils.decorators import method_decorator
 from channels.layers import get_channel_layer
@@ -11,7 +11,7 @@ from asgiref.sync import async_to_sync
 from decimal import Decimal
 from django.utils import timezone
 from django.conf import settings
-from django.contrib.gis.measure import Distance 
+from django.core.cache import cache
 import razorpay 
 import json         
 import hmac         
@@ -21,12 +21,19 @@ from rest_framework.views import APIView
 
 # Task Imports
 # (Guarded imports ko neeche functions mein move kar diya gaya hai)
-from .tasks import process_razorpay_refund_task
+from .tasks import process_razorpay_refund_task, confirm_order_task, drain_razorpay_webhooks, generate_order_invoice_task
 
 # Model Imports
-from .models import Order, OrderItem, Payment, Address, Coupon
+from .models import Order, OrderItem, Payment, Address, OrderSnapshot, RazorpayWebhookEvent, OrderEvent, ArchivedOrderSnapshot, DeliverySlot, OrderInvoice, ArchivedOrder, ArchivedOrderInvoice
+from .snapshots import order_snapshot_queryset, write_order_snapshot, UNSNAPSHOTTED_STATUSES
+from .webhooks import webhook_inbox_metrics
+from .coupons import CouponLimitReached, redeem_coupon, release_coupon
+from .status_cache import get_status_entries, rider_positions
+from .fees import quote_delivery_fee
+from .slots import SlotUnavailable, available_slots, estimate_rider_minutes, release_slot, reserve_slot
 from cart.models import Cart, CartItem
 from inventory.models import StoreInventory
+from store.models import Store
 from delivery.models import Delivery 
 
 # Serializer Imports
@@ -36,6 +43,8 @@ from .serializers import (
     CheckoutSerializer, 
     OrderDetailSerializer, 
     OrderHistorySerializer,
+    OrderEventSerializer,
+    DeliverySlotSerializer,
     PaymentVerificationSerializer,
     RiderRatingSerializer
 )
@@ -49,17 +58,21 @@ logger = logging.getLogger(__name__) # <-- ADD
 def process_successful_payment(order_id):
     """
     Ek PENDING order ko CONFIRMED banata hai.
-    (Stock cut, Delivery create, Coupon use count update)
+    (Stock cut, Delivery create)
+    --- UPDATED: Coupon token checkout par liya jaata hai (orders/coupons.py);
+    yahan koi limit check nahi, captured payment coupon ki wajah se fail nahi hota.
+    Kisi aur wajah se fail ho toh captured Razorpay payment ka refund queue hota hai. ---
     --- AB YEH WMS PICK TASKS BHI BANATA HAI ---
+    --- UPDATED: Slot order ke PickTasks slot se pehle 'release_slot_orders' banata hai ---
     """
     # --- GUARDED IMPORTS (Circular dependency se bachne ke liye) ---
-    from wms.models import WmsStock, PickTask
-    from accounts.models import StoreStaffProfile
+    from delivery.eta import eta_for_order
+    from .fulfilment import check_stock, should_release_now, start_fulfilment
     # --- END GUARDED IMPORTS ---
 
     try:
-        # Order aur uske items ko pehle hi fetch kar lein
-        order = Order.objects.prefetch_related('items').get(
+        # Items transaction ke andar ek hi baar load hote hain (neeche dekhein)
+        order = Order.objects.get(
             order_id=order_id, 
             status=Order.OrderStatus.PENDING
         )
@@ -69,48 +82,17 @@ def process_successful_payment(order_id):
 
     try:
         with transaction.atomic():
-            order_lock = Order.objects.select_for_update().get(pk=order.pk)
+            order_lock = Order.objects.select_for_update(of=('self',)).select_related('delivery_slot').get(pk=order.pk)
 
-            # Cart se items lene ke bajaye, ab hum order se items lenge
-            order_items = order_lock.items.all()
+            # Order items ek hi query mein (allocation engine inhi ko use karega)
+            order_items = list(order_lock.items.all())
 
-            # Check karein ki cart (ya order) khaali na ho
-            if not order_items.exists():
+            # Check karein ki order khaali na ho
+            if not order_items:
                  raise Exception("Order has no items to process.")
 
-            # Stock cut logic (yeh pehle se tha)
-            # inventory_items_to_update = []
-            for item in order_items:
-                # Note: YEH ABHI BHI SUMMARY (StoreInventory) SE STOCK CUT KAR RAHA HAI
-                # WMS ke baad, yeh logic badalna chahiye,
-                # lekin abhi ke liye ise chhod dete hain taaki cart flow na toote.
-                # Asal stock 'WmsStock' se PickTaskCompleteView mein katega.
-
-                # Hum WMS flow ke liye stock check ko skip kar sakte hain,
-                # ya WmsStock summary par bharosa kar sakte hain.
-                
-                # --- FIX: Humne summary stock check (extra DB query) ko hata diya hai ---
-                # (Pichle turn mein yeh fix apply kiya gaya tha, use rakha gaya hai)
-                # inv_item = StoreInventory.objects.select_for_update().get(id=item.inventory_item.id)
-                # if inv_item.stock_quantity < item.quantity:
-                #    raise Exception(f"Item '{inv_item.variant.product.name}' is out of stock (Summary).")
-                # --- END FIX ---
-
-                # Yeh summary stock hai, WMS granular stock se alag hai.
-                # Hum isse update NAHI karenge, taaki WMS par control rahe.
-
-                # inv_item.stock_quantity = F('stock_quantity') - item.quantity
-                # inventory_items_to_update.append(inv_item)
-
-                pass # Stock cutting ko WMS par chhod dein
-
-            # StoreInventory.objects.bulk_update(inventory_items_to_update, ['stock_quantity'])
-
-            # Coupon usage count update karein (yeh pehle se tha)
-            if order_lock.coupon:
-                coupon = Coupon.objects.select_for_update().get(id=order_lock.coupon.id)
-                coupon.times_used = F('times_used') + 1
-                coupon.save(update_fields=['times_used'])
+            # Stock cutting WMS par chhod di gayi hai: asal stock 'WmsStock' se
+            # PickTaskCompleteView mein katega.
 
             # Payment status update karein (yeh pehle se tha)
             payment = order.payments.first()
@@ -124,7 +106,11 @@ def process_successful_payment(order_id):
             order_lock.save()
 
             # Delivery create karein (yeh pehle se tha)
-            delivery = Delivery.objects.create(order=order_lock) # Status default AWAITING_PREPARATION hoga
+            # --- UPDATED: Delivery ke saath pehla ETA (delivery/eta.py) ---
+            delivery = Delivery.objects.create(
+                order=order_lock,
+                estimated_delivery_time=eta_for_order(order_lock.pk)
+            ) # Status default AWAITING_PREPARATION hoga
 
             # Cart delete karein (yeh pehle se tha)
             try:
@@ -134,89 +120,14 @@ def process_successful_payment(order_id):
                 pass # Agar cart pehle hi delete ho gaya ho
 
             # --- NAYA WMS LOGIC START ---
-
-            # 1. Store ke liye ek available picker dhoondein
-            picker_user = None
-            staff_profile = StoreStaffProfile.objects.filter(
-                store=order_lock.store,
-                can_pick_orders=True
-            ).order_by(
-                    'last_task_assigned_at' # NULLs first, fir sabse purana
-            ).first() # Design doc ke mutabik, pehla available picker
-
-            if staff_profile:
-                picker_user = staff_profile.user
-                    
-                # ZAROORI: Ab is picker ka timestamp update karein
-                staff_profile.last_task_assigned_at = timezone.now()
-                staff_profile.save(update_fields=['last_task_assigned_at'])
-                    
-                logger.info(f"Assigning PickTasks for Order {order_id} to Picker {picker_user.username} (Round-Robin)") # <-- CHANGED
+            # --- UPDATED: Slot order ki picking slot ke paas (orders/fulfilment.py) ---
+            if should_release_now(order_lock):
+                # Picker assign + stock allocate + PickTasks
+                start_fulfilment(order_lock, order_items)
             else:
-                logger.warning(f"WARNING: Order {order_id} ke liye koi available picker (can_pick_orders=True) nahi mila.") # <-- CHANGED
-
-            tasks_created = 0
-
-            # 2. Har OrderItem ke liye PickTask banayein
-            for item in order_items:
-                inventory_item = item.inventory_item
-                quantity_to_pick = item.quantity # Hum is variable ko update karenge
-
-                # Pehle, summary stock check karein (jo WMS signal se sync hota hai)
-                # Hum transaction ke andar hain, isliye get() ka istemaal sahi hai
-                inv_summary_check = StoreInventory.objects.get(id=inventory_item.id)
-                
-                if inv_summary_check.stock_quantity < quantity_to_pick:
-                    # Agar summary stock hi nahi hai, toh fail karein
-                    raise Exception(f"Item '{inventory_item.variant.product.name}' (SKU: {inventory_item.variant.sku}) is out of stock (Summary). Needed {quantity_to_pick}, found {inv_summary_check.stock_quantity}.")
-
-                # --- NAYA "Greedy" Stock Splitting Logic ---
-                
-                # WmsStock locations dhoondein jahaan stock hai
-                available_stock_locations = WmsStock.objects.filter(
-                    inventory_summary=inventory_item,
-                    quantity__gt=0
-                ).select_related('location').order_by('location__code') # Picker ki efficiency ke liye location code se sort karein
-
-                pick_tasks_to_create = [] # Is item ke liye tasks list
-
-                for stock_loc in available_stock_locations:
-                    if quantity_to_pick <= 0:
-                        break # Humne zaroori quantity poori kar li
-
-                    # Is location se kitna uthana hai
-                    quantity_from_this_loc = min(stock_loc.quantity, quantity_to_pick)
-                    
-                    # PickTask (memory mein) banayein
-                    task = PickTask(
-                        order=order_lock,
-                        location=stock_loc.location,
-                        variant=inventory_item.variant,
-                        quantity_to_pick=quantity_from_this_loc,
-                        assigned_to=picker_user,
-                        status=PickTask.PickStatus.PENDING
-                    )
-                    pick_tasks_to_create.append(task)
-                    
-                    # Zaroori quantity ko kam karein
-                    quantity_to_pick -= quantity_from_this_loc
-                
-                # --- End Greedy Logic ---
-
-                # 3. Check karein ki poora stock mila ya nahi
-                if quantity_to_pick > 0:
-                    # CRITICAL: Summary stock (e.g., 10) aur granular stock (e.g., total 8) out of sync hain!
-                    # Transaction ko rollback karna zaroori hai.
-                    logger.critical(f"CRITICAL SYNC ERROR: Order {order_id} - Item {inventory_item.variant.sku} (Qty: {item.quantity}).") # <-- CHANGED
-                    logger.critical(f"Summary stock was {inv_summary_check.stock_quantity}, but granular stock only had {item.quantity - quantity_to_pick} available.") # <-- CHANGED
-                    raise Exception(f"Stock sync error for {inventory_item.variant.sku}. Could not fulfill order. Please audit stock.")
-                
-                else:
-                    # Sab theek hai, tasks ko bulk create karein (performance ke liye)
-                    PickTask.objects.bulk_create(pick_tasks_to_create)
-                    tasks_created += len(pick_tasks_to_create)
-
-            logger.info(f"WMS: Created {tasks_created} PickTasks for Order {order_id}") # <-- CHANGED
+                # Stock abhi reserve nahi hota (WMS pick par katta hai), par kam ho toh order yahin fail + refund
+                check_stock(order_items)
+                logger.info(f"Order {order_id} slot {order_lock.delivery_slot_id} ke liye hold par (picking baad mein).")
             # --- NAYA WMS LOGIC END ---
 
 
@@ -224,14 +135,29 @@ def process_successful_payment(order_id):
 
     except Exception as e:
         logger.error(f"process_successful_payment for {order_id} FAILED: {e}") # <-- ADDED
+        # (Coupon token aur slot capacity FAILED status par signals.py wapas karta hai)
+        payment = order.payments.first()
+
+        # --- NAYA: Captured Razorpay payment ko chup-chaap fail nahi karte, refund queue karein ---
+        captured = (
+            payment is not None
+            and payment.payment_method == 'RAZORPAY'
+            and payment.amount > 0
+            and payment.transaction_id
+            and not payment.transaction_id.startswith(('pending_', 'free_'))
+        )
         order.status = Order.OrderStatus.FAILED
-        order.payment_status = Order.PaymentStatus.FAILED
+        order.payment_status = Order.PaymentStatus.REFUND_INITIATED if captured else Order.PaymentStatus.FAILED
         order.save()
 
-        payment = order.payments.first()
         if payment:
-            payment.status = Order.PaymentStatus.FAILED
+            payment.status = order.payment_status
             payment.save()
+        if captured:
+            try:
+                process_razorpay_refund_task.delay(payment.id)
+            except Exception as refund_error:
+                logger.error(f"process_successful_payment: Order {order_id} ka refund queue nahi ho paaya: {refund_error}")
 
         return False, str(e) 
 
@@ -286,30 +212,43 @@ class CheckoutView(generics.GenericAPIView):
         
         # 2. Coupon validation (Order create karne se pehle check karna zaroori hai)
         if coupon:
-            is_valid, message = coupon.is_valid(item_subtotal)
+            is_valid, message = coupon.is_valid(item_subtotal, user=user)
             if not is_valid:
                 # Agar coupon invalid hai (e.g., min purchase), toh fail karein
                 return Response({"error": message}, status=status.HTTP_400_BAD_REQUEST)
         
-        # 3. Delivery fee (yeh bhi pehle calculate karna zaroori hai)
-        delivery_fee = Decimal('0.00')
-        try:
-            if store.location and address.location:
-                distance_km = Distance(store.location, address.location).km
-                # --- FIX: Settings se load karein ---
-                base_fee = settings.BASE_DELIVERY_FEE
-                fee_per_km = settings.FEE_PER_KM
-                delivery_fee = base_fee + (Decimal(distance_km) * fee_per_km)
-                delivery_fee = min(delivery_fee, settings.MAX_DELIVERY_FEE)
-                delivery_fee = max(delivery_fee, settings.MIN_DELIVERY_FEE)
-                # --- END FIX ---
-            else:
-                delivery_fee = settings.MIN_DELIVERY_FEE
-        except AttributeError:
-            # --- FIX: Hard-coded fallback ko settings se lein ---
-            delivery_fee = settings.MIN_DELIVERY_FEE 
-            logger.warning(f"Delivery fee settings not found. Using default MIN_DELIVERY_FEE: {delivery_fee}")
-            # --- END FIX ---
+        # 3. --- UPDATED: Delivery fee (store + geohash cell ka cached quote, surge ke saath) ---
+        fee_quote = quote_delivery_fee(store, address.location)
+        delivery_fee = fee_quote['delivery_fee']
+        distance_km = fee_quote['distance_km']
+
+        # 4. --- NAYA: Scheduled delivery slot ki capacity reserve karein ---
+        delivery_slot = None
+        slot_items = 0
+        rider_minutes = estimate_rider_minutes(distance_km)
+        slot_id = validated_data.get('delivery_slot_id')
+        if slot_id:
+            try:
+                delivery_slot = DeliverySlot.objects.get(id=slot_id, store=store)
+                slot_items = sum(item.quantity for item in cart_items)
+                reserve_slot(delivery_slot, slot_items, rider_minutes)
+            except DeliverySlot.DoesNotExist:
+                return Response({"error": "Invalid delivery slot."}, status=status.HTTP_400_BAD_REQUEST)
+            except SlotUnavailable as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            except Exception as e:
+                logger.error(f"Checkout: Slot {slot_id} reserve nahi ho paaya: {e}")
+                return Response({"error": "Could not reserve delivery slot. Please try again."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        # 5. --- NAYA: Coupon ka usage token abhi lein (slot ki tarah); order FAIL ho toh signals.py wapas karta hai ---
+        coupon_reserved = False
+        if coupon:
+            try:
+                coupon_reserved = redeem_coupon(coupon, user.id)
+            except CouponLimitReached as e:
+                if delivery_slot:
+                    release_slot(delivery_slot.id, slot_items, rider_minutes)
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         # --- BAAKI SABHI CALCULATIONS (DISCOUNT, TAX, FINAL TOTAL) YAHAN SE HATA DIYE GAYE HAIN ---
         
@@ -329,6 +268,8 @@ class CheckoutView(generics.GenericAPIView):
                 rider_tip=rider_tip,            # <-- User ka tip
                 final_total=Decimal('0.00'),    # <-- Default, model calculate karega
                 special_instructions=validated_data.get('special_instructions', ''),
+                delivery_slot=delivery_slot,
+                rider_minutes_estimate=rider_minutes,
                 status=Order.OrderStatus.PENDING, 
                 payment_status=Order.PaymentStatus.PENDING
             )
@@ -357,6 +298,10 @@ class CheckoutView(generics.GenericAPIView):
 
         except Exception as e:
             logger.error(f"Checkout (Step 1 - Order Creation) failed for user {user.username}: {e}") # <-- ADDED
+            if delivery_slot:
+                release_slot(delivery_slot.id, slot_items, rider_minutes)
+            if coupon_reserved:
+                release_coupon(coupon, user.id)
             return Response(
                 {"error": f"Order creation (Step 1) failed: {str(e)}"}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -383,17 +328,9 @@ class CheckoutView(generics.GenericAPIView):
                     transaction_id=f"cod_{order.order_id}"
                 )
                 
-                success, result = process_successful_payment(order.order_id)
-                
-                if not success:
-                    logger.error(f"Checkout (COD) failed for order {order.order_id} during process_successful_payment: {result}") # <-- ADDED
-                    return Response({"error": f"Failed to process COD order: {result}"}, status=status.HTTP_400_BAD_REQUEST)
-                
-                order_serializer = OrderDetailSerializer(order, context={'request': request})
-                return Response({
-                    "message": "COD Order confirmed successfully.",
-                    "order_details": order_serializer.data
-                }, status=status.HTTP_201_CREATED)
+                # --- ASYNC CONFIRMATION ---
+                # Stock allocation, PickTasks, Delivery waghera ab Celery worker karega.
+                return self._enqueue_confirmation(order, request, "COD order received, confirmation in progress.")
 
             except Exception as e:
                 logger.error(f"Checkout (COD) exception for order {order.order_id}: {e}") # <-- ADDED
@@ -420,23 +357,13 @@ class CheckoutView(generics.GenericAPIView):
                         status=Order.PaymentStatus.PENDING,
                         transaction_id=f"free_{order.order_id}"
                     )
-                    success, result = process_successful_payment(order.order_id)
-                    
-                    if not success:
-                         logger.error(f"Checkout (Free Order) failed for order {order.order_id}: {result}") # <-- ADDED
-                         return Response({"error": f"Failed to process free order: {result}"}, status=status.HTTP_400_BAD_REQUEST)
-                    
-                    order_serializer = OrderDetailSerializer(order, context={'request': request})
-                    return Response({
-                        "message": "Free order confirmed successfully.",
-                        "order_details": order_serializer.data
-                    }, status=status.HTTP_201_CREATED)
+                    return self._enqueue_confirmation(order, request, "Free order received, confirmation in progress.")
                 except Exception as e:
                      logger.error(f"Checkout (Free Order) exception for order {order.order_id}: {e}") # <-- ADDED
                      order.status = Order.OrderStatus.FAILED
                      order.payment_status = Order.PaymentStatus.FAILED
                      order.save()
-                     return Response({"error": f"Free order processing failed: {str(e)}"}, status=HTTP_400_BAD_REQUEST)
+                     return Response({"error": f"Free order processing failed: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
             
             # --- Standard Razorpay flow (agar payment zaroori hai) ---
             try:
@@ -487,6 +414,36 @@ class CheckoutView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    def _enqueue_confirmation(self, order, request, message):
+        """
+        PENDING order ka confirmation Celery queue par daalta hai aur
+        turant 202 return karta hai. Result WebSocket ('/ws/track/<order_id>/')
+        par push hota hai ya OrderDetailView se poll kiya ja sakta hai.
+        Agar broker down hai, toh purane tarike se inline process karta hai.
+        """
+        try:
+            confirm_order_task.delay(order.order_id)
+        except Exception as e:
+            logger.error(f"Checkout: confirm_order_task enqueue failed for {order.order_id}, processing inline: {e}")
+            success, result = process_successful_payment(order.order_id)
+            if not success:
+                return Response({"error": f"Failed to process order: {result}"}, status=status.HTTP_400_BAD_REQUEST)
+            order.refresh_from_db()
+            order_serializer = OrderDetailSerializer(order, context={'request': request})
+            return Response({
+                "message": "Order confirmed successfully.",
+                "order_id": order.order_id,
+                "status": order.status,
+                "order_details": order_serializer.data
+            }, status=status.HTTP_201_CREATED)
+
+        return Response({
+            "message": message,
+            "order_id": order.order_id,
+            "status": order.status,
+            "tracking_ws": f"/ws/track/{order.order_id}/"
+        }, status=status.HTTP_202_ACCEPTED)
+
 
 
 
@@ -569,30 +526,220 @@ class PaymentVerificationView(generics.GenericAPIView):
 
 class OrderHistoryView(generics.ListAPIView):
     """
-    (Aapka code - Ismein koi badlaav nahi hai)
+    Customer ki order history.
+    --- UPDATED: Snapshot waale orders ka compact summary seedha
+    OrderSnapshot.summary se aata hai (serializer dekhein). Archived orders
+    ArchivedOrderSnapshot se merge hote hain. ---
     """
     permission_classes = [IsAuthenticated, IsCustomer]
     serializer_class = OrderHistorySerializer
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).select_related('store').order_by('-created_at')
+        return Order.objects.filter(user=self.request.user).select_related(
+            'store', 'snapshot'
+        ).order_by('-created_at')
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # --- NAYA: Archive mein move hue purane orders bhi history mein dikhayein ---
+        archived = list(
+            ArchivedOrderSnapshot.objects.filter(user=request.user).values_list('summary', flat=True)
+        )
+        if archived and isinstance(response.data, list):
+            response.data = sorted(
+                list(response.data) + archived,
+                key=lambda summary: summary.get('created_at') or '',
+                reverse=True
+            )
+        return response
 
 
 class OrderDetailView(generics.RetrieveAPIView):
     """
-    (Aapka code - Ismein koi badlaav nahi hai)
+    Ek order ki poori detail.
+    --- UPDATED: Pehle OrderSnapshot (ek indexed lookup) try hota hai.
+    Snapshot na ho toh purana serializer path chalta hai aur
+    confirmed orders ka snapshot wahin ban jaata hai. ---
     """
     permission_classes = [IsAuthenticated, IsCustomer]
     serializer_class = OrderDetailSerializer
     lookup_field = 'order_id' 
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).prefetch_related(
-            'items', 
-            'payments'
-        ).select_related('store', 'delivery_address', 'delivery', 'coupon')
+        return order_snapshot_queryset().filter(user=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        snapshot = OrderSnapshot.objects.filter(
+            order_id_str=kwargs[self.lookup_field],
+            user=request.user
+        ).only('detail').first()
+        if snapshot is not None:
+            return Response(snapshot.detail)
+
+        # Archive ho chuka order (orders/archive.py)
+        archived = ArchivedOrderSnapshot.objects.filter(
+            order_id_str=kwargs[self.lookup_field],
+            user=request.user
+        ).only('detail').first()
+        if archived is not None:
+            return Response(archived.detail)
+
+        order = self.get_object()
+        if order.status not in UNSNAPSHOTTED_STATUSES:
+            snapshot = write_order_snapshot(order.pk)
+            if snapshot is not None:
+                return Response(snapshot.detail)
+        return Response(self.get_serializer(order).data)
+
+
+
+class OrderTimelineView(generics.ListAPIView):
+    """
+    API: GET /api/orders/<order_id>/timeline/
+    Order ke saare events (OrderEvent) seq order mein.
+    (order, seq) index par seedha range scan hai.
+    """
+    permission_classes = [IsAuthenticated, IsCustomer]
+    serializer_class = OrderEventSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        return OrderEvent.objects.filter(
+            order__order_id=self.kwargs['order_id'],
+            order__user=self.request.user
+        ).select_related('order').order_by('seq')
 
 
+class OrderInvoiceView(APIView):
+    """
+    API: GET /api/orders/<order_id>/invoice/
+    DELIVERED order ke GST invoice PDF ka URL. PDF pehle se Celery task
+    ne bana ke storage mein rakha hai (orders/invoices.py), isliye download
+    seedha storage/CDN se hota hai. Invoice abhi bana nahi toh task queue
+    karke 202 deta hai. Customer sirf apne orders; staff (support) sabke.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        order_id = kwargs['order_id']
+        owner_filter = {} if request.user.is_staff else {'user': request.user}
+
+        order = Order.objects.filter(order_id=order_id, **owner_filter).only('id', 'status').first()
+        if order is None:
+            # Archive ho chuka order (orders/archive.py)
+            archived = ArchivedOrder.objects.filter(order_id=order_id, **owner_filter).only('id').first()
+            invoice = ArchivedOrderInvoice.objects.filter(order_pk=archived.id).first() if archived else None
+            if invoice is None:
+                return Response({"error": "Invoice not found."}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            if order.status != Order.OrderStatus.DELIVERED:
+                return Response(
+                    {"error": "Invoice sirf delivered orders ke liye milta hai."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            invoice = OrderInvoice.objects.filter(order_id=order.id).first()
+            if invoice is None:
+                self._queue_generation(order.id)
+                return Response(
+                    {"message": "Invoice ban raha hai. Thodi der baad try karein."},
+                    status=status.HTTP_202_ACCEPTED
+                )
+
+        return Response({
+            'invoice_number': invoice.invoice_number,
+            'url': invoice.pdf.url,
+            'content_hash': invoice.content_hash,
+            'generated_at': invoice.generated_at,
+        }, status=status.HTTP_200_OK)
+
+    def _queue_generation(self, order_pk):
+        """Polling clients har GET par task queue na karein: cache.add debounce."""
+        try:
+            first_request = cache.add(
+                f"invoice_generate_{order_pk}", 1, timeout=settings.INVOICE_GENERATE_DEBOUNCE_SECONDS
+            )
+        except Exception as e:
+            logger.warning(f"Invoice debounce cache fail (order {order_pk}): {e}")
+            first_request = True
+        if first_request:
+            generate_order_invoice_task.delay(order_pk)
+
+
+class OrderStatusBulkView(APIView):
+    """
+    API: GET /api/orders/status/?order_ids=AB12CD34,EF56GH78
+    Kai orders ka compact status (status, payment, delivery status, ETA,
+    rider position) ek request mein. Entries cache se aati hain
+    (orders/status_cache.py); miss hone par ek hi query.
+    Customer sirf apne orders dekh sakta hai; staff (support) sabke.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        raw_ids = request.query_params.get('order_ids', '')
+        order_ids = list(dict.fromkeys(oid.strip().upper() for oid in raw_ids.split(',') if oid.strip()))
+
+        if not order_ids:
+            return Response({"error": "'order_ids' is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(order_ids) > settings.ORDER_STATUS_BULK_MAX:
+            return Response(
+                {"error": f"Ek request mein max {settings.ORDER_STATUS_BULK_MAX} orders."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        entries = get_status_entries(order_ids)
+        if not request.user.is_staff:
+            entries = {oid: entry for oid, entry in entries.items() if entry['user_id'] == request.user.id}
+
+        positions = rider_positions({entry['rider_id'] for entry in entries.values() if entry['rider_id']})
+
+        results = []
+        for order_id in order_ids:
+            entry = entries.get(order_id)
+            if entry is None:
+                continue
+            results.append({
+                'order_id': order_id,
+                'status': entry['status'],
+                'payment_status': entry['payment_status'],
+                'delivery_status': entry['delivery_status'],
+                'eta': entry['eta'],
+                'rider_location': positions.get(entry['rider_id']),
+            })
+
+        return Response({
+            'results': results,
+            'not_found': [order_id for order_id in order_ids if order_id not in entries],
+        }, status=status.HTTP_200_OK)
+
+
+class DeliverySlotListView(generics.GenericAPIView):
+    """
+    API: GET /api/orders/delivery-slots/?store_id=<id>
+    Store ke aane wale slots jinmein abhi capacity hai (checkout ke liye).
+    store_id na ho toh user ke cart ka store.
+    """
+    permission_classes = [IsAuthenticated, IsCustomer]
+    serializer_class = DeliverySlotSerializer
+
+    def get(self, request, *args, **kwargs):
+        store_id = request.query_params.get('store_id')
+        if store_id:
+            store = Store.objects.filter(id=store_id, is_active=True).first()
+        else:
+            cart = Cart.objects.filter(user=request.user).first()
+            store = cart.store if cart else None
+        if not store:
+            return Response({"error": "Store not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        slots = available_slots(store)
+        serializer = self.get_serializer(
+            [slot for slot, _ in slots],
+            many=True,
+            context={'request': request, 'remaining': {slot.id: remaining for slot, remaining in slots}}
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 
 class OrderCancelView(generics.GenericAPIView):
     """
@@ -605,6 +752,7 @@ class OrderCancelView(generics.GenericAPIView):
     def post(self, request, *args, **kwargs):
         # --- GUARDED IMPORTS (Circular dependency se bachne ke liye) ---
         from wms.models import WmsStock, PickTask
+        from delivery.transitions import can_transition, transition
         # --- END GUARDED IMPORTS ---
         
         order_id = self.kwargs.get('order_id')
@@ -669,8 +817,9 @@ class OrderCancelView(generics.GenericAPIView):
                     if delivery.status in [Delivery.DeliveryStatus.PICKED_UP, Delivery.DeliveryStatus.DELIVERED]:
                         raise Exception(f"Cannot cancel, delivery is already {delivery.status}")
                     
-                    delivery.status = Delivery.DeliveryStatus.CANCELLED
-                    delivery.save(update_fields=['status'])
+                    # --- UPDATED: Transition table (delivery/transitions.py) ---
+                    if can_transition(delivery.status, Delivery.DeliveryStatus.CANCELLED):
+                        transition(delivery, Delivery.DeliveryStatus.CANCELLED)
                 except Delivery.DoesNotExist:
                     pass 
 
@@ -750,6 +899,9 @@ class RazorpayWebhookView(APIView):
     Razorpay Webhook Endpoint.
     Yeh Razorpay se server-to-server updates (jaise 'payment.captured')
     receive karta hai. Yeh client-side verification ka backup hai.
+    --- UPDATED: Event sirf RazorpayWebhookEvent inbox mein save hota hai
+    (event_id se dedupe) aur turant 200 jaata hai; processing
+    'drain_razorpay_webhooks' Celery task karta hai. ---
     """
     permission_classes = [AllowAny] # Koi bhi (Razorpay) isse call kar sakta hai
 
@@ -788,64 +940,57 @@ class RazorpayWebhookView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
             
-        # Step 2: Signature valid hai, ab payload process karein
+        # Step 2: Signature valid hai, ab event ko inbox mein daalein.
+        # --- UPDATED: Processing ab Celery worker karta hai (orders/webhooks.py) ---
         try:
             payload = json.loads(raw_body)
-            event = payload.get('event')
-
-            if event == 'payment.captured':
-                payment_entity = payload.get('payload', {}).get('payment', {}).get('entity', {})
-                razorpay_order_id = payment_entity.get('order_id')
-                razorpay_payment_id = payment_entity.get('id')
-
-                if not razorpay_order_id or not razorpay_payment_id:
-                    return Response({"error": "Payload missing data."}, status=status.HTTP_400_BAD_REQUEST)
-
-                # Apne 'Payment' object ko dhoondein
-                try:
-                    payment = Payment.objects.get(razorpay_order_id=razorpay_order_id)
-                    order = payment.order
-                    
-                    # Agar order pehle hi PENDING hai (yaani process nahi hua)
-                    if order.status == Order.OrderStatus.PENDING:
-                        logger.info(f"Webhook: Processing PENDING order {order.order_id}") # <-- CHANGED
-                        
-                        # Payment ID update karein
-                        payment.transaction_id = razorpay_payment_id
-                        payment.save()
-                        
-                        # Hamara common function call karein
-                        success, result = process_successful_payment(order.order_id)
-                        
-                        if success:
-                            logger.info(f"Webhook: Successfully processed order {order.order_id}") # <-- CHANGED
-                        else:
-                            logger.error(f"Webhook: Failed to process order {order.order_id}: {result}") # <-- CHANGED
-                    
-                    elif order.status == Order.OrderStatus.CONFIRMED:
-                        logger.info(f"Webhook: Order {order.order_id} is already confirmed. Ignoring.") # <-- CHANGED
-                        
-                except Payment.DoesNotExist:
-                    logger.warning(f"Webhook ERROR: Payment with RZP Order ID {razorpay_order_id} not found.") # <-- CHANGED
-                    # Hum 404 nahi bhejenge, 200 hi bhejenge taaki Razorpay retry na kare
-                    pass
-            
-            else:
-                logger.info(f"Webhook: Received unhandled event '{event}'") # <-- CHANGED
-
-            # Hamesha 200 OK return karein
-            return Response(
-                {"status": "ok"}, 
-                status=status.HTTP_200_OK
-            )
-            
         except json.JSONDecodeError:
             logger.error("Webhook payload processing error: Invalid JSON") # <-- ADDED
             return Response({"error": "Invalid JSON payload."}, status=status.HTTP_400_BAD_REQUEST)
+
+        event_id = request.headers.get('X-Razorpay-Event-Id') or hashlib.sha256(raw_body).hexdigest()
+        event = payload.get('event') or ''
+        entity = payload.get('payload', {}).get('payment', {}).get('entity', {})
+        razorpay_order_id = entity.get('order_id') or ''
+
+        try:
+            # Ek hi INSERT; duplicate event_id (Razorpay retry) chupchaap ignore hota hai
+            RazorpayWebhookEvent.objects.bulk_create(
+                [RazorpayWebhookEvent(
+                    event_id=event_id,
+                    event=event,
+                    razorpay_order_id=razorpay_order_id,
+                    payload=payload
+                )],
+                ignore_conflicts=True
+            )
         except Exception as e:
-            logger.error(f"Webhook payload processing error: {e}") # <-- CHANGED
+            logger.error(f"Webhook inbox insert error: {e}") # <-- CHANGED
+            # 500 par Razorpay khud retry karega
             return Response({"error": "Internal server error."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        try:
+            drain_razorpay_webhooks.delay(razorpay_order_id)
+        except Exception as e:
+            # Beat sweeper (har minute) ise baad mein utha lega
+            logger.warning(f"Webhook drain task enqueue nahi ho paaya ({event_id}): {e}")
+
+        # Hamesha 200 OK return karein
+        return Response(
+            {"status": "ok"}, 
+            status=status.HTTP_200_OK
+        )
+
+
+class RazorpayWebhookMetricsView(APIView):
+    """
+    Webhook inbox ka backlog aur lag (sirf admin ke liye).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(webhook_inbox_metrics(), status=status.HTTP_200_OK)
+
 
 
 class RiderRatingView(generics.GenericAPIView):
@@ -925,95 +1070,121 @@ class ReorderView(generics.GenericAPIView):
     API: POST /api/orders/<order_id>/reorder/
     Ek puraane order ko "re-order" karta hai.
     Yeh puraane order ke items ko user ke current cart mein add karta hai.
+    --- UPDATED: Set-based. Saare inventory rows ek query mein, diff memory mein,
+    aur cart items ek bulk_create mein (item count se independent queries). ---
+
+    Response 'diff':
+    - added: poori quantity cart mein gayi
+    - adjusted: stock kam tha, jitna available tha utna add hua
+    - unavailable: item ab nahi bikta / out of stock
     """
     permission_classes = [IsAuthenticated, IsCustomer]
     serializer_class = CartSerializer # Response mein poora cart bhejenge
 
+    @staticmethod
+    def build_reorder_diff(original_items, inventory_by_id):
+        """
+        Puraane items (values dicts) aur current inventory se
+        (cart_items_to_create_data, diff) banata hai. Koi query nahi.
+        Ek hi inventory item do baar ho toh quantity merge hoti hai.
+        """
+        requested = {}
+        diff = {'added': [], 'adjusted': [], 'unavailable': []}
+
+        for item in original_items:
+            name = f"{item['product_name']} ({item['variant_name']})"
+            inventory_id = item['inventory_item_id']
+            if inventory_id is None:
+                diff['unavailable'].append({
+                    'inventory_item_id': None, 'name': name,
+                    'requested': item['quantity'], 'reason': 'No longer available'
+                })
+                continue
+            entry = requested.setdefault(inventory_id, {'name': name, 'quantity': 0})
+            entry['quantity'] += item['quantity']
+
+        to_add = []
+        for inventory_id, entry in requested.items():
+            inventory = inventory_by_id.get(inventory_id)
+            line = {'inventory_item_id': inventory_id, 'name': entry['name'], 'requested': entry['quantity']}
+
+            if inventory is None:
+                diff['unavailable'].append({**line, 'reason': 'No longer available'})
+            elif not inventory.is_in_stock:
+                diff['unavailable'].append({**line, 'reason': 'Out of Stock'})
+            elif inventory.stock_quantity < entry['quantity']:
+                to_add.append((inventory, inventory.stock_quantity))
+                diff['adjusted'].append({**line, 'quantity': inventory.stock_quantity})
+            else:
+                to_add.append((inventory, entry['quantity']))
+                diff['added'].append({**line, 'quantity': entry['quantity']})
+
+        return to_add, diff
+
     def post(self, request, *args, **kwargs):
         order_id = self.kwargs.get('order_id')
         user = request.user
 
         try:
             # 1. Puraana order dhoondein aur check karein ki woh user ka hai
-            original_order = Order.objects.get(
+            original_order = Order.objects.only('id', 'store_id').get(
                 order_id=order_id, 
                 user=user
             )
         except Order.DoesNotExist:
             return Response({"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        # 2. User ka cart dhoondein (ya banayein)
-        cart, _ = Cart.objects.get_or_create(user=user)
-        
-        # 3. Puraane order ke items lein
-        original_items = original_order.items.all().select_related(
-            'inventory_item__variant__product' # Performance ke liye
-        )
+        # 2. Store check karein (puraane order wala store)
+        if not original_order.store_id:
+            return Response({"error": "Cannot reorder from an unknown store."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not original_items.exists():
+        # 3. Puraane order ke items (sirf zaroori columns, 1 query)
+        original_items = list(original_order.items.values(
+            'inventory_item_id', 'product_name', 'variant_name', 'quantity'
+        ))
+        if not original_items:
             return Response({"error": "Original order has no items."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 4. Store check karein (puraane order wala store)
-        order_store = original_order.store
-        if not order_store:
-            return Response({"error": "Cannot reorder from an unknown store."}, status=status.HTTP_400_BAD_REQUEST)
-
-        items_added = []
-        items_unavailable = []
-        
-        try:
-            with transaction.atomic():
-                # 5. User ke current cart ko khaali karein
-                # Yeh ensure karta hai ki cart mein sirf naye items hon
-                cart.items.all().delete()
+        # 4. Saare current inventory rows ek hi query mein (sirf usi store ke)
+        inventory_ids = {item['inventory_item_id'] for item in original_items if item['inventory_item_id']}
+        inventory_by_id = StoreInventory.objects.filter(
+            store_id=original_order.store_id
+        ).in_bulk(list(inventory_ids))
 
-                # 6. Har puraane item ko process karein
-                for item in original_items:
-                    item_name = f"{item.product_name} ({item.variant_name})"
-                    
-                    try:
-                        # 7. Check karein ki woh inventory item abhi bhi maujood hai
-                        current_inventory_item = StoreInventory.objects.get(
-                            id=item.inventory_item_id,
-                            store=order_store
-                        )
-                        
-                        # 8. Stock check karein
-                        if current_inventory_item.is_in_stock and current_inventory_item.stock_quantity >= item.quantity:
-                            # Item available hai, cart mein add karein
-                            CartItem.objects.create(
-                                cart=cart,
-                                inventory_item=current_inventory_item,
-                                quantity=item.quantity
-                            )
-                            items_added.append(f"{item.quantity} x {item_name}")
-                        else:
-                            # Out of stock
-                            items_unavailable.append(f"{item_name} (Out of Stock)")
-                            
-                    except StoreInventory.DoesNotExist:
-                        # Item ab bikna band ho gaya hai
-                        items_unavailable.append(f"{item_name} (No longer available)")
+        # 5. Added / adjusted / unavailable memory mein
+        to_add, diff = self.build_reorder_diff(original_items, inventory_by_id)
 
-                # 7. Agar koi bhi item add nahi ho paaya, toh transaction rollback karein
-                if not items_added:
-                    raise Exception("Reorder failed: All items are unavailable.")
+        # Purane response fields (string lists) bhi bhejte hain
+        items_added = [f"{line['quantity']} x {line['name']}" for line in diff['added'] + diff['adjusted']]
+        items_unavailable = [f"{line['name']} ({line['reason']})" for line in diff['unavailable']]
 
-        except Exception as e:
-            # Agar transaction fail hua (e.g., saare items unavailable)
-            logger.warning(f"Reorder failed for user {user.username}, order {order_id}: {e}") # <-- ADDED
+        if not to_add:
+            logger.warning(f"Reorder failed for user {user.username}, order {order_id}: All items are unavailable.") # <-- ADDED
             return Response(
-                {"error": str(e), "items_unavailable": items_unavailable},
+                {"error": "Reorder failed: All items are unavailable.", "items_unavailable": items_unavailable, "diff": diff},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # 8. Success response: Naya cart data aur summary bhejein
-        cart.refresh_from_db() # Cart ko update karein
+        # 6. Cart ko ek transaction mein replace karein (1 DELETE + 1 bulk INSERT)
+        cart, _ = Cart.objects.get_or_create(user=user)
+        with transaction.atomic():
+            cart.items.all().delete()
+            CartItem.objects.bulk_create([
+                CartItem(cart=cart, inventory_item=inventory, quantity=quantity)
+                for inventory, quantity in to_add
+            ])
+            Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now())
+
+        # 7. Success response: Naya cart data aur summary bhejein
+        cart = Cart.objects.prefetch_related(
+            'items__inventory_item__variant__product'
+        ).get(pk=cart.pk)
         serializer = self.get_serializer(cart, context={'request': request})
         
         return Response({
             "message": "Cart has been updated with available items.",
             "items_added": items_added,
             "items_unavailable": items_unavailable,
+            "diff": diff,
             "cart": serializer.data
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,165 @@
+# orders/webhooks.py
+"""
+Razorpay webhook inbox ka processing.
+
+RazorpayWebhookView sirf event ko RazorpayWebhookEvent table mein insert
+karta hai (event_id unique = dedupe). Yahan ke functions Celery worker se
+chalte hain: har razorpay_order_id ke pending events ek transaction mein
+lock karke 'id' order mein process hote hain, taaki same order ke events
+kabhi parallel ya out-of-order na chalein.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Min
+from django.utils import timezone
+
+from .models import Order, Payment, RazorpayWebhookEvent
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+
+def handle_payment_captured(event):
+    """
+    'payment.captured': PENDING order ko confirm karta hai
+    (client-side PaymentVerificationView ka backup).
+    Return: (status, note)
+    """
+    # --- GUARDED IMPORTS (Circular dependency se bachne ke liye) ---
+    from .views import process_successful_payment
+    # --- END GUARDED IMPORTS ---
+
+    entity = event.payload.get('payload', {}).get('payment', {}).get('entity', {})
+    razorpay_payment_id = entity.get('id')
+    if not event.razorpay_order_id or not razorpay_payment_id:
+        return RazorpayWebhookEvent.EventStatus.IGNORED, "Payload missing data."
+
+    try:
+        payment = Payment.objects.select_related('order').get(razorpay_order_id=event.razorpay_order_id)
+    except Payment.DoesNotExist:
+        logger.warning(f"Webhook ERROR: Payment with RZP Order ID {event.razorpay_order_id} not found.")
+        return RazorpayWebhookEvent.EventStatus.IGNORED, "Payment not found."
+
+    order = payment.order
+    if order.status != Order.OrderStatus.PENDING:
+        logger.info(f"Webhook: Order {order.order_id} is already {order.status}. Ignoring.")
+        return RazorpayWebhookEvent.EventStatus.IGNORED, f"Order already {order.status}."
+
+    logger.info(f"Webhook: Processing PENDING order {order.order_id}")
+    payment.transaction_id = razorpay_payment_id
+    payment.save(update_fields=['transaction_id'])
+
+    success, result = process_successful_payment(order.order_id)
+    if success:
+        logger.info(f"Webhook: Successfully processed order {order.order_id}")
+        return RazorpayWebhookEvent.EventStatus.PROCESSED, ""
+
+    # process_successful_payment order ko FAILED mark kar deta hai, retry ka fayda nahi
+    logger.error(f"Webhook: Failed to process order {order.order_id}: {result}")
+    return RazorpayWebhookEvent.EventStatus.FAILED, str(result)
+
+
+# Event type -> handler. Jo event yahan nahi hai woh IGNORED mark hota hai.
+WEBHOOK_EVENT_HANDLERS = {
+    'payment.captured': handle_payment_captured,
+}
+
+
+def process_webhook_event(event):
+    """
+    Ek (locked) event ko process karke uska status save karta hai.
+    Return: True agar event final state mein pahunch gaya, False agar
+    baad mein retry hona hai (us order ke aage ke events tab tak ruke rahenge).
+    """
+    handler = WEBHOOK_EVENT_HANDLERS.get(event.event)
+    event.attempts += 1
+
+    if handler is None:
+        logger.info(f"Webhook: Received unhandled event '{event.event}'")
+        event.status = RazorpayWebhookEvent.EventStatus.IGNORED
+        event.processed_at = timezone.now()
+        event.save(update_fields=['status', 'attempts', 'processed_at'])
+        return True
+
+    try:
+        with transaction.atomic():
+            event.status, event.last_error = handler(event)
+        event.processed_at = timezone.now()
+        event.save(update_fields=['status', 'attempts', 'last_error', 'processed_at'])
+        return True
+    except Exception as e:
+        logger.error(f"Webhook event {event.event_id} processing error (attempt {event.attempts}): {e}")
+        event.last_error = str(e)
+        if event.attempts >= settings.RAZORPAY_WEBHOOK_MAX_ATTEMPTS:
+            event.status = RazorpayWebhookEvent.EventStatus.FAILED
+            event.processed_at = timezone.now()
+            event.save(update_fields=['status', 'attempts', 'last_error', 'processed_at'])
+            return True
+        event.save(update_fields=['attempts', 'last_error'])
+        return False
+
+
+def drain_order_events(razorpay_order_id):
+    """
+    Ek razorpay_order_id ke saare PENDING events 'id' order mein process karta hai.
+    Rows select_for_update se lock hote hain: doosra worker wait karega aur
+    lock milne par unhe already processed paayega.
+    Return: processed events ki ginti.
+    """
+    processed = 0
+    with transaction.atomic():
+        events = RazorpayWebhookEvent.objects.select_for_update().filter(
+            razorpay_order_id=razorpay_order_id,
+            status=RazorpayWebhookEvent.EventStatus.PENDING
+        ).order_by('id')
+        for event in events:
+            if not process_webhook_event(event):
+                break
+            processed += 1
+    return processed
+
+
+def pending_order_keys(limit):
+    """Sabse purane pending events waale razorpay_order_ids (FIFO)."""
+    return list(
+        RazorpayWebhookEvent.objects.filter(
+            status=RazorpayWebhookEvent.EventStatus.PENDING
+        ).values('razorpay_order_id').annotate(
+            first_id=Min('id')
+        ).order_by('first_id').values_list('razorpay_order_id', flat=True)[:limit]
+    )
+
+
+def webhook_inbox_metrics():
+    """
+    Inbox ka health: backlog (pending events), lag (sabse purane pending
+    event ki umar), failed count aur pichle ghante ka average processing delay.
+    """
+    now = timezone.now()
+    pending = RazorpayWebhookEvent.objects.filter(status=RazorpayWebhookEvent.EventStatus.PENDING)
+    backlog = pending.aggregate(
+        events=Count('id'),
+        orders=Count('razorpay_order_id', distinct=True),
+        oldest=Min('received_at'),
+    )
+    recent = RazorpayWebhookEvent.objects.filter(
+        processed_at__gte=now - timedelta(hours=1)
+    ).aggregate(
+        processed=Count('id'),
+        avg_delay=Avg(F('processed_at') - F('received_at')),
+    )
+    return {
+        'backlog_events': backlog['events'],
+        'backlog_orders': backlog['orders'],
+        'lag_seconds': (now - backlog['oldest']).total_seconds() if backlog['oldest'] else 0.0,
+        'failed_events': RazorpayWebhookEvent.objects.filter(
+            status=RazorpayWebhookEvent.EventStatus.FAILED
+        ).count(),
+        'processed_last_hour': recent['processed'],
+        'avg_processing_delay_seconds': (
+            recent['avg_delay'].total_seconds() if recent['avg_delay'] else 0.0
+        ),
+    }
@@ -1,20 +1,23 @@
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack 
-import delivery.routing 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quickdash.settings')
 
 django_asgi_app = get_asgi_application()
 
+# --- UPDATED: JWT WebSocket auth (accounts/ws_auth.py) ---
+# Apps load hone ke baad import karein (middleware aur consumers models use karte hain)
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from accounts.ws_auth import JWTAuthMiddlewareStack  # noqa: E402
+import delivery.routing  # noqa: E402
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
 
 
-    "websocket": AuthMiddlewareStack( 
+    "websocket": JWTAuthMiddlewareStack( 
         URLRouter(
             delivery.routing.websocket_urlpatterns 
         )
     ),
-})
\ No newline at end of file
+})
@@ -6,6 +6,8 @@ from celery.schedules import crontab  # <-- Sirf ek import
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quickdash.settings')
 
+from django.conf import settings  # noqa: E402 (settings module upar set hona zaroori hai)
+
 app = Celery('quickdash')
 
 app.config_from_object('django.conf:settings', namespace='CELERY')
@@ -19,6 +21,102 @@ app.conf.beat_schedule = {
         'task': 'retry_unassigned_deliveries',
         'schedule': crontab(), # Ab yeh kaam karega
     },
+
+    # Har minute delivery transition outbox ka sweep (retries / chhooti hui entries)
+    'drain-delivery-outbox-every-minute': {
+        'task': 'drain_delivery_outbox',
+        'schedule': crontab(),
+    },
+
+    # Pending deliveries ka batch dispatch (delivery/dispatch.py)
+    'dispatch-pending-deliveries': {
+        'task': 'dispatch_pending_deliveries',
+        'schedule': settings.DISPATCH_TICK_SECONDS,
+    },
+
+    # Buffered rider location pings ko DB mein batch flush
+    'flush-rider-locations': {
+        'task': 'flush_rider_locations',
+        'schedule': settings.RIDER_LOCATION_FLUSH_SECONDS,
+    },
+
+    # Har minute rider geo index se stale riders hatayein
+    'prune-rider-geo-index-every-minute': {
+        'task': 'prune_rider_geo_index',
+        'schedule': crontab(),
+    },
+
+    # Har 10 minute rider geo index DB se dobara banayein
+    'rebuild-rider-geo-index-every-10-minutes': {
+        'task': 'rebuild_rider_geo_index',
+        'schedule': crontab(minute='*/10'),
+    },
+
+    # Roz raat 3 baje stale/abandoned carts purge karega
+    'purge-stale-carts-nightly': {
+        'task': 'purge_stale_carts',
+        'schedule': crontab(hour=3, minute=0),
+    },
+
+    # Roz raat 4 baje purane finished orders archive tables mein move honge
+    'archive-old-orders-nightly': {
+        'task': 'archive_old_orders',
+        'schedule': crontab(hour=4, minute=0),
+    },
+
+    # Har minute Redis coupon counters -> Coupon.times_used
+    'reconcile-coupon-usage-every-minute': {
+        'task': 'reconcile_coupon_usage',
+        'schedule': crontab(),
+    },
+
+    # Roz raat pichle deliveries se ETA table dobara fit karein
+    'fit-eta-model-nightly': {
+        'task': 'fit_eta_model',
+        'schedule': crontab(hour=4, minute=30),
+    },
+
+    # Roz raat aane wale dinon ke delivery slots banayein
+    'generate-delivery-slots-nightly': {
+        'task': 'generate_delivery_slots',
+        'schedule': crontab(hour=2, minute=30),
+    },
+
+    # Roz raat pichle orders ke addresses se delivery fee cache warm karein
+    'warm-delivery-fee-cache-nightly': {
+        'task': 'warm_delivery_fee_cache',
+        'schedule': crontab(hour=5, minute=0),
+    },
+
+    # Roz raat purane template version ke invoices dobara render karein
+    'regenerate-invoices-nightly': {
+        'task': 'regenerate_invoices',
+        'schedule': crontab(hour=5, minute=30),
+    },
+
+    # Har minute slot orders ki picking slot shuru hone se pehle release karein
+    'release-slot-orders-every-minute': {
+        'task': 'release_slot_orders',
+        'schedule': crontab(),
+    },
+
+    # Har 5 minute slot capacity counters ko DB se sync karein
+    'reconcile-slot-capacity-every-5-minutes': {
+        'task': 'reconcile_slot_capacity',
+        'schedule': crontab(minute='*/5'),
+    },
+
+    # Rider location stream se delivery trails (replay) append karein
+    'append-location-trails': {
+        'task': 'append_location_trails',
+        'schedule': settings.TRAIL_APPEND_SECONDS,
+    },
+
+    # Har minute Razorpay webhook inbox ka sweep (retries / chhoote hue events)
+    'drain-razorpay-webhooks-every-minute': {
+        'task': 'drain_razorpay_webhooks',
+        'schedule': crontab(),
+    },
 }
 # --- END NAYA BEAT ---
 
@@ -234,6 +234,15 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Kolkata' 
 
+# COD/free orders ka confirmation alag queue par chalta hai taaki
+# checkout workers doosre tasks ke peeche na phasein.
+# Worker: celery -A quickdash worker -Q order_confirmation
+ORDER_CONFIRMATION_QUEUE = config('ORDER_CONFIRMATION_QUEUE', default='order_confirmation')
+CELERY_TASK_ROUTES = {
+    'confirm_order': {'queue': ORDER_CONFIRMATION_QUEUE},
+    'drain_razorpay_webhooks': {'queue': ORDER_CONFIRMATION_QUEUE},
+}
+
 # CHANNELS (WebSockets)
 # Production mein 'CHANNELS_REDIS_URL' set karein (e.g., redis://.../2)
 CHANNEL_LAYERS = {
@@ -281,6 +290,99 @@ ORDER_CANCELLATION_WINDOW = config('ORDER_CANCELLATION_WINDOW', default=300, cas
 RIDER_BASE_DELIVERY_FEE = config('RIDER_BASE_DELIVERY_FEE', default='30.00', cast=Decimal)
 RIDER_SEARCH_RADIUS_KM = config('RIDER_SEARCH_RADIUS_KM', default=1.0, cast=float)
 LOW_STOCK_THRESHOLD = config('LOW_STOCK_THRESHOLD', default=10, cast=int) # Dashboard ke liye
+WMS_ALLOCATION_STRATEGY = config('WMS_ALLOCATION_STRATEGY', default='greedy') # 'greedy', 'pick_path' ya dotted path
+# Pick-path layout (wms/layout.py). Default code format: 'A-01-R1-S1' (Zone-Aisle-Rack-Shelf)
+WMS_LOCATION_CODE_PATTERN = config('WMS_LOCATION_CODE_PATTERN', default=r'^(?P<zone>[A-Z]+)-(?P<aisle>\d+)(?:-R(?P<rack>\d+))?(?:-S(?P<shelf>\d+))?$')
+WMS_AISLE_SPACING_M = config('WMS_AISLE_SPACING_M', default=3.0, cast=float)
+WMS_RACK_SPACING_M = config('WMS_RACK_SPACING_M', default=1.5, cast=float)
+WMS_ZONE_SPACING_M = config('WMS_ZONE_SPACING_M', default=20.0, cast=float)
+WMS_UNKNOWN_LOCATION_DISTANCE_M = config('WMS_UNKNOWN_LOCATION_DISTANCE_M', default=50.0, cast=float)
+WMS_FAST_MOVER_WINDOW_DAYS = config('WMS_FAST_MOVER_WINDOW_DAYS', default=7, cast=int)
+CART_EMPTY_PURGE_HOURS = config('CART_EMPTY_PURGE_HOURS', default=24, cast=int) # Khaali carts kitni der baad delete hon
+CART_ABANDON_DAYS = config('CART_ABANDON_DAYS', default=30, cast=int) # Items wale carts kitne din baad 'abandoned' maane jaayein
+CART_PURGE_BATCH_SIZE = config('CART_PURGE_BATCH_SIZE', default=500, cast=int)
+CART_PURGE_MAX_BATCHES = config('CART_PURGE_MAX_BATCHES', default=200, cast=int) # Ek run mein zyada se zyada batches
+RAZORPAY_WEBHOOK_MAX_ATTEMPTS = config('RAZORPAY_WEBHOOK_MAX_ATTEMPTS', default=5, cast=int) # Itne failures ke baad event FAILED
+RAZORPAY_WEBHOOK_DRAIN_BATCH = config('RAZORPAY_WEBHOOK_DRAIN_BATCH', default=100, cast=int) # Sweeper ek run mein kitne orders drain kare
+STORE_EVENT_STREAM_MAX_LIMIT = config('STORE_EVENT_STREAM_MAX_LIMIT', default=500, cast=int) # Staff event stream ek call mein max events
+ORDER_ARCHIVE_AFTER_DAYS = config('ORDER_ARCHIVE_AFTER_DAYS', default=395, cast=int) # Itne din purane finished orders archive hon (13 mahine: 'last_year' analytics live rahe)
+ORDER_ARCHIVE_BATCH_SIZE = config('ORDER_ARCHIVE_BATCH_SIZE', default=500, cast=int)
+ORDER_ARCHIVE_MAX_BATCHES = config('ORDER_ARCHIVE_MAX_BATCHES', default=100, cast=int) # Ek run mein zyada se zyada batches
+ORDER_STATUS_BULK_MAX = config('ORDER_STATUS_BULK_MAX', default=50, cast=int) # Bulk status API ek request mein max orders
+ORDER_STATUS_CACHE_TTL = config('ORDER_STATUS_CACHE_TTL', default=3600, cast=int) # Seconds
+DELIVERY_SLOT_MINUTES = config('DELIVERY_SLOT_MINUTES', default=60, cast=int) # Ek scheduled delivery slot kitne minute ka
+DELIVERY_SLOT_DAYS_AHEAD = config('DELIVERY_SLOT_DAYS_AHEAD', default=2, cast=int) # Kitne din aage tak slots bane
+DELIVERY_SLOT_MAX_ORDERS = config('DELIVERY_SLOT_MAX_ORDERS', default=40, cast=int) # Naye slots ki default capacity
+DELIVERY_SLOT_MAX_ITEMS = config('DELIVERY_SLOT_MAX_ITEMS', default=400, cast=int)
+DELIVERY_SLOT_RIDER_MINUTES = config('DELIVERY_SLOT_RIDER_MINUTES', default=600, cast=int)
+SLOT_RIDER_MINUTES_BASE = config('SLOT_RIDER_MINUTES_BASE', default=15, cast=int) # Har order ka base rider time
+SLOT_RIDER_MINUTES_PER_KM = config('SLOT_RIDER_MINUTES_PER_KM', default=4.0, cast=float)
+SLOT_PENDING_HOLD_MINUTES = config('SLOT_PENDING_HOLD_MINUTES', default=15, cast=int) # Unpaid PENDING order itni der tak slot hold kare
+COUPON_PENDING_HOLD_MINUTES = config('COUPON_PENDING_HOLD_MINUTES', default=15, cast=int) # Unpaid PENDING order itni der tak coupon token hold kare
+SLOT_BOOKING_CUTOFF_MINUTES = config('SLOT_BOOKING_CUTOFF_MINUTES', default=30, cast=int) # Slot shuru hone se itne minute pehle booking band
+SLOT_RELEASE_LEAD_MINUTES = config('SLOT_RELEASE_LEAD_MINUTES', default=30, cast=int) # Slot order ki picking / dispatch slot shuru hone se itne minute pehle
+SLOT_RELEASE_MAX_ATTEMPTS = config('SLOT_RELEASE_MAX_ATTEMPTS', default=10, cast=int) # Itni baar release fail ho toh slot order FAILED + refund
+SLOT_RELEASE_ATTEMPTS_TTL = config('SLOT_RELEASE_ATTEMPTS_TTL', default=86400, cast=int) # Seconds
+DELIVERY_FEE_GEOHASH_PRECISION = config('DELIVERY_FEE_GEOHASH_PRECISION', default=7, cast=int) # Fee cache cell ka size (7 = ~150m)
+DELIVERY_FEE_CACHE_TTL = config('DELIVERY_FEE_CACHE_TTL', default=172800, cast=int) # Seconds (warm task roz chalta hai)
+DELIVERY_FEE_WARM_LOOKBACK_DAYS = config('DELIVERY_FEE_WARM_LOOKBACK_DAYS', default=90, cast=int) # Itne din ke orders ke addresses se cache warm ho
+DELIVERY_SURGE_MAX_MULTIPLIER = config('DELIVERY_SURGE_MAX_MULTIPLIER', default='2.50', cast=Decimal)
+DELIVERY_ROAD_FACTOR = config('DELIVERY_ROAD_FACTOR', default=1.3, cast=float) # Seedhi doori -> road doori
+RIDER_AVG_SPEED_KMPH = config('RIDER_AVG_SPEED_KMPH', default=20.0, cast=float)
+INVOICE_TEMPLATE_VERSION = config('INVOICE_TEMPLATE_VERSION', default=1, cast=int) # Invoice layout badle toh badhayein (purane invoices dobara bante hain)
+INVOICE_REGENERATE_BATCH_SIZE = config('INVOICE_REGENERATE_BATCH_SIZE', default=2000, cast=int) # Ek run mein max invoices re-render
+INVOICE_REGENERATE_BATCH_DELAY = config('INVOICE_REGENERATE_BATCH_DELAY', default=300, cast=int) # Seconds, agle regeneration batch se pehle (workers ko catch up karne dein)
+INVOICE_GENERATE_DEBOUNCE_SECONDS = config('INVOICE_GENERATE_DEBOUNCE_SECONDS', default=60, cast=int) # Invoice API polling par task itni der mein ek hi baar queue ho
+INVOICE_SELLER_NAME = config('INVOICE_SELLER_NAME', default='QuickDash Commerce Pvt. Ltd.')
+INVOICE_SELLER_GSTIN = config('INVOICE_SELLER_GSTIN', default='')
+RIDER_NOTIFY_LIMIT = config('RIDER_NOTIFY_LIMIT', default=10, cast=int) # Ek delivery ke liye max kitne nearest riders ko notify
+RIDER_GEO_STALE_SECONDS = config('RIDER_GEO_STALE_SECONDS', default=300, cast=int) # Itni der ping na aaye toh rider geo index se bahar
+RIDER_LOCATION_FLUSH_SECONDS = config('RIDER_LOCATION_FLUSH_SECONDS', default=30, cast=int) # Buffered rider pings kitni der mein DB mein flush hon
+RIDER_LOCATION_FLUSH_BATCH = config('RIDER_LOCATION_FLUSH_BATCH', default=1000, cast=int) # Ek bulk_update mein max riders
+RIDER_LOCATION_STREAM_MAXLEN = config('RIDER_LOCATION_STREAM_MAXLEN', default=200000, cast=int) # Redis ping stream ki approx max length
+RIDER_ACTIVE_ORDER_CACHE_TTL = config('RIDER_ACTIVE_ORDER_CACHE_TTL', default=120, cast=int) # Seconds
+RIDER_WS_MAX_SAMPLES_PER_FRAME = config('RIDER_WS_MAX_SAMPLES_PER_FRAME', default=30, cast=int) # WebSocket LOCATION frame mein max samples
+RIDER_LOCATION_MAX_SAMPLE_AGE = config('RIDER_LOCATION_MAX_SAMPLE_AGE', default=300, cast=int) # Seconds; isse purana client timestamp server time se replace
+WS_IDENTITY_CACHE_TTL = config('WS_IDENTITY_CACHE_TTL', default=300, cast=int) # Seconds; WebSocket auth ke liye cached user role/profile ids
+DELIVERY_BATCH_DISPATCH = config('DELIVERY_BATCH_DISPATCH', default=True, cast=bool) # False = purana nearest-riders broadcast
+DISPATCH_TICK_SECONDS = config('DISPATCH_TICK_SECONDS', default=5, cast=int) # Batch dispatch kitni der mein chale
+DISPATCH_OFFER_TIMEOUT_SECONDS = config('DISPATCH_OFFER_TIMEOUT_SECONDS', default=30, cast=int) # Rider ke paas offer accept karne ka time
+DISPATCH_TRIED_TTL_SECONDS = config('DISPATCH_TRIED_TTL_SECONDS', default=300, cast=int) # Timeout wala rider itni der tak usi delivery ke liye skip
+DISPATCH_MAX_BATCH = config('DISPATCH_MAX_BATCH', default=500, cast=int) # Ek tick mein max deliveries
+DISPATCH_CANDIDATES_PER_STORE = config('DISPATCH_CANDIDATES_PER_STORE', default=50, cast=int) # Har store ke liye max nearest riders
+DISPATCH_WEIGHT_DISTANCE = config('DISPATCH_WEIGHT_DISTANCE', default=1.0, cast=float) # Cost per km (rider -> store)
+DISPATCH_WEIGHT_RATING = config('DISPATCH_WEIGHT_RATING', default=0.5, cast=float) # Cost per rating point below 5
+DISPATCH_WEIGHT_WAIT = config('DISPATCH_WEIGHT_WAIT', default=0.2, cast=float) # Cost kam per minute delivery wait
+RETRY_FIRST_AFTER_SECONDS = config('RETRY_FIRST_AFTER_SECONDS', default=60, cast=int) # PENDING_ACCEPTANCE ke itni der baad pehla retry
+RETRY_BACKOFF_SECONDS = config('RETRY_BACKOFF_SECONDS', default=60, cast=int) # Retries ke beech gap = attempts x yeh
+RETRY_BACKOFF_MAX_STEPS = config('RETRY_BACKOFF_MAX_STEPS', default=5, cast=int) # Backoff isse zyada nahi badhta
+RETRY_RADIUS_STEP_KM = config('RETRY_RADIUS_STEP_KM', default=0.5, cast=float) # Har retry par search radius itna badhe
+RETRY_MAX_RADIUS_KM = config('RETRY_MAX_RADIUS_KM', default=5.0, cast=float)
+RETRY_INCENTIVE_STEP = config('RETRY_INCENTIVE_STEP', default='5.00', cast=Decimal) # Har retry par rider incentive (Rs.)
+RETRY_MAX_INCENTIVE = config('RETRY_MAX_INCENTIVE', default='30.00', cast=Decimal)
+RETRY_CANDIDATES_PER_STORE = config('RETRY_CANDIDATES_PER_STORE', default=50, cast=int) # Har store ke liye ek GEOSEARCH mein max riders
+RETRY_MAX_BATCH = config('RETRY_MAX_BATCH', default=2000, cast=int) # Ek run mein max stuck deliveries
+DELIVERY_OUTBOX_MAX_ATTEMPTS = config('DELIVERY_OUTBOX_MAX_ATTEMPTS', default=5, cast=int) # Itne failures ke baad outbox entry FAILED
+DELIVERY_OUTBOX_DRAIN_BATCH = config('DELIVERY_OUTBOX_DRAIN_BATCH', default=200, cast=int) # Sweeper ek run mein kitni deliveries drain kare
+DELIVERY_OUTBOX_SWEEP_AFTER_SECONDS = config('DELIVERY_OUTBOX_SWEEP_AFTER_SECONDS', default=30, cast=int) # Isse nayi entries enqueued task ke liye chhodi jaati hain
+DELIVERY_OUTBOX_RETENTION_DAYS = config('DELIVERY_OUTBOX_RETENTION_DAYS', default=7, cast=int) # DONE entries itne din baad delete
+ETA_LOOKBACK_DAYS = config('ETA_LOOKBACK_DAYS', default=28, cast=int) # ETA table kitne din ki delivered deliveries se fit ho
+ETA_QUANTILE = config('ETA_QUANTILE', default=0.8, cast=float) # 0.8 = P80 promise
+ETA_MIN_SAMPLES = config('ETA_MIN_SAMPLES', default=30, cast=int) # Isse kam samples wala cell general cell par fallback
+ETA_HOUR_BUCKET_SIZE = config('ETA_HOUR_BUCKET_SIZE', default=3, cast=int) # Hour-of-week bucket ka size (hours)
+ETA_DISTANCE_BANDS_KM = config('ETA_DISTANCE_BANDS_KM', default='1,2,3,5,8', cast=lambda v: [float(x) for x in v.split(',') if x.strip()]) # Distance band boundaries
+ETA_MAX_SEGMENT_MINUTES = config('ETA_MAX_SEGMENT_MINUTES', default=180, cast=int) # Isse lamba segment outlier maan kar fit se bahar
+ETA_LOCAL_CACHE_SECONDS = config('ETA_LOCAL_CACHE_SECONDS', default=300, cast=int) # ETA table process memory mein kitni der
+ETA_DEFAULT_TO_ACCEPT_MINUTES = config('ETA_DEFAULT_TO_ACCEPT_MINUTES', default=8, cast=float) # Table na ho tab: confirm -> rider accept
+ETA_DEFAULT_TO_STORE_MINUTES = config('ETA_DEFAULT_TO_STORE_MINUTES', default=5, cast=float) # Accept -> store pahunchna
+ETA_DEFAULT_AT_STORE_MINUTES = config('ETA_DEFAULT_AT_STORE_MINUTES', default=3, cast=float) # Store par -> pick up
+ETA_DEFAULT_TO_CUSTOMER_MINUTES = config('ETA_DEFAULT_TO_CUSTOMER_MINUTES', default=10, cast=float) # Distance na ho tab pick up -> delivered
+TRAIL_APPEND_SECONDS = config('TRAIL_APPEND_SECONDS', default=30, cast=int) # Location stream se delivery trails kitni der mein append hon
+TRAIL_STREAM_BATCH = config('TRAIL_STREAM_BATCH', default=5000, cast=int) # Ek XREAD mein max pings
+TRAIL_MAX_BATCHES = config('TRAIL_MAX_BATCHES', default=20, cast=int) # Ek pass mein max XREAD batches
+TRAIL_MAX_POINTS = config('TRAIL_MAX_POINTS', default=5000, cast=int) # Ek delivery trail mein max points
+TRAIL_FINALIZE_DELAY_SECONDS = config('TRAIL_FINALIZE_DELAY_SECONDS', default=30, cast=int) # DELIVERED ke baad itna ruk kar trail finalize (buffered pings)
+TRAIL_SIMPLIFY_PIXELS = config('TRAIL_SIMPLIFY_PIXELS', default=2.0, cast=float) # Replay simplification tolerance (screen pixels)
 # --- END FIX 6 ---
 
 
@@ -9,7 +9,7 @@ class CategoryAdmin(admin.ModelAdmin):
     """
     Product Categories ke liye Admin.
     """
-    list_display = ('name', 'parent', 'slug', 'is_active')
+    list_display = ('name', 'parent', 'slug', 'gst_rate', 'is_active')
     list_filter = ('is_active', 'parent')
     search_fields = ('name', 'slug')
     # 'name' likhte hi 'slug' automatically fill ho jayega
@@ -53,6 +53,7 @@ class ProductAdmin(admin.ModelAdmin):
         'name', 
         'category', 
         'brand', 
+        'gst_rate',
         'is_active', 
         'average_rating', 
         'review_count'
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_alter_category_icon'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='gst_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='GST slab % (0, 5, 12, 18, 28). Khaali = parent category ka rate, warna settings.TAX_RATE', max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='gst_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Product ka apna GST slab % (khaali = category ka rate)', max_digits=5, null=True),
+        ),
+    ]
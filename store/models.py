@@ -51,6 +51,13 @@ class Category(TimestampedModel):
         default=True,
         help_text="Kya yeh category site par visible hai?"
     )
+    gst_rate = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="GST slab % (0, 5, 12, 18, 28). Khaali = parent category ka rate, warna settings.TAX_RATE"
+    )
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -133,6 +140,13 @@ class Product(TimestampedModel):
         default=True,
         help_text="Kya yeh product line active hai?"
     )
+    gst_rate = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Product ka apna GST slab % (khaali = category ka rate)"
+    )
 
     average_rating = models.DecimalField(
         max_digits=3, 
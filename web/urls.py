@@ -13,7 +13,7 @@ urlpatterns = [
     path('order-success/', views.OrderSuccessView.as_view(), name='order-success'),
     path('search/', views.SearchResultsView.as_view(), name='search'),
     path('category/<slug:slug>/', views.CategoryDetailView.as_view(), name='category-detail'),
-    path('order/<int:pk>/', views.OrderDetailView.as_view(), name='order-detail'),
+    path('order/<str:order_id>/', views.OrderDetailView.as_view(), name='order-detail'),
     path('product/<int:pk>/', views.ProductView.as_view(), name='product-detail'),
     path('location-denied/', views.LocationDeniedView.as_view(), name='location-denied'),
     path('track-order/', views.TrackOrderView.as_view(), name='track-order'),
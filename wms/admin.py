@@ -7,7 +7,7 @@ class LocationAdmin(admin.ModelAdmin):
     """
     Warehouse ke andar ki Locations (Racks/Shelves).
     """
-    list_display = ('code', 'store', 'is_active')
+    list_display = ('code', 'store', 'is_active', 'pick_x', 'pick_y')
     list_filter = ('store', 'is_active')
     search_fields = ('code', 'store__name')
     autocomplete_fields = ('store',)
@@ -0,0 +1,276 @@
+# wms/allocation.py
+"""
+Order confirm hone par stock allocation engine.
+
+Poore order ke SKUs ka summary stock (StoreInventory) aur granular stock
+(WmsStock) sirf do queries mein load hota hai, allocation memory mein
+calculate hota hai, aur saare PickTasks ek hi bulk_create se bante hain.
+
+Allocation strategy pluggable hai: settings.WMS_ALLOCATION_STRATEGY
+ya allocate_order(..., strategy=...) se chuni jaati hai.
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from inventory.models import StoreInventory
+from .layout import LocationLayout, LocationPoint
+from .models import WmsStock, PickTask
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+
+class StockAllocationError(Exception):
+    """Jab order ke liye poora stock allocate nahi ho paata."""
+    pass
+
+
+@dataclass
+class AllocationLine:
+    """Ek SKU (StoreInventory) ki zaroorat aur uske available WmsStock rows."""
+    inventory_item: StoreInventory
+    quantity: int
+    stock_rows: list = field(default_factory=list)
+
+
+@dataclass
+class Allocation:
+    """Ek location se kitna uthana hai (ek PickTask ban jaata hai)."""
+    line: AllocationLine
+    stock: WmsStock
+    quantity: int
+
+
+class AllocationStrategy:
+    """
+    Base strategy. Subclasses ya toh poore order ke liye allocate() override
+    karein, ya har line ke liye allocate_line().
+    """
+    name = None
+
+    def allocate(self, lines):
+        allocations = []
+        for line in lines:
+            allocations.extend(self.allocate_line(line))
+        return allocations
+
+    def allocate_line(self, line):
+        raise NotImplementedError
+
+
+class GreedyLocationCodeStrategy(AllocationStrategy):
+    """
+    Purana behaviour: locations ko code ke hisaab se sort karke
+    ek-ek karke drain karta hai.
+    """
+    name = 'greedy'
+
+    def allocate_line(self, line):
+        remaining = line.quantity
+        allocations = []
+        for stock in sorted(line.stock_rows, key=lambda s: s.location.code):
+            if remaining <= 0:
+                break
+            qty = min(stock.quantity, remaining)
+            allocations.append(Allocation(line=line, stock=stock, quantity=qty))
+            remaining -= qty
+        return allocations
+
+
+class PickPathStrategy(AllocationStrategy):
+    """
+    Poore order ke liye location set chunti hai jo:
+    (a) sabse kam distinct locations visit karwaye,
+    (b) picker ka walking distance kam rakhe (wms.layout.LocationLayout),
+    aur tie hone par fast-moving locations ko drain karne se bachaye
+    (pichle WMS_FAST_MOVER_WINDOW_DAYS mein zyada COMPLETED picks = fast mover).
+
+    Greedy set-cover: har step par woh location jo sabse zyada remaining lines
+    poori kar sake; phir sabse zyada units; phir chuni hui locations ke sabse paas;
+    phir kam velocity. Aakhir mein allocations pick route ke order mein lagti hain.
+    """
+    name = 'pick_path'
+
+    def __init__(self, layout=None):
+        self.layout = layout or LocationLayout()
+
+    def location_velocity(self, location_ids):
+        """Location id -> recent COMPLETED pick count (ek aggregate query)."""
+        since = timezone.now() - timedelta(days=settings.WMS_FAST_MOVER_WINDOW_DAYS)
+        rows = PickTask.objects.filter(
+            location_id__in=location_ids,
+            status=PickTask.PickStatus.COMPLETED,
+            completed_at__gte=since
+        ).values('location_id').annotate(picks=Count('id'))
+        return {row['location_id']: row['picks'] for row in rows}
+
+    def allocate(self, lines):
+        remaining = {id(line): line.quantity for line in lines}
+        # location_id -> [(line, stock)]
+        by_location = defaultdict(list)
+        locations = {}
+        for line in lines:
+            for stock in line.stock_rows:
+                by_location[stock.location_id].append((line, stock))
+                locations[stock.location_id] = stock.location
+
+        if not locations:
+            return []
+
+        velocity = self.location_velocity(list(locations))
+        chosen_points = []
+        allocations_by_location = {}
+
+        def score(location_id):
+            completes = 0
+            units = 0
+            for line, stock in by_location[location_id]:
+                need = remaining[id(line)]
+                if need <= 0:
+                    continue
+                units += min(stock.quantity, need)
+                if stock.quantity >= need:
+                    completes += 1
+            point = self.layout.point_for(locations[location_id])
+            if chosen_points:
+                walk = min(self.layout.distance(point, other) for other in chosen_points)
+            else:
+                walk = self.layout.distance(LocationPoint(0.0, 0.0), point)
+            return (
+                -completes,
+                -units,
+                walk,
+                velocity.get(location_id, 0),
+                locations[location_id].code,
+            )
+
+        candidates = set(locations)
+        while any(need > 0 for need in remaining.values()) and candidates:
+            best = min(candidates, key=score)
+            candidates.discard(best)
+
+            picked = []
+            for line, stock in by_location[best]:
+                need = remaining[id(line)]
+                if need <= 0:
+                    continue
+                qty = min(stock.quantity, need)
+                if qty > 0:
+                    picked.append(Allocation(line=line, stock=stock, quantity=qty))
+                    remaining[id(line)] -= qty
+            if picked:
+                allocations_by_location[best] = picked
+                chosen_points.append(self.layout.point_for(locations[best]))
+
+        route = self.layout.route([locations[loc_id] for loc_id in allocations_by_location])
+        return [
+            allocation
+            for location in route
+            for allocation in allocations_by_location[location.id]
+        ]
+
+
+ALLOCATION_STRATEGIES = {
+    GreedyLocationCodeStrategy.name: GreedyLocationCodeStrategy,
+    PickPathStrategy.name: PickPathStrategy,
+}
+
+
+def get_allocation_strategy(name=None):
+    """
+    Naam (registry key) ya dotted path se strategy instance return karta hai.
+    Default: settings.WMS_ALLOCATION_STRATEGY.
+    """
+    name = name or getattr(settings, 'WMS_ALLOCATION_STRATEGY', GreedyLocationCodeStrategy.name)
+    strategy_class = ALLOCATION_STRATEGIES.get(name)
+    if strategy_class is None:
+        strategy_class = import_string(name)
+    return strategy_class()
+
+
+def build_allocation_lines(order_items):
+    """
+    Order items se AllocationLines banata hai.
+    Sirf 2 queries: StoreInventory summary + WmsStock (quantity > 0).
+    Ek hi SKU do baar ho toh quantity merge ho jaati hai.
+    """
+    required = defaultdict(int)
+    for item in order_items:
+        if item.inventory_item_id is None:
+            raise StockAllocationError(f"Item '{item.product_name}' ab available nahi hai.")
+        required[item.inventory_item_id] += item.quantity
+
+    summaries = StoreInventory.objects.select_related(
+        'variant__product'
+    ).in_bulk(list(required))
+
+    lines = {}
+    for inventory_id, quantity in required.items():
+        summary = summaries.get(inventory_id)
+        if summary is None:
+            raise StockAllocationError(f"Inventory item {inventory_id} ab available nahi hai.")
+        if summary.stock_quantity < quantity:
+            raise StockAllocationError(
+                f"Item '{summary.variant.product.name}' (SKU: {summary.variant.sku}) is out of stock (Summary). "
+                f"Needed {quantity}, found {summary.stock_quantity}."
+            )
+        lines[inventory_id] = AllocationLine(inventory_item=summary, quantity=quantity)
+
+    stock_rows = WmsStock.objects.filter(
+        inventory_summary_id__in=list(lines),
+        quantity__gt=0
+    ).select_related('location')
+    for stock in stock_rows:
+        lines[stock.inventory_summary_id].stock_rows.append(stock)
+
+    return list(lines.values())
+
+
+def allocate_order(order, order_items, picker_user=None, strategy=None):
+    """
+    Poore order ke liye stock allocate karke PickTasks bulk_create karta hai.
+    Transaction ke andar call karein; shortage par StockAllocationError raise
+    hota hai taaki caller rollback kar sake.
+    Return: banaye gaye PickTasks ki list.
+    """
+    if not isinstance(strategy, AllocationStrategy):
+        strategy = get_allocation_strategy(strategy)
+
+    lines = build_allocation_lines(order_items)
+    allocations = strategy.allocate(lines)
+
+    allocated = defaultdict(int)
+    for allocation in allocations:
+        allocated[allocation.line.inventory_item.id] += allocation.quantity
+
+    for line in lines:
+        got = allocated[line.inventory_item.id]
+        if got < line.quantity:
+            # CRITICAL: Summary stock aur granular stock out of sync hain!
+            sku = line.inventory_item.variant.sku
+            logger.critical(f"CRITICAL SYNC ERROR: Order {order.order_id} - Item {sku} (Qty: {line.quantity}).")
+            logger.critical(f"Summary stock was {line.inventory_item.stock_quantity}, but granular stock only had {got} available.")
+            raise StockAllocationError(f"Stock sync error for {sku}. Could not fulfill order. Please audit stock.")
+
+    tasks = [
+        PickTask(
+            order=order,
+            location=allocation.stock.location,
+            variant=allocation.line.inventory_item.variant,
+            quantity_to_pick=allocation.quantity,
+            assigned_to=picker_user,
+            status=PickTask.PickStatus.PENDING
+        )
+        for allocation in allocations
+        if allocation.quantity > 0
+    ]
+    PickTask.objects.bulk_create(tasks)
+    logger.info(f"WMS: Created {len(tasks)} PickTasks for Order {order.order_id} (strategy: {strategy.name})")
+    return tasks
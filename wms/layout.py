@@ -0,0 +1,112 @@
+# wms/layout.py
+"""
+Dark store ka simple layout model (pick-path allocation ke liye).
+
+Har Location ek point (x, y) hai:
+- x: kis aisle mein hai (zone offset + aisle * aisle spacing)
+- y: aisle ke andar packing-station wale cross-aisle se kitni door (rack * rack spacing)
+
+Coordinates ya toh Location.pick_x/pick_y se aate hain, ya 'code' se parse hote hain
+(default format: 'A-01-R1-S1' = Zone A, Aisle 01, Rack 1, Shelf 1).
+Shelf sirf height hai, isliye walking distance mein count nahi hoti.
+"""
+import math
+import re
+from dataclasses import dataclass
+
+from django.conf import settings
+
+
+@dataclass(frozen=True)
+class LocationPoint:
+    x: float
+    y: float
+
+
+class LocationLayout:
+    """
+    Location -> LocationPoint mapping aur do points ke beech walking distance.
+    Settings se configure hota hai (WMS_LOCATION_CODE_PATTERN, WMS_*_SPACING_M).
+    """
+
+    def __init__(self, code_pattern=None, aisle_spacing=None, rack_spacing=None, zone_spacing=None):
+        self.code_pattern = re.compile(code_pattern or settings.WMS_LOCATION_CODE_PATTERN, re.IGNORECASE)
+        self.aisle_spacing = aisle_spacing if aisle_spacing is not None else settings.WMS_AISLE_SPACING_M
+        self.rack_spacing = rack_spacing if rack_spacing is not None else settings.WMS_RACK_SPACING_M
+        self.zone_spacing = zone_spacing if zone_spacing is not None else settings.WMS_ZONE_SPACING_M
+        self._cache = {}
+
+    def parse_code(self, code):
+        """
+        Code se (zone, aisle, rack, shelf) nikaalta hai.
+        Match na ho toh None.
+        """
+        match = self.code_pattern.match(code or '')
+        if not match:
+            return None
+        parts = match.groupdict()
+        return (
+            (parts.get('zone') or '').upper(),
+            int(parts.get('aisle') or 0),
+            int(parts.get('rack') or 0),
+            int(parts.get('shelf') or 0),
+        )
+
+    def point_for(self, location):
+        """
+        Location ka (x, y). Explicit pick_x/pick_y ko priority milti hai.
+        Code parse na ho toh None (unknown position).
+        """
+        if location.id in self._cache:
+            return self._cache[location.id]
+
+        point = None
+        if location.pick_x is not None and location.pick_y is not None:
+            point = LocationPoint(location.pick_x, location.pick_y)
+        else:
+            parsed = self.parse_code(location.code)
+            if parsed:
+                zone, aisle, rack, _shelf = parsed
+                # Zone 'A' = 0, 'B' = 1, ... (multi-letter zones bhi chalte hain)
+                zone_index = 0
+                for char in zone:
+                    zone_index = zone_index * 26 + (ord(char) - ord('A') + 1)
+                zone_index = max(zone_index - 1, 0)
+                point = LocationPoint(
+                    x=zone_index * self.zone_spacing + aisle * self.aisle_spacing,
+                    y=rack * self.rack_spacing
+                )
+
+        self._cache[location.id] = point
+        return point
+
+    def distance(self, a, b):
+        """
+        Do LocationPoints ke beech walking distance.
+        Same aisle (same x): seedha aisle ke andar chalo.
+        Alag aisle: front cross-aisle (y=0) tak wapas aao, phir doosre aisle mein jao.
+        Unknown point ke liye settings.WMS_UNKNOWN_LOCATION_DISTANCE_M.
+        """
+        if a is None or b is None:
+            return settings.WMS_UNKNOWN_LOCATION_DISTANCE_M
+        if math.isclose(a.x, b.x):
+            return abs(a.y - b.y)
+        return a.y + abs(a.x - b.x) + b.y
+
+    def route(self, locations, start=LocationPoint(0.0, 0.0)):
+        """
+        Locations ko nearest-neighbour order mein lagata hai (packing station se shuru).
+        Picker isi order mein tasks dekhega.
+        """
+        remaining = list(locations)
+        ordered = []
+        current = start
+        while remaining:
+            nearest = min(
+                remaining,
+                key=lambda loc: (self.distance(current, self.point_for(loc)), loc.code)
+            )
+            ordered.append(nearest)
+            remaining.remove(nearest)
+            current = self.point_for(nearest) or current
+        return ordered
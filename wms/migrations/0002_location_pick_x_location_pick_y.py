@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='pick_x',
+            field=models.FloatField(blank=True, help_text='Packing station se X distance (meters). Khaali ho toh code se nikaala jaata hai.', null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='pick_y',
+            field=models.FloatField(blank=True, help_text='Packing station se Y distance (meters). Khaali ho toh code se nikaala jaata hai.', null=True),
+        ),
+    ]
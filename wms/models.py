@@ -27,6 +27,19 @@ class Location(TimestampedModel): # TimestampedModel se inherit karein
     )
     is_active = models.BooleanField(default=True)
 
+    # --- Pick-path layout (optional) ---
+    # Agar set nahi hain, toh coordinates 'code' se parse hote hain (wms/layout.py dekhein)
+    pick_x = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Packing station se X distance (meters). Khaali ho toh code se nikaala jaata hai."
+    )
+    pick_y = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Packing station se Y distance (meters). Khaali ho toh code se nikaala jaata hai."
+    )
+
     def __str__(self):
         return f"{self.code} at {self.store.name}"
 
@@ -62,7 +62,7 @@ class PickerTaskListView(generics.ListAPIView):
             'variant__product', 
             'location', 
             'order'
-        ).order_by('created_at')
+        ).order_by('created_at', 'id') # Allocation engine tasks ko pick route ke order mein banata hai
 
 
 class PickTaskCompleteView(generics.GenericAPIView):
@@ -79,6 +79,7 @@ class PickTaskCompleteView(generics.GenericAPIView):
         from delivery.utils import notify_nearby_riders
         from orders.models import Order
         from delivery.models import Delivery
+        from delivery.transitions import can_transition, transition
         # --- END GUARDED IMPORTS ---
         
         pk = self.kwargs.get('pk')
@@ -124,8 +125,9 @@ class PickTaskCompleteView(generics.GenericAPIView):
                     order.save(update_fields=['status'])
 
                     delivery = order.delivery
-                    delivery.status = Delivery.DeliveryStatus.PENDING_ACCEPTANCE
-                    delivery.save(update_fields=['status'])
+                    # --- UPDATED: Transition table (delivery/transitions.py) ---
+                    if can_transition(delivery.status, Delivery.DeliveryStatus.PENDING_ACCEPTANCE):
+                        transition(delivery, Delivery.DeliveryStatus.PENDING_ACCEPTANCE)
 
                     delivery_object_for_notification = delivery 
                     logger.info(f"Order {order.order_id} is now READY_FOR_PICKUP.") # <-- CHANGED